@@ -9,12 +9,20 @@
 # modules for the analysis
 import warnings
 warnings.filterwarnings('ignore')
-import pandas as pd
+import os
+import sys
 import seaborn as sns
-import matplotlib.pyplot as plt
 import numpy as np
 from scipy import stats
 
+# makes the code folder available when running from the repository or
+# from a results folder
+here = os.path.dirname(os.path.abspath(__file__))
+for folder in (os.path.dirname(here), here):
+    if os.path.exists(os.path.join(folder, 'code', 'analysis.py')):
+        sys.path.insert(0, folder)
+import code.analysis as analysis
+
 sns.set_theme(style="whitegrid")
 
 
@@ -33,121 +41,97 @@ sns.set_palette(c_mc2mkp + c_marin + c_marco + c_mardecun + c_mardec + c_fedavg)
 
 schedulers = ['(MC)2MKP', 'MarIn', 'MarCo', 'MarDecUn', 'MarDec', 'FedAvg']
 
+# figures are rendered in parallel at the end (unchanged figures are skipped)
+drawings = analysis.FigureQueue()
+
+
+# In[ ]:
+
+
+def analyze(tables, variable, values, described, label, name, xticks):
+    """
+    Prints the statistics and draws the figures of a timing experiment.
+
+    variable is the column that changes in the experiment ('Tasks' or
+    'Resources'), values are the values it takes, and described are
+    the two values whose distributions are described.
+    """
+    results = tables.results
+    summary = tables.summary
+    other = 'Resources' if variable == 'Tasks' else 'Tasks'
+    fixed = 100 if variable == 'Tasks' else 2000
+    plural = variable.lower()
+    print(f'-- Generating figure fig-time-{name}.pdf for the results with a fixed number of {other.lower()}')
+    # Each sample contains the time of 5 repetitions, so the summary
+    # uses the average time of the repetitions in us ('avg')
+    drawings.add(analysis.plot_lines, summary[summary[other] == fixed],
+                 variable, 'mean', f'fig-time-{name}.pdf',
+                 label, 'Execution time (us, log scale)',
+                 hue_order=schedulers, xticks=xticks,
+                 ylim=(1, 100000000),
+                 yticks=[1, 10, 100, 1000, 10000, 100000, 1000000, 100000000],
+                 log=True, band=('ci_low', 'ci_high'))
+
+    # Memory usage (only for results with memory profiles)
+    if 'Traced Peak' in results.columns:
+        print(f'-- Generating figure fig-memory-{name}.pdf for the memory with a fixed number of {other.lower()}')
+        # Converts the traced peak from bytes to KiB
+        memory = analysis.summarize(results.assign(peak=results['Traced Peak']/1024), 'peak')
+        drawings.add(analysis.plot_lines, memory[memory[other] == fixed],
+                     variable, 'mean', f'fig-memory-{name}.pdf',
+                     label, 'Peak memory allocated (KiB, log scale)',
+                     hue_order=schedulers, xticks=xticks, log=True)
+
+    # Splits the samples of each (scheduler, value) in one pass
+    samples = analysis.group_values(results, 'avg', ['Scheduler', variable])
+
+    # Description of results
+    print(f'- Result description: data distribution for {described[0]} and {described[1]} {plural} with different schedulers')
+    for sched in schedulers:
+        for value in described:
+            print(f'Scheduler {sched} with {value} {plural}')
+            print(samples[sched, value].describe())
+            print(' ')
+
+    # Distributions of the results
+    print('-- Checking the distribution of origin for different results')
+    print('   Kolmogorov-Smirnov test results with p-values < 0.05 mean that the results do not follow normal distributions')
+    # Checking all schedulers
+    np.random.seed(2022)
+    for sched in schedulers:
+        print(f'\nResuls for scheduler {sched}:')
+        for value in values:
+            res = list(samples[sched, value])
+            print(f'- {value} {plural}')
+            print(stats.kstest(res, 'norm', args=(np.mean(res), np.std(res))))
+
+    # Statistical comparison between MarCo and MarDecUn
+    # Using Mann-Whitney U test as results do not follow normal distributions some times (p-values < 0.05)
+    print(' ')
+    print('-- Comparing MarCo and MarDecUn. p-values < 0.05 indicate that the algorithms perform differently')
+    for value in values:
+        marco = list(samples['MarCo', value])
+        mardec = list(samples['MarDec', value])
+        print(f'Mann-Whitney U test - ({value} {plural}).')
+        print(stats.mannwhitneyu(marco, mardec, alternative='two-sided'))
+
 
 # ## Results with increasing numbers of tasks
 
 # In[ ]:
 
 
-# reads the result file
-results = pd.read_csv('results_of_timing_with_fixed_resources.csv', comment='#')
+# reads the result file and computes all aggregates in one pass
+tables = analysis.timing_tables('results_of_timing_with_fixed_resources.csv')
 print('Execution time analysis')
 print('- Results with increasing numbers of tasks (fixed resources)')
-results.head(9)
-
-
-# In[ ]:
-
 
 # checking the number of results versus the expected number of results
 expected_number = 10*6*1*20  # 10 numbers of tasks, 6 schedulers, 1 number of resources, 20 samples
-print(f'-- Number of results: {len(results)} (expected: {expected_number})')
-
-
-# In[ ]:
-
-
-# Transforming the values of all samples
-# Each sample contains the time of 5 repetitions
-# This transformation gives the average time of the 5 repetitions
-# and converts from seconds to us
-results['avg'] = results['Time']*1000000/5
-
-
-# In[ ]:
-
-
-print('-- Generating figure fig-time-fixed-resources.pdf for the results with a fixed number of resources')
-
-# Sets figure parameters
-plt.figure(figsize=(6,5))
-plt.rcParams['axes.titlesize'] = 13
-plt.rcParams['axes.labelsize'] = 13
-plt.rcParams['xtick.labelsize'] = 13
-plt.rcParams['ytick.labelsize'] = 13
-plt.rcParams['legend.fontsize'] = 12
-plt.xlabel('Number of tasks (T)', fontsize=13)
-plt.ylabel('Execution time (us, log scale)', fontsize=13)
-plt.xticks(range(200,2001,200))
-plt.xticks(rotation=15)
-
-ax = sns.lineplot(data=results[results.Resources == 100],
-                  x='Tasks',
-                  y='avg',
-                  hue='Scheduler',
-                  style='Scheduler',
-                  dashes=False,
-                  markers=True,
-                  linewidth=2,
-                  markersize=8,
-                  hue_order=schedulers)
+print(f'-- Number of results: {len(tables.results)} (expected: {expected_number})')
 
-plt.ylim(1, 100000000)
-plt.yticks([1, 10, 100, 1000, 10000, 100000, 1000000, 100000000])
-plt.yscale('log')
-
-sns.move_legend(ax, "lower center", bbox_to_anchor=(.5, 1), ncol=3, title=None, frameon=True)
-
-plt.savefig("fig-time-fixed-resources.pdf", bbox_inches='tight')
-
-
-# ### Description of results
-
-# In[ ]:
-
-
-print('- Result description: data distribution for 200 and 2000 tasks with different schedulers')
-for sched in schedulers:
-    for tasks in (200, 2000):
-        res = results[(results['Scheduler'] == sched) &
-                      (results['Tasks'] == tasks)].avg
-        print(f'Scheduler {sched} with {tasks} tasks')
-        print(res.describe())
-        print(' ')
-
-
-# ### Distributions of the results
-
-# In[ ]:
-
-
-print('-- Checking the distribution of origin for different results')
-print('   Kolmogorov-Smirnov test results with p-values < 0.05 mean that the results do not follow normal distributions')
-# Checking all schedulers
-np.random.seed(2022)
-for sched in schedulers:
-    print(f'\nResuls for scheduler {sched}:')
-    for tasks in range(200,2001,200):
-        res = list(results[(results['Scheduler'] == sched) &
-                           (results['Tasks'] == tasks)].avg)
-        print(f'- {tasks} tasks')
-        print(stats.kstest(res, 'norm', args=(np.mean(res), np.std(res))))
-
-
-# In[ ]:
-
-
-# Statistical comparison between MarCo and MarDecUn
-# Using Mann-Whitney U test as results do not follow normal distributions some times (p-values < 0.05)
-print(' ')
-print('-- Comparing MarCo and MarDecUn. p-values < 0.05 indicate that the algorithms perform differently')
-for tasks in range(200,2001,200):
-    marco = list(results[(results['Scheduler'] == 'MarCo') &
-                         (results['Tasks'] == tasks)].avg)
-    mardec = list(results[(results['Scheduler'] == 'MarDec') &
-                         (results['Tasks'] == tasks)].avg)
-    print(f'Mann-Whitney U test - ({tasks} tasks).')
-    print(stats.mannwhitneyu(marco, mardec, alternative='two-sided'))
+analyze(tables, 'Tasks', range(200,2001,200), (200, 2000),
+        'Number of tasks (T)', 'fixed-resources', range(200,2001,200))
 
 
 # MarCo and MarDec perform differently (p-values < 0.05).
@@ -157,115 +141,23 @@ for tasks in range(200,2001,200):
 # In[ ]:
 
 
-# reads the result file
-results = pd.read_csv('results_of_timing_with_fixed_tasks.csv', comment='#')
+# reads the result file and computes all aggregates in one pass
+tables = analysis.timing_tables('results_of_timing_with_fixed_tasks.csv')
 print('\n- Results with increasing numbers of resources (fixed tasks)')
-results.head(9)
-
-
-# In[ ]:
-
 
 # checking the number of results versus the expected number of results
 expected_number = 1*6*4*20  # 1 number of tasks, 6 schedulers, 4 numbers of resources, 20 samples
-print(f'-- Number of results: {len(results)} (expected: {expected_number})')
-
-
-# In[ ]:
-
-
-# Transforming the values of all samples
-# Each sample contains the time of 5 repetitions
-# This transformation gives the average time of the 5 repetitions
-# and converts from seconds to us
-results['avg'] = results['Time']*1000000/5
-
-
-# In[ ]:
-
-
-print('-- Generating figure fig-time-fixed-tasks.pdf for the results with a fixed number of tasks')
-
-# Sets figure parameters
-plt.figure(figsize=(6,5))
-plt.rcParams['axes.titlesize'] = 13
-plt.rcParams['axes.labelsize'] = 13
-plt.rcParams['xtick.labelsize'] = 13
-plt.rcParams['ytick.labelsize'] = 13
-plt.rcParams['legend.fontsize'] = 12
-plt.xlabel('Number of resources (n)', fontsize=13)
-plt.ylabel('Execution time (us, log scale)', fontsize=13)
-plt.xticks(range(20,81,20))
-plt.xticks(rotation=15)
+print(f'-- Number of results: {len(tables.results)} (expected: {expected_number})')
 
-ax = sns.lineplot(data=results[results.Tasks == 2000],
-                  x='Resources',
-                  y='avg',
-                  hue='Scheduler',
-                  style='Scheduler',
-                  dashes=False,
-                  markers=True,
-                  linewidth=2,
-                  markersize=8,
-                  hue_order=schedulers)
+analyze(tables, 'Resources', range(20,81,20), (20, 80),
+        'Number of resources (n)', 'fixed-tasks', range(20,81,20))
+print('\n')
 
-plt.ylim(1, 100000000)
-plt.yticks([1, 10, 100, 1000, 10000, 100000, 1000000, 100000000])
-plt.yscale('log')
 
-sns.move_legend(ax, "lower center", bbox_to_anchor=(.5, 1), ncol=3, title=None, frameon=True)
-
-plt.savefig("fig-time-fixed-tasks.pdf", bbox_inches='tight')
-
-
-# ### Description of results
-
-# In[ ]:
-
-
-print('- Result description: data distribution for 20 and 80 resources with different schedulers')
-for sched in schedulers:
-    for resources in (20, 80):
-        res = results[(results['Scheduler'] == sched) &
-                      (results['Resources'] == resources)].avg
-        print(f'Scheduler {sched} with {resources} resources')
-        print(res.describe())
-        print(' ')
-
-
-# ### Distributions of the results
-
-# In[ ]:
-
-
-print('-- Checking the distribution of origin for different results')
-print('   Kolmogorov-Smirnov test results with p-values < 0.05 mean that the results do not follow normal distributions')
-# Checking all schedulers
-np.random.seed(2022)
-for sched in schedulers:
-    print(f'\nResuls for scheduler {sched}:')
-    for resources in range(20,81,20):
-        res = list(results[(results['Scheduler'] == sched) &
-                           (results['Resources'] == resources)].avg)
-        print(f'- {resources} resources')
-        print(stats.kstest(res, 'norm', args=(np.mean(res), np.std(res))))
+# MarCo and MarDec perform differently (p-values < 0.05).
 
 
 # In[ ]:
 
 
-# Statistical comparison between MarCo and MarDecUn
-# Using Mann-Whitney U test as results do not follow normal distributions some times (p-values < 0.05)
-print(' ')
-print('-- Comparing MarCo and MarDecUn. p-values < 0.05 indicate that the algorithms perform differently')
-for resources in range(20,81,20):
-    marco = list(results[(results['Scheduler'] == 'MarCo') &
-                         (results['Resources'] == resources)].avg)
-    mardec = list(results[(results['Scheduler'] == 'MarDec') &
-                         (results['Resources'] == resources)].avg)
-    print(f'Mann-Whitney U test - ({resources} resources).')
-    print(stats.mannwhitneyu(marco, mardec, alternative='two-sided'))
-print('\n')    
-
-
-# MarCo and MarDec perform differently (p-values < 0.05).
+drawings.render()
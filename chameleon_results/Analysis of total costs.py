@@ -9,10 +9,17 @@
 # modules for the analysis
 import warnings
 warnings.filterwarnings('ignore')
-import pandas as pd
+import os
+import sys
 import seaborn as sns
-import matplotlib.pyplot as plt
-import numpy as np
+
+# makes the code folder available when running from the repository or
+# from a results folder
+here = os.path.dirname(os.path.abspath(__file__))
+for folder in (os.path.dirname(here), here):
+    if os.path.exists(os.path.join(folder, 'code', 'analysis.py')):
+        sys.path.insert(0, folder)
+import code.analysis as analysis
 
 sns.set_theme(style="whitegrid")
 
@@ -31,508 +38,84 @@ sns.set_palette(c_mc2mkp + c_marin + c_marco + c_mardec + c_fedavg)
 
 schedulers = ['(MC)2MKP', 'MarIn', 'MarCo', 'MarDec', 'FedAvg']
 
-
-# ## Results with random costs
-
-# In[ ]:
-
-
-# reads the result file
-results = pd.read_csv('results_with_random_costs.csv', comment='#')
-print('Total cost analysis')
-print('- Results with random costs')
-results.head(9)
-
-
-# In[ ]:
-
+# figures are rendered in parallel at the end (unchanged figures are skipped)
+drawings = analysis.FigureQueue()
 
 # checking the number of results versus the expected number of results
 expected_number = 41*5*2  # 41 numbers of tasks, 5 schedulers, 2 numbers of resources
-print(f'-- Number of results: {len(results)} (expected: {expected_number})')
-
-
-# In[ ]:
-
 
-print('-- Generating figures fig-random-10.pdf and fig-random-100.pdf')
-
-# Sets figure parameters
-plt.figure(figsize=(6,5))
-plt.rcParams['axes.titlesize'] = 13
-plt.rcParams['axes.labelsize'] = 13
-plt.rcParams['xtick.labelsize'] = 13
-plt.rcParams['ytick.labelsize'] = 13
-plt.rcParams['legend.fontsize'] = 12
-plt.xlabel('Number of tasks (T)', fontsize=13)
-plt.ylabel('Total cost (a.u.)', fontsize=13)
-plt.xticks(rotation=15)
-
-ax = sns.lineplot(data=results[results.Resources == 10],
-                  x='Tasks',
-                  y='Total Cost',
-                  hue='Scheduler',
-                  style='Scheduler',
-                  dashes=False,
-                  markers=True,
-                  linewidth=2,
-                  markersize=8)
-
-sns.move_legend(ax, "lower center", bbox_to_anchor=(.5, 1), ncol=3, title=None, frameon=True)
-
-plt.savefig("fig-random-10.pdf", bbox_inches='tight')
+# Experiments: (title, result file, figure name, schedulers, y limits for 10 and 100 resources)
+experiments = [
+    ('random costs', 'results_with_random_costs.csv', 'random',
+     schedulers, None, None),
+    ('increasing marginal costs', 'results_with_increasing_marginal_costs.csv', 'increasing',
+     schedulers, (0, 160000), (0, 120000)),
+    ('constant marginal costs', 'results_with_constant_marginal_costs.csv', 'constant',
+     schedulers, (0, 30000), (0, 30000)),
+    ('decreasing marginal costs', 'results_with_decreasing_marginal_costs.csv', 'decreasing',
+     schedulers, (0, 500), (0, 3000)),
+    ('constant marginal costs and no upper limits',
+     'results_with_constant_marginal_costs_no_upper_limit.csv', 'constant-no-u',
+     ['(MC)2MKP', 'MarIn', 'MarCo', 'MarDecUn', 'FedAvg'], (0, 30000), (0, 30000)),
+]
 
 
 # In[ ]:
 
 
-# Sets figure parameters
-plt.figure(figsize=(6,5))
-plt.rcParams['axes.titlesize'] = 13
-plt.rcParams['axes.labelsize'] = 13
-plt.rcParams['xtick.labelsize'] = 13
-plt.rcParams['ytick.labelsize'] = 13
-plt.rcParams['legend.fontsize'] = 12
-plt.xlabel('Number of tasks (T)', fontsize=13)
-plt.ylabel('Total cost (a.u.)', fontsize=13)
-plt.xticks(rotation=15)
+def figure_name(name, resources):
+    # the figures without upper limits have the suffix after the resources
+    if name.endswith('-no-u'):
+        return f'fig-{name[:-5]}-{resources}-no-u.pdf'
+    return f'fig-{name}-{resources}.pdf'
 
-ax = sns.lineplot(data=results[results.Resources == 100],
-                  x='Tasks',
-                  y='Total Cost',
-                  hue='Scheduler',
-                  style='Scheduler',
-                  dashes=False,
-                  markers=True,
-                  linewidth=2,
-                  markersize=8)
 
-sns.move_legend(ax, "lower center", bbox_to_anchor=(.5, 1), ncol=3, title=None, frameon=True)
+def join_names(names):
+    if len(names) == 2:
+        return ' and '.join(names)
+    return ', '.join(names[:-1]) + ', and ' + names[-1]
 
-plt.savefig("fig-random-100.pdf", bbox_inches='tight')
 
-
-# In[ ]:
-
-
-# Checking how many times other schedulers meet the performance of (MC)^2MKP
-print('-- Checking how many times other schedulers meet the performance of (MC)2MKP')
-mc2mkp_cost = results[results['Scheduler'] == '(MC)2MKP']['Total Cost'].reset_index(drop=True)
-for scheduler in schedulers[1:]:
-    other_cost = results[results['Scheduler'] == scheduler]['Total Cost'].reset_index(drop=True)
-    greater = np.sum(other_cost > mc2mkp_cost)
-    equal = np.sum(other_cost == mc2mkp_cost)
-    less = np.sum(other_cost < mc2mkp_cost)
-    print(f'Number of times {scheduler} provides a Total Cost that is greater, equal, or smaller than (MC)^2MKP: ' +
-          f'{greater}, {equal}, {less}.')
-
-
-# ---
-# ## Results with increasing marginal costs
-
-# In[ ]:
-
-
-# reads the result file
-results = pd.read_csv('results_with_increasing_marginal_costs.csv', comment='#')
-print('\n- Results with increasing marginal costs')
-results.head(9)
+def plot_costs(results, name, resources, ylim, hue_order):
+    drawings.add(analysis.plot_lines, results[results.Resources == resources],
+                 'Tasks', 'Total Cost',
+                 figure_name(name, resources),
+                 'Number of tasks (T)', 'Total cost (a.u.)',
+                 hue_order=hue_order, ylim=ylim)
 
 
 # In[ ]:
 
 
-print(f'-- Number of results: {len(results)} (expected: {expected_number})')
-
-
-# In[ ]:
-
-
-print('-- Generating figures fig-increasing-10.pdf and fig-increasing-100.pdf')
-
-# Sets figure parameters
-plt.figure(figsize=(6,5))
-plt.rcParams['axes.titlesize'] = 13
-plt.rcParams['axes.labelsize'] = 13
-plt.rcParams['xtick.labelsize'] = 13
-plt.rcParams['ytick.labelsize'] = 13
-plt.rcParams['legend.fontsize'] = 12
-plt.xlabel('Number of tasks (T)', fontsize=13)
-plt.ylabel('Total cost (a.u.)', fontsize=13)
-plt.xticks(rotation=15)
-plt.ylim(0, 160000)
-
-ax = sns.lineplot(data=results[results.Resources == 10],
-                  x='Tasks',
-                  y='Total Cost',
-                  hue='Scheduler',
-                  style='Scheduler',
-                  dashes=False,
-                  markers=True,
-                  linewidth=2,
-                  markersize=8)
-
-sns.move_legend(ax, "lower center", bbox_to_anchor=(.5, 1), ncol=3, title=None, frameon=True)
-
-plt.savefig("fig-increasing-10.pdf", bbox_inches='tight')
-
-
-# In[ ]:
-
-
-# Sets figure parameters
-plt.figure(figsize=(6,5))
-plt.rcParams['axes.titlesize'] = 13
-plt.rcParams['axes.labelsize'] = 13
-plt.rcParams['xtick.labelsize'] = 13
-plt.rcParams['ytick.labelsize'] = 13
-plt.rcParams['legend.fontsize'] = 12
-plt.xlabel('Number of tasks (T)', fontsize=13)
-plt.ylabel('Total cost (a.u.)', fontsize=13)
-plt.xticks(rotation=15)
-plt.ylim(0, 120000)
-
-ax = sns.lineplot(data=results[results.Resources == 100],
-                  x='Tasks',
-                  y='Total Cost',
-                  hue='Scheduler',
-                  style='Scheduler',
-                  dashes=False,
-                  markers=True,
-                  linewidth=2,
-                  markersize=8)
-
-sns.move_legend(ax, "lower center", bbox_to_anchor=(.5, 1), ncol=3, title=None, frameon=True)
-
-plt.savefig("fig-increasing-100.pdf", bbox_inches='tight')
-
-
-# In[ ]:
-
-
-# Checking how many times other schedulers meet the performance of (MC)^2MKP
-print('-- Checking how many times other schedulers meet the performance of (MC)2MKP')
-mc2mkp_cost = results[results['Scheduler'] == '(MC)2MKP']['Total Cost'].reset_index(drop=True)
-for scheduler in schedulers[1:]:
-    other_cost = results[results['Scheduler'] == scheduler]['Total Cost'].reset_index(drop=True)
-    greater = np.sum(other_cost > mc2mkp_cost)
-    equal = np.sum(other_cost == mc2mkp_cost)
-    less = np.sum(other_cost < mc2mkp_cost)
-    print(f'Number of times {scheduler} provides a Total Cost that is greater, equal, or smaller than (MC)^2MKP: ' +
-          f'{greater}, {equal}, {less}.')
-
-
-# ---
-# ## Results with constant marginal costs
-
-# In[ ]:
-
-
-# reads the result file
-results = pd.read_csv('results_with_constant_marginal_costs.csv', comment='#')
-print('\n- Results with constant marginal costs')
-results.head(9)
-
-
-# In[ ]:
-
-
-print(f'-- Number of results: {len(results)} (expected: {expected_number})')
-
-
-# In[ ]:
-
-
-print('-- Generating figures fig-constant-10.pdf and fig-constant-100.pdf')
-
-# Sets figure parameters
-plt.figure(figsize=(6,5))
-plt.rcParams['axes.titlesize'] = 13
-plt.rcParams['axes.labelsize'] = 13
-plt.rcParams['xtick.labelsize'] = 13
-plt.rcParams['ytick.labelsize'] = 13
-plt.rcParams['legend.fontsize'] = 12
-plt.xlabel('Number of tasks (T)', fontsize=13)
-plt.ylabel('Total cost (a.u.)', fontsize=13)
-plt.xticks(rotation=15)
-plt.ylim(0, 30000)
-
-ax = sns.lineplot(data=results[results.Resources == 10],
-                  x='Tasks',
-                  y='Total Cost',
-                  hue='Scheduler',
-                  style='Scheduler',
-                  dashes=False,
-                  markers=True,
-                  linewidth=2,
-                  markersize=8)
-
-sns.move_legend(ax, "lower center", bbox_to_anchor=(.5, 1), ncol=3, title=None, frameon=True)
-
-plt.savefig("fig-constant-10.pdf", bbox_inches='tight')
-
-
-# In[ ]:
-
-
-# Sets figure parameters
-plt.figure(figsize=(6,5))
-plt.rcParams['axes.titlesize'] = 13
-plt.rcParams['axes.labelsize'] = 13
-plt.rcParams['xtick.labelsize'] = 13
-plt.rcParams['ytick.labelsize'] = 13
-plt.rcParams['legend.fontsize'] = 12
-plt.xlabel('Number of tasks (T)', fontsize=13)
-plt.ylabel('Total cost (a.u.)', fontsize=13)
-plt.xticks(rotation=15)
-plt.ylim(0, 30000)
-
-ax = sns.lineplot(data=results[results.Resources == 100],
-                  x='Tasks',
-                  y='Total Cost',
-                  hue='Scheduler',
-                  style='Scheduler',
-                  dashes=False,
-                  markers=True,
-                  linewidth=2,
-                  markersize=8)
-
-sns.move_legend(ax, "lower center", bbox_to_anchor=(.5, 1), ncol=3, title=None, frameon=True)
-
-plt.savefig("fig-constant-100.pdf", bbox_inches='tight')
-
-
-# In[ ]:
-
-
-# Checking how many times other schedulers meet the performance of (MC)^2MKP
-print('-- Checking how many times other schedulers meet the performance of (MC)2MKP')
-mc2mkp_cost = results[results['Scheduler'] == '(MC)2MKP']['Total Cost'].reset_index(drop=True)
-for scheduler in schedulers[1:]:
-    other_cost = results[results['Scheduler'] == scheduler]['Total Cost'].reset_index(drop=True)
-    greater = np.sum(other_cost > mc2mkp_cost)
-    equal = np.sum(other_cost == mc2mkp_cost)
-    less = np.sum(other_cost < mc2mkp_cost)
-    print(f'Number of times {scheduler} provides a Total Cost that is greater, equal, or smaller than (MC)^2MKP: ' +
-          f'{greater}, {equal}, {less}.')
-
-
-# ---
-# ## Results with decreasing marginal costs
-
-# In[ ]:
-
-
-# reads the result file
-results = pd.read_csv('results_with_decreasing_marginal_costs.csv', comment='#')
-print('\n- Results with decreasing marginal costs')
-results.head(9)
-
-
-# In[ ]:
-
-
-print(f'-- Number of results: {len(results)} (expected: {expected_number})')
-
-
-# In[ ]:
-
-
-print('-- Generating figures fig-decreasing-10.pdf, fig-decreasing-100.pdf, and fig-decreasing-100-zoom.pdf')
-
-# Sets figure parameters
-plt.figure(figsize=(6,5))
-plt.rcParams['axes.titlesize'] = 13
-plt.rcParams['axes.labelsize'] = 13
-plt.rcParams['xtick.labelsize'] = 13
-plt.rcParams['ytick.labelsize'] = 13
-plt.rcParams['legend.fontsize'] = 12
-plt.xlabel('Number of tasks (T)', fontsize=13)
-plt.ylabel('Total cost (a.u.)', fontsize=13)
-plt.xticks(rotation=15)
-plt.ylim(0, 500)
-
-ax = sns.lineplot(data=results[results.Resources == 10],
-                  x='Tasks',
-                  y='Total Cost',
-                  hue='Scheduler',
-                  style='Scheduler',
-                  dashes=False,
-                  markers=True,
-                  linewidth=2,
-                  markersize=8)
-
-sns.move_legend(ax, "lower center", bbox_to_anchor=(.5, 1), ncol=3, title=None, frameon=True)
-
-plt.savefig("fig-decreasing-10.pdf", bbox_inches='tight')
-
-
-# In[ ]:
-
-
-# Sets figure parameters
-plt.figure(figsize=(6,5))
-plt.rcParams['axes.titlesize'] = 13
-plt.rcParams['axes.labelsize'] = 13
-plt.rcParams['xtick.labelsize'] = 13
-plt.rcParams['ytick.labelsize'] = 13
-plt.rcParams['legend.fontsize'] = 12
-plt.xlabel('Number of tasks (T)', fontsize=13)
-plt.ylabel('Total cost (a.u.)', fontsize=13)
-plt.xticks(rotation=15)
-plt.ylim(0, 3000)
-
-ax = sns.lineplot(data=results[results.Resources == 100],
-                  x='Tasks',
-                  y='Total Cost',
-                  hue='Scheduler',
-                  style='Scheduler',
-                  dashes=False,
-                  markers=True,
-                  linewidth=2,
-                  markersize=8)
-
-sns.move_legend(ax, "lower center", bbox_to_anchor=(.5, 1), ncol=3, title=None, frameon=True)
-
-plt.savefig("fig-decreasing-100.pdf", bbox_inches='tight')
-
-
-# In[ ]:
-
-
-# Sets figure parameters
-plt.figure(figsize=(6,5))
-plt.rcParams['axes.titlesize'] = 13
-plt.rcParams['axes.labelsize'] = 13
-plt.rcParams['xtick.labelsize'] = 13
-plt.rcParams['ytick.labelsize'] = 13
-plt.rcParams['legend.fontsize'] = 12
-plt.xlabel('Number of tasks (T)', fontsize=13)
-plt.ylabel('Total cost (a.u.)', fontsize=13)
-plt.xticks(rotation=15)
-plt.ylim(1465, 1472)
-
-ax = sns.lineplot(data=results[results.Resources == 100],
-                  x='Tasks',
-                  y='Total Cost',
-                  hue='Scheduler',
-                  style='Scheduler',
-                  dashes=False,
-                  markers=True,
-                  linewidth=2,
-                  markersize=8)
-
-sns.move_legend(ax, "lower center", bbox_to_anchor=(.5, 1), ncol=3, title=None, frameon=True)
-
-plt.savefig("fig-decreasing-100-zoom.pdf", bbox_inches='tight')
-
-
-# In[ ]:
-
-
-# Checking how many times other schedulers meet the performance of (MC)^2MKP
-print('-- Checking how many times other schedulers meet the performance of (MC)2MKP')
-mc2mkp_cost = results[results['Scheduler'] == '(MC)2MKP']['Total Cost'].reset_index(drop=True)
-for scheduler in schedulers[1:]:
-    other_cost = results[results['Scheduler'] == scheduler]['Total Cost'].reset_index(drop=True)
-    greater = np.sum(other_cost > mc2mkp_cost)
-    equal = np.sum(other_cost == mc2mkp_cost)
-    less = np.sum(other_cost < mc2mkp_cost)
-    print(f'Number of times {scheduler} provides a Total Cost that is greater, equal, or smaller than (MC)^2MKP: ' +
-          f'{greater}, {equal}, {less}.')
-
-
-# ---
-# ## Results with constant marginal costs and no upper limits
-
-# In[ ]:
-
-
-# reads the result file
-results = pd.read_csv('results_with_constant_marginal_costs_no_upper_limit.csv', comment='#')
-print('\n- Results with constant marginal costs and no upper limits')
-results.head(9)
-
-
-# In[ ]:
-
-
-print(f'-- Number of results: {len(results)} (expected: {expected_number})')
-
-
-# In[ ]:
-
-
-print('-- Generating figures fig-constant-10-no-u.pdf and fig-constant-100-no-u.pdf')
-
-# Sets figure parameters
-plt.figure(figsize=(6,5))
-plt.rcParams['axes.titlesize'] = 13
-plt.rcParams['axes.labelsize'] = 13
-plt.rcParams['xtick.labelsize'] = 13
-plt.rcParams['ytick.labelsize'] = 13
-plt.rcParams['legend.fontsize'] = 12
-plt.xlabel('Number of tasks (T)', fontsize=13)
-plt.ylabel('Total cost (a.u.)', fontsize=13)
-plt.xticks(rotation=15)
-plt.ylim(0, 30000)
-
-ax = sns.lineplot(data=results[results.Resources == 10],
-                  x='Tasks',
-                  y='Total Cost',
-                  hue='Scheduler',
-                  style='Scheduler',
-                  dashes=False,
-                  markers=True,
-                  linewidth=2,
-                  markersize=8)
-
-sns.move_legend(ax, "lower center", bbox_to_anchor=(.5, 1), ncol=3, title=None, frameon=True)
-
-plt.savefig("fig-constant-10-no-u.pdf", bbox_inches='tight')
-
-
-# In[ ]:
-
-
-# Sets figure parameters
-plt.figure(figsize=(6,5))
-plt.rcParams['axes.titlesize'] = 13
-plt.rcParams['axes.labelsize'] = 13
-plt.rcParams['xtick.labelsize'] = 13
-plt.rcParams['ytick.labelsize'] = 13
-plt.rcParams['legend.fontsize'] = 12
-plt.xlabel('Number of tasks (T)', fontsize=13)
-plt.ylabel('Total cost (a.u.)', fontsize=13)
-plt.xticks(rotation=15)
-plt.ylim(0, 30000)
-
-ax = sns.lineplot(data=results[results.Resources == 100],
-                  x='Tasks',
-                  y='Total Cost',
-                  hue='Scheduler',
-                  style='Scheduler',
-                  dashes=False,
-                  markers=True,
-                  linewidth=2,
-                  markersize=8)
+print('Total cost analysis')
+for title, filename, name, names, ylim_10, ylim_100 in experiments:
+    # reads the result file and computes all comparisons in one pass
+    tables = analysis.cost_tables(filename)
+    results = tables.results
+    print(('\n' if name != 'random' else '') + f'- Results with {title}')
+    print(f'-- Number of results: {len(results)} (expected: {expected_number})')
 
-sns.move_legend(ax, "lower center", bbox_to_anchor=(.5, 1), ncol=3, title=None, frameon=True)
+    figures = [figure_name(name, 10), figure_name(name, 100)]
+    if name == 'decreasing':
+        figures.append('fig-decreasing-100-zoom.pdf')
+    print(f'-- Generating figures {join_names(figures)}')
+    plot_costs(results, name, 10, ylim_10, names)
+    plot_costs(results, name, 100, ylim_100, names)
+    if name == 'decreasing':
+        drawings.add(analysis.plot_lines, results[results.Resources == 100],
+                     'Tasks', 'Total Cost', 'fig-decreasing-100-zoom.pdf',
+                     'Number of tasks (T)', 'Total cost (a.u.)',
+                     hue_order=names, ylim=(1465, 1472))
 
-plt.savefig("fig-constant-100-no-u.pdf", bbox_inches='tight')
+    # Checking how many times other schedulers meet the performance of (MC)^2MKP
+    print('-- Checking how many times other schedulers meet the performance of (MC)2MKP')
+    for scheduler in names[1:]:
+        greater, equal, less = tables.counts.loc[scheduler]
+        print(f'Number of times {scheduler} provides a Total Cost that is greater, equal, or smaller than (MC)^2MKP: ' +
+              f'{greater}, {equal}, {less}.')
 
 
 # In[ ]:
 
 
-# Checking how many times other schedulers meet the performance of (MC)^2MKP
-print('-- Checking how many times other schedulers meet the performance of (MC)2MKP')
-mc2mkp_cost = results[results['Scheduler'] == '(MC)2MKP']['Total Cost'].reset_index(drop=True)
-for scheduler in ['MarIn', 'MarCo', 'MarDecUn', 'FedAvg']:
-    other_cost = results[results['Scheduler'] == scheduler]['Total Cost'].reset_index(drop=True)
-    greater = np.sum(other_cost > mc2mkp_cost)
-    equal = np.sum(other_cost == mc2mkp_cost)
-    less = np.sum(other_cost < mc2mkp_cost)
-    print(f'Number of times {scheduler} provides a Total Cost that is greater, equal, or smaller than (MC)^2MKP: ' +
-          f'{greater}, {equal}, {less}.')
-
+drawings.render()
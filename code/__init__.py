@@ -1 +1,3 @@
-__all__ = ['schedulers', 'devices', 'support']
+__all__ = ['schedulers', 'devices', 'support', 'queues', 'benchmark',
+           'experiments', 'analysis', 'service', 'async_schedulers',
+           'bounds']
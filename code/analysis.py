@@ -0,0 +1,555 @@
+"""
+Module containing the analysis of the results of the experiments.
+"""
+
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import inspect
+import json
+import multiprocessing
+import os
+import sys
+import numpy as np
+
+from . import support
+
+
+# Tables computed for a file of timing results
+TimingTables = collections.namedtuple('TimingTables',
+                                      ['results', 'summary', 'speedups'])
+# Tables computed for a file of total cost results
+CostTables = collections.namedtuple('CostTables',
+                                    ['results', 'costs', 'normalized',
+                                     'counts'])
+
+
+@functools.lru_cache(maxsize=None)
+def _read(filename, modified):
+    return support.read_results(filename)
+
+
+def load_results(filename):
+    """
+    Reads a file of results once.
+
+    Parameters
+    ----------
+    filename : string
+        File of results (see support.read_results)
+
+    Returns
+    -------
+    pandas.DataFrame
+        Results (a copy that can be modified)
+
+    Notes
+    -----
+    Files are cached by name and modification time, so a file is read
+    again only after it changes.
+    """
+    return _read(filename, os.path.getmtime(filename)).copy()
+
+
+def average_times(
+        results,
+        repetitions=5
+        ):
+    """
+    Gives the average time of one execution in microseconds.
+
+    Parameters
+    ----------
+    results : pandas.DataFrame
+        Timing results (column 'Time' with the time of the repetitions
+        of each sample in seconds)
+    repetitions : int (default 5)
+        Number of executions in each sample
+
+    Returns
+    -------
+    pandas.DataFrame
+        Results with the new column 'avg'
+    """
+    return results.assign(avg=results['Time'] * 1000000 / repetitions)
+
+
+def summarize(
+        results,
+        value,
+        by=('Scheduler', 'Tasks', 'Resources'),
+        confidence=0.95
+        ):
+    """
+    Computes the statistics of a value for each group in one pass.
+
+    Parameters
+    ----------
+    results : pandas.DataFrame
+        Results
+    value : string
+        Column to summarize
+    by : tuple of strings (default ('Scheduler', 'Tasks', 'Resources'))
+        Columns defining the groups
+    confidence : float (default 0.95)
+        Confidence level of the intervals of the means
+
+    Returns
+    -------
+    pandas.DataFrame
+        One line per group with columns count, mean, std, min, median,
+        max, ci_low, and ci_high (Student's t interval of the mean)
+    """
+    from scipy import stats
+    table = results.groupby(list(by), sort=False)[value].agg(
+        ['count', 'mean', 'std', 'min', 'median', 'max']).reset_index()
+    t = stats.t.ppf((1 + confidence) / 2, np.maximum(table['count'] - 1, 1))
+    half_width = t * table['std'].fillna(0) / np.sqrt(table['count'])
+    table['ci_low'] = table['mean'] - half_width
+    table['ci_high'] = table['mean'] + half_width
+    return table
+
+
+def group_values(
+        results,
+        value,
+        by
+        ):
+    """
+    Splits the values of a column by group in one pass.
+
+    Parameters
+    ----------
+    results : pandas.DataFrame
+        Results
+    value : string
+        Column to split
+    by : list of strings
+        Columns defining the groups
+
+    Returns
+    -------
+    dict
+        pandas.Series of values indexed by the tuple of the group
+    """
+    return {key: values for key, values in
+            results.groupby(list(by), sort=False)[value]}
+
+
+def _pivot(data, index, columns, values, aggfunc='mean'):
+    """
+    Pivots a table with sorted rows and the columns in order of
+    appearance (e.g., the order of the schedulers in the results).
+
+    Notes
+    -----
+    pivot_table only accepts sort=False since pandas 1.3, so the
+    columns are reordered after pivoting.
+    """
+    table = data.pivot_table(index=index, columns=columns, values=values,
+                             aggfunc=aggfunc)
+    return table.reindex(columns=data[columns].unique())
+
+
+def speedups(
+        summary,
+        reference='(MC)2MKP'
+        ):
+    """
+    Computes the speedup of each scheduler over a reference.
+
+    Parameters
+    ----------
+    summary : pandas.DataFrame
+        Statistics of the execution times (see summarize)
+    reference : string (default '(MC)2MKP')
+        Reference scheduler
+
+    Returns
+    -------
+    pandas.DataFrame
+        Mean time of the reference divided by the mean time of each
+        scheduler, indexed by (Tasks, Resources)
+    """
+    means = _pivot(summary, ['Tasks', 'Resources'], 'Scheduler', 'mean')
+    return means.rdiv(means[reference], axis=0)
+
+
+def compare_costs(
+        results,
+        reference='(MC)2MKP'
+        ):
+    """
+    Compares the total cost of each scheduler to a reference.
+
+    Parameters
+    ----------
+    results : pandas.DataFrame
+        Total cost results
+    reference : string (default '(MC)2MKP')
+        Reference scheduler
+
+    Returns
+    -------
+    pandas.DataFrame
+        Total costs indexed by (Resources, Tasks), one column per
+        scheduler
+    pandas.DataFrame
+        Total costs divided by the cost of the reference
+    pandas.DataFrame
+        Number of times each scheduler has a total cost that is
+        greater, equal, or smaller than the reference
+    """
+    import pandas as pd
+    costs = _pivot(results, ['Resources', 'Tasks'], 'Scheduler',
+                   'Total Cost', aggfunc='first')
+    base = costs[reference]
+    normalized = costs.div(base, axis=0)
+    counts = pd.DataFrame({'greater': costs.gt(base, axis=0).sum(),
+                           'equal': costs.eq(base, axis=0).sum(),
+                           'smaller': costs.lt(base, axis=0).sum()})
+    return costs, normalized, counts
+
+
+@functools.lru_cache(maxsize=None)
+def _timing_tables(filename, modified, repetitions, reference):
+    results = average_times(_read(filename, modified), repetitions)
+    summary = summarize(results, 'avg')
+    return TimingTables(results, summary, speedups(summary, reference))
+
+
+def timing_tables(
+        filename,
+        repetitions=5,
+        reference='(MC)2MKP'
+        ):
+    """
+    Computes (once) the tables of a file of timing results.
+
+    Parameters
+    ----------
+    filename : string
+        File of timing results
+    repetitions : int (default 5)
+        Number of executions in each sample
+    reference : string (default '(MC)2MKP')
+        Reference scheduler of the speedups
+
+    Returns
+    -------
+    TimingTables
+        Results with average times in microseconds ('avg'), their
+        statistics per (scheduler, tasks, resources), and speedups
+
+    Notes
+    -----
+    Tables are cached until the file changes. They are shared by all
+    callers and should not be modified.
+    """
+    return _timing_tables(filename, os.path.getmtime(filename), repetitions,
+                          reference)
+
+
+@functools.lru_cache(maxsize=None)
+def _cost_tables(filename, modified, reference):
+    results = _read(filename, modified)
+    return CostTables(results, *compare_costs(results, reference))
+
+
+def cost_tables(
+        filename,
+        reference='(MC)2MKP'
+        ):
+    """
+    Computes (once) the tables of a file of total cost results.
+
+    Parameters
+    ----------
+    filename : string
+        File of total cost results
+    reference : string (default '(MC)2MKP')
+        Reference scheduler
+
+    Returns
+    -------
+    CostTables
+        Results, total costs per scheduler, costs normalized by the
+        reference, and counts of greater, equal, and smaller costs
+
+    Notes
+    -----
+    Tables are cached until the file changes. They are shared by all
+    callers and should not be modified.
+    """
+    return _cost_tables(filename, os.path.getmtime(filename), reference)
+
+
+def _no_error_bars(sns):
+    """
+    Gives the lineplot argument disabling error bars (errorbar=None
+    since seaborn 0.12, ci=None before).
+    """
+    version = tuple(int(part) for part in sns.__version__.split('.')[:2])
+    if version >= (0, 12):
+        return {'errorbar': None}
+    return {'ci': None}
+
+
+def plot_lines(
+        data,
+        x,
+        y,
+        filename,
+        xlabel,
+        ylabel,
+        hue_order=None,
+        xticks=None,
+        ylim=None,
+        yticks=None,
+        log=False,
+        band=None
+        ):
+    """
+    Draws one line per scheduler and saves the figure.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Table with one line per point (e.g., a summary)
+    x : string
+        Column of the x axis
+    y : string
+        Column of the y axis
+    filename : string
+        Name of the figure file
+    xlabel : string
+        Label of the x axis
+    ylabel : string
+        Label of the y axis
+    hue_order : list of strings or None (default None)
+        Order of the schedulers (default: order in the data)
+    xticks : list or None (default None)
+        Ticks of the x axis
+    ylim : tuple or None (default None)
+        Limits of the y axis
+    yticks : list or None (default None)
+        Ticks of the y axis
+    log : bool (default False)
+        True for a logarithmic y axis
+    band : tuple of strings or None (default None)
+        Columns with the lower and upper limits of a confidence band
+
+    Notes
+    -----
+    The figure follows the style of the original analysis scripts
+    (current seaborn palette, 6x5 inches, legend above the axes).
+    Bands come from precomputed columns, so no bootstrapping happens
+    while drawing.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    if hue_order is None:
+        hue_order = list(data['Scheduler'].unique())
+    palette = dict(zip(hue_order, sns.color_palette()))
+
+    # Sets figure parameters
+    plt.figure(figsize=(6, 5))
+    plt.rcParams['axes.titlesize'] = 13
+    plt.rcParams['axes.labelsize'] = 13
+    plt.rcParams['xtick.labelsize'] = 13
+    plt.rcParams['ytick.labelsize'] = 13
+    plt.rcParams['legend.fontsize'] = 12
+    plt.xlabel(xlabel, fontsize=13)
+    plt.ylabel(ylabel, fontsize=13)
+    if xticks is not None:
+        plt.xticks(xticks)
+    plt.xticks(rotation=15)
+    if ylim is not None:
+        plt.ylim(*ylim)
+
+    ax = sns.lineplot(data=data,
+                      x=x,
+                      y=y,
+                      hue='Scheduler',
+                      style='Scheduler',
+                      dashes=False,
+                      markers=True,
+                      linewidth=2,
+                      markersize=8,
+                      hue_order=hue_order,
+                      style_order=hue_order,
+                      palette=palette,
+                      **_no_error_bars(sns))
+    if band is not None:
+        for scheduler, lines in data.groupby('Scheduler', sort=False):
+            lines = lines.sort_values(x)
+            ax.fill_between(lines[x], lines[band[0]], lines[band[1]],
+                            color=palette[scheduler], alpha=0.2,
+                            linewidth=0)
+
+    if ylim is not None:
+        plt.ylim(*ylim)
+    if yticks is not None:
+        plt.yticks(yticks)
+    if log:
+        plt.yscale('log')
+
+    sns.move_legend(ax, 'lower center', bbox_to_anchor=(.5, 1), ncol=3,
+                    title=None, frameon=True)
+
+    plt.savefig(filename, bbox_inches='tight')
+    plt.close()
+
+
+def _digest(function, arguments):
+    """
+    Gives a hash of the content of a figure.
+
+    Parameters
+    ----------
+    function : callable
+        Function drawing the figure
+    arguments : dict
+        Arguments of the function
+
+    Returns
+    -------
+    string
+        Hexadecimal digest of the source of the function, its arguments
+        (data frames are hashed by content), and the matplotlib style
+    """
+    import pandas as pd
+    import matplotlib
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{function.__module__}.{function.__qualname__}'.encode())
+    try:
+        digest.update(inspect.getsource(function).encode())
+    except (OSError, TypeError):  # source not available
+        pass
+    # All style settings (e.g., colors, fonts, and sizes) except the
+    # backend, which does not change the files
+    for key in sorted(matplotlib.rcParams):
+        if not key.startswith('backend'):
+            digest.update(f'{key}={matplotlib.rcParams[key]!r}'.encode())
+    for name, value in sorted(arguments.items()):
+        digest.update(name.encode())
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr(list(value.columns)).encode())
+            digest.update(pd.util.hash_pandas_object(value).values.tobytes())
+        else:
+            digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+
+def _use_agg():
+    """
+    Switches matplotlib to the headless Agg backend.
+    """
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+
+
+def _draw(function, args, kwargs):
+    function(*args, **kwargs)
+
+
+class FigureQueue:
+    """
+    Figures to be rendered in parallel, skipping the unchanged ones.
+
+    Attributes
+    ----------
+    manifest : string
+        Name of the JSON file with the hash of each rendered figure
+    workers : int or None
+        Number of processes (default: one per CPU)
+    figures : list of tuples
+        (filename, digest, function, args, kwargs) of each figure
+
+    Notes
+    -----
+    A figure is drawn by calling function(*args, **kwargs), where the
+    function has a parameter named 'filename'. Its hash covers the
+    source of the function, its arguments (data frames by content), and
+    the matplotlib settings, so a figure is rendered again only when
+    its drawing code, data, or style change or when its file is
+    missing. Changes in the functions it calls are not detected. Each
+    figure is one task of a pool of processes using the Agg backend.
+    The pool needs the 'fork' start method (the analysis scripts are
+    not importable) and Python 3.7; figures are rendered serially
+    otherwise.
+    """
+
+    def __init__(self, manifest='figures.json', workers=None):
+        self.manifest = manifest
+        self.workers = workers
+        self.figures = []
+
+    def add(self, function, *args, **kwargs):
+        """
+        Queues a figure.
+
+        Parameters
+        ----------
+        function : callable
+            Function drawing the figure (e.g., plot_lines)
+        *args, **kwargs
+            Arguments of the function
+        """
+        arguments = inspect.signature(function).bind(*args, **kwargs)
+        filename = arguments.arguments['filename']
+        self.figures.append((filename,
+                             _digest(function, arguments.arguments),
+                             function, args, kwargs))
+
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest):
+            return {}
+        with open(self.manifest) as manifest_file:
+            return json.load(manifest_file)
+
+    def render(self):
+        """
+        Renders the figures that changed since they were last rendered.
+
+        Returns
+        -------
+        list of strings
+            Names of the rendered figures
+        """
+        hashes = self._read_manifest()
+        pending = [figure for figure in self.figures
+                   if hashes.get(figure[0]) != figure[1] or
+                   not os.path.exists(figure[0])]
+        self.figures = []
+        workers = self.workers
+        if workers is None:
+            workers = os.cpu_count()
+        workers = min(workers, len(pending))
+        if workers > 1 and sys.version_info >= (3, 7) and \
+                'fork' in multiprocessing.get_all_start_methods():
+            # Buffered output would otherwise be written again by each
+            # forked process
+            sys.stdout.flush()
+            sys.stderr.flush()
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('fork'),
+                    initializer=_use_agg) as executor:
+                tasks = [executor.submit(_draw, *figure[2:])
+                         for figure in pending]
+                for task in tasks:
+                    task.result()
+        elif pending:
+            _use_agg()
+            for figure in pending:
+                _draw(*figure[2:])
+
+        # Only figures that were rendered successfully reach the manifest
+        hashes.update((figure[0], figure[1]) for figure in pending)
+        temporary = self.manifest + '.tmp'
+        with open(temporary, 'w') as manifest_file:
+            json.dump(hashes, manifest_file, indent=1, sort_keys=True)
+        os.replace(temporary, self.manifest)
+        return [figure[0] for figure in pending]
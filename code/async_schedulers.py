@@ -0,0 +1,287 @@
+"""
+Module containing asyncio wrappers for the schedulers.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import multiprocessing
+import numpy as np
+
+from . import benchmark
+from . import support
+
+
+# Result of a call: the assignment and the scheduler that computed it
+Schedule = collections.namedtuple('Schedule', ['assignment', 'scheduler'])
+# Assignment published by the anytime scheduler
+Improvement = collections.namedtuple('Improvement',
+                                     ['assignment', 'scheduler', 'total_cost'])
+
+# Fast heuristics run first by the anytime scheduler
+ANYTIME_HEURISTICS = ('FedAvg', 'MarIn', 'MarCo', 'MarDecUn')
+# Slower schedulers refining the assignment, from fastest to optimal
+ANYTIME_REFINEMENTS = ('MarDec', '(MC)2MKP')
+
+
+def _run_and_send(connection, function, args):
+    """
+    Runs a scheduler in a child process and sends back its result.
+    """
+    try:
+        connection.send((True, function(*args)))
+    except BaseException as error:
+        connection.send((False, error))
+    finally:
+        connection.close()
+
+
+async def _run_in_process(function, args):
+    """
+    Runs a scheduler in a dedicated process that is terminated when the
+    call is cancelled.
+    """
+    loop = asyncio.get_event_loop()
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_run_and_send,
+                                      args=(sender, function, args),
+                                      daemon=True)
+    process.start()
+    sender.close()
+    try:
+        # recv blocks a helper thread, which is released by EOF when the
+        # process ends
+        succeeded, result = await loop.run_in_executor(None, receiver.recv)
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        receiver.close()
+    if not succeeded:
+        raise result
+    return result
+
+
+async def run_scheduler(
+        scheduler,
+        tasks,
+        resources,
+        cost,
+        lower_limit,
+        upper_limit,
+        executor=None
+        ):
+    """
+    Runs a scheduler without blocking the event loop.
+
+    Parameters
+    ----------
+    scheduler : string
+        Registered scheduler (see benchmark.SCHEDULERS)
+    tasks : int
+        Number of tasks (tau)
+    resources : int
+        Number of resources (R)
+    cost : np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource (C)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+    executor : None, 'thread', 'process', or concurrent.futures.Executor
+        Where the scheduler runs: the loop's default thread pool (None
+        or 'thread'), a dedicated process ('process'), or an executor
+
+    Returns
+    -------
+    np.array(shape=(resources))
+        Assignment of tasks to resources
+
+    Raises
+    ------
+    ValueError
+        If the scheduler or the executor is unknown
+
+    Notes
+    -----
+    Cancelling the call stops a scheduler running in a dedicated
+    process. Executors can only drop calls that have not started, so a
+    scheduler already running in a thread or in a pool finishes in the
+    background and its result is discarded.
+    """
+    if scheduler not in benchmark.SCHEDULERS:
+        raise ValueError(f'Unknown scheduler {scheduler}')
+    function = benchmark.SCHEDULERS[scheduler]
+    args = (tasks, resources, cost, lower_limit, upper_limit)
+    if executor == 'process':
+        return await _run_in_process(function, args)
+    if executor == 'thread':
+        executor = None
+    elif executor is not None and \
+            not isinstance(executor, concurrent.futures.Executor):
+        raise ValueError(f'Unknown executor {executor}')
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor, function, *args)
+
+
+async def schedule(
+        tasks,
+        resources,
+        cost,
+        lower_limit,
+        upper_limit,
+        scheduler='(MC)2MKP',
+        executor=None,
+        timeout=None,
+        fallback='MarIn'
+        ):
+    """
+    Finds an assignment of tasks to resources before a deadline.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    resources : int
+        Number of resources (R)
+    cost : np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource (C)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+    scheduler : string (default '(MC)2MKP')
+        Registered scheduler (see benchmark.SCHEDULERS)
+    executor : None, 'thread', 'process', or concurrent.futures.Executor
+        Where the scheduler runs (see run_scheduler)
+    timeout : float or None (default None)
+        Seconds until the deadline (None for no deadline)
+    fallback : string (default 'MarIn')
+        Registered scheduler used when the deadline expires
+
+    Returns
+    -------
+    Schedule
+        Assignment of tasks to resources and the name of the scheduler
+        that computed it
+
+    Notes
+    -----
+    When the deadline expires, the call to the scheduler is cancelled
+    (see run_scheduler) and the fallback runs in the event loop. It
+    should be a fast heuristic: MarIn takes about 20 ms for 100
+    resources and 10000 tasks.
+    """
+    if fallback not in benchmark.SCHEDULERS:
+        raise ValueError(f'Unknown scheduler {fallback}')
+    call = run_scheduler(scheduler, tasks, resources, cost, lower_limit,
+                         upper_limit, executor)
+    try:
+        assignment = await asyncio.wait_for(call, timeout)
+    except asyncio.TimeoutError:
+        assignment = benchmark.SCHEDULERS[fallback](
+            tasks, resources, cost, lower_limit, upper_limit)
+        return Schedule(assignment, fallback)
+    return Schedule(assignment, scheduler)
+
+
+async def anytime(
+        tasks,
+        resources,
+        cost,
+        lower_limit,
+        upper_limit,
+        budget,
+        callback=None,
+        executor=None,
+        heuristics=ANYTIME_HEURISTICS,
+        refinements=ANYTIME_REFINEMENTS
+        ):
+    """
+    Finds the best assignment of tasks to resources within a time budget.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    resources : int
+        Number of resources (R)
+    cost : np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource (C)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+    budget : float
+        Seconds available to find an assignment
+    callback : callable or None (default None)
+        Called with each Improvement (assignment, scheduler, total cost)
+        that is better than the previous ones
+    executor : None, 'thread', 'process', or concurrent.futures.Executor
+        Where the refinements run (see run_scheduler)
+    heuristics : tuple of strings (default ANYTIME_HEURISTICS)
+        Registered schedulers run first, in the event loop
+    refinements : tuple of strings (default ANYTIME_REFINEMENTS)
+        Registered schedulers run next, one after the other, while the
+        budget lasts
+
+    Returns
+    -------
+    Improvement
+        Best assignment found
+
+    Raises
+    ------
+    ValueError
+        If no scheduler finds an assignment respecting the limits
+
+    Notes
+    -----
+    The heuristics take microseconds to milliseconds, so a first
+    assignment is available almost immediately. Assignments that do
+    not respect the limits (e.g., from FedAvg or MarDecUn) and
+    schedulers that fail are skipped. The last refinement running when
+    the budget expires is cancelled (see run_scheduler). (MC)^2MKP is
+    optimal, so there is nothing left to refine after it finishes.
+    """
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + budget
+    best = None
+
+    def offer(scheduler, assignment):
+        nonlocal best
+        assignment = np.asarray(assignment)
+        if not (support.check_limits(assignment, lower_limit, upper_limit)
+                and support.check_total_assigned(tasks, assignment)):
+            return
+        total_cost = support.get_total_cost(cost, assignment)
+        if best is None or total_cost < best.total_cost:
+            best = Improvement(assignment, scheduler, total_cost)
+            if callback is not None:
+                callback(best)
+
+    for scheduler in heuristics:
+        try:
+            assignment = benchmark.SCHEDULERS[scheduler](
+                tasks, resources, cost, lower_limit, upper_limit)
+        except Exception:
+            continue
+        # Errors of the callback reach the caller
+        offer(scheduler, assignment)
+    for scheduler in refinements:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            assignment = await asyncio.wait_for(
+                run_scheduler(scheduler, tasks, resources, cost, lower_limit,
+                              upper_limit, executor), remaining)
+        except asyncio.TimeoutError:
+            break
+        except Exception:
+            continue
+        offer(scheduler, assignment)
+    if best is None:
+        raise ValueError('No scheduler found an assignment respecting' +
+                         ' the limits')
+    return best
@@ -0,0 +1,686 @@
+"""
+Module containing a benchmark suite for the schedulers.
+"""
+
+import collections
+import functools
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from . import devices
+from . import schedulers
+
+
+# Schedulers (and backends) that can be benchmarked. All of them are
+# called as function(tasks, resources, cost, lower_limit, upper_limit)
+SCHEDULERS = {}
+# Functions filling a row of the Cost matrix (see code.devices)
+COST_FAMILIES = {}
+# Functions giving the (lower_limit, upper_limit) of an instance
+LIMIT_POLICIES = {}
+
+# One benchmark case
+Case = collections.namedtuple('Case', ['scheduler', 'tasks', 'resources',
+                                       'cost_family', 'limit_policy'])
+
+
+def register_scheduler(name, function):
+    """
+    Registers a scheduler to be benchmarked.
+
+    Parameters
+    ----------
+    name : string
+        Name of the scheduler in the results
+    function : callable
+        Function called as function(tasks, resources, cost,
+        lower_limit, upper_limit)
+    """
+    SCHEDULERS[name] = function
+
+
+def register_cost_family(name, function):
+    """
+    Registers a family of cost functions.
+
+    Parameters
+    ----------
+    name : string
+        Name of the family in the results
+    function : callable
+        Function called as function(rng_seed, matrix, index, tau) that
+        fills a row of the Cost matrix
+    """
+    COST_FAMILIES[name] = function
+
+
+def register_limit_policy(name, function):
+    """
+    Registers a policy for the lower and upper limits of the resources.
+
+    Parameters
+    ----------
+    name : string
+        Name of the policy in the results
+    function : callable
+        Function called as function(tasks, resources) returning the
+        lower and upper limit arrays
+    """
+    LIMIT_POLICIES[name] = function
+
+
+def _mardecun(tasks, resources, cost, lower_limit, upper_limit):
+    return schedulers.mardecun(tasks, resources, cost, lower_limit)
+
+
+def _fedavg(tasks, resources, cost, lower_limit, upper_limit):
+    return schedulers.fedavg(tasks, resources)
+
+
+def _create_integer_linear_costs(rng_seed, matrix, index, tau):
+    devices.create_linear_costs(rng_seed, matrix, index, tau)
+    matrix[index] = np.round(matrix[index])
+
+
+def half_limited(tasks, resources):
+    """
+    Gives a lower limit of 1 to all resources, no upper limit to the
+    first half of the resources, and an upper limit of
+    2*(tasks/resources) to the second half.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    resources : int
+        Number of resources (R)
+
+    Returns
+    -------
+    np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+    """
+    lower_limit = np.full(shape=resources, fill_value=1, dtype=int)
+    upper_limit = np.full(shape=resources, fill_value=tasks, dtype=int)
+    np.put(upper_limit, np.arange(resources//2, resources),
+           2*(tasks//resources))
+    return lower_limit, upper_limit
+
+
+def unlimited(tasks, resources):
+    """
+    Gives a lower limit of 1 and no upper limit to all resources.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    resources : int
+        Number of resources (R)
+
+    Returns
+    -------
+    np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+    """
+    lower_limit = np.full(shape=resources, fill_value=1, dtype=int)
+    upper_limit = np.full(shape=resources, fill_value=tasks, dtype=int)
+    return lower_limit, upper_limit
+
+
+register_scheduler('(MC)2MKP', schedulers.mc2mkp)
+register_scheduler('MarIn', schedulers.marin)
+register_scheduler('MarCo', schedulers.marco)
+register_scheduler('MarDecUn', _mardecun)
+register_scheduler('MarDec', schedulers.mardec)
+register_scheduler('MarDec-sparse', functools.partial(schedulers.mardec, sparse=True))
+register_scheduler('FedAvg', _fedavg)
+register_scheduler('(MC)2MKP-hull', schedulers.mc2mkp_hull)
+register_scheduler('Dispatch', schedulers.dispatch)
+register_scheduler('MarIn-bulk', functools.partial(schedulers.marin, bulk=True))
+register_scheduler('MarIn-heapq', functools.partial(schedulers.marin, queue='heapq'))
+register_scheduler('MarIn-bucket', functools.partial(schedulers.marin, queue='bucket'))
+register_scheduler('MarIn-batch', functools.partial(schedulers.marin, queue='batch'))
+register_scheduler('MarCo-heapq', functools.partial(schedulers.marco, queue='heapq'))
+register_scheduler('MarCo-bucket', functools.partial(schedulers.marco, queue='bucket'))
+register_scheduler('MarCo-batch', functools.partial(schedulers.marco, queue='batch'))
+
+register_cost_family('linear', devices.create_linear_costs)
+register_cost_family('integer-linear', _create_integer_linear_costs)
+register_cost_family('quadratic', devices.create_quadratic_costs)
+register_cost_family('nlogn', devices.create_nlogn_costs)
+register_cost_family('logn', devices.create_logn_costs)
+register_cost_family('recursive', devices.create_recursive_costs)
+register_cost_family('random', devices.create_random_costs)
+
+register_limit_policy('half-limited', half_limited)
+register_limit_policy('unlimited', unlimited)
+
+
+def expand_cases(
+        scheduler_names,
+        tasks,
+        resources,
+        cost_families=('linear',),
+        limit_policies=('half-limited',)
+        ):
+    """
+    Expands the parameter grid into a list of cases.
+
+    Parameters
+    ----------
+    scheduler_names : list of strings
+        Registered schedulers
+    tasks : iterable of int
+        Numbers of tasks
+    resources : iterable of int
+        Numbers of resources
+    cost_families : iterable of strings (default ('linear',))
+        Registered cost families
+    limit_policies : iterable of strings (default ('half-limited',))
+        Registered limit policies
+
+    Returns
+    -------
+    list of Case
+        All combinations of the parameters
+    """
+    cases = [Case(*values) for values in
+             itertools.product(scheduler_names, tasks, resources,
+                               cost_families, limit_policies)]
+    for case in cases:
+        if case.scheduler not in SCHEDULERS:
+            raise ValueError(f'Unknown scheduler {case.scheduler}')
+        if case.cost_family not in COST_FAMILIES:
+            raise ValueError(f'Unknown cost family {case.cost_family}')
+        if case.limit_policy not in LIMIT_POLICIES:
+            raise ValueError(f'Unknown limit policy {case.limit_policy}')
+    return cases
+
+
+@functools.lru_cache(maxsize=8)
+def prepare_instance(
+        tasks,
+        resources,
+        cost_family,
+        limit_policy,
+        rng_seed=0
+        ):
+    """
+    Generates the costs and limits of an instance.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    resources : int
+        Number of resources (R)
+    cost_family : string
+        Registered cost family
+    limit_policy : string
+        Registered limit policy
+    rng_seed : int (default 0)
+        Seed of the first resource (resource i uses rng_seed + i)
+
+    Returns
+    -------
+    np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource (C)
+    np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+
+    Notes
+    -----
+    The last 8 instances are cached, so cases of the same instance
+    share their arrays without keeping a whole grid of instances in
+    memory. The arrays are read-only to keep them unchanged.
+    """
+    cost = np.zeros(shape=(resources, tasks+1))
+    for i in range(resources):
+        COST_FAMILIES[cost_family](rng_seed + i, cost, i, tasks)
+    lower_limit, upper_limit = LIMIT_POLICIES[limit_policy](tasks, resources)
+    for array in (cost, lower_limit, upper_limit):
+        array.setflags(write=False)
+    return cost, lower_limit, upper_limit
+
+
+def time_case(
+        case,
+        repetitions,
+        rng_seed=0
+        ):
+    """
+    Times the repetitions of a case one by one.
+
+    Parameters
+    ----------
+    case : Case
+        Case to run
+    repetitions : int
+        Number of executions
+    rng_seed : int (default 0)
+        Seed of the first resource of the instance
+
+    Returns
+    -------
+    list of float
+        Time of each execution in seconds
+    """
+    function = SCHEDULERS[case.scheduler]
+    cost, lower_limit, upper_limit = prepare_instance(
+        case.tasks, case.resources, case.cost_family, case.limit_policy,
+        rng_seed)
+    times = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        function(case.tasks, case.resources, cost, lower_limit, upper_limit)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _max_rss():
+    """
+    Gives the resident set size high-water mark of the process in bytes.
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB on Linux
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _measure_rss(connection, function, args):
+    """
+    Runs a call in a forked process and sends back how much it raised
+    the resident set size high-water mark of the process.
+    """
+    try:
+        before = _max_rss()
+        function(*args)
+        connection.send(_max_rss() - before)
+    except BaseException:
+        connection.send(None)
+    finally:
+        connection.close()
+
+
+def peak_rss(function, args):
+    """
+    Measures the resident memory needed by a call.
+
+    Parameters
+    ----------
+    function : callable
+        Function to call
+    args : tuple
+        Arguments of the call
+
+    Returns
+    -------
+    int or None
+        Growth of the peak resident set size during the call in bytes
+        (None if it cannot be measured on this platform)
+
+    Notes
+    -----
+    The call runs in a forked process, which starts with the high-water
+    mark of the current process, so the growth belongs to the call only
+    and previous calls do not hide it.
+    """
+    if resource is None or \
+            'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_measure_rss,
+                              args=(sender, function, args))
+    process.start()
+    sender.close()
+    try:
+        return receiver.recv()
+    except EOFError:  # the process died
+        return None
+    finally:
+        process.join()
+        receiver.close()
+
+
+def profile_memory(
+        case,
+        rng_seed=0
+        ):
+    """
+    Measures the memory used by one execution of a case.
+
+    Parameters
+    ----------
+    case : Case
+        Case to run
+    rng_seed : int (default 0)
+        Seed of the first resource of the instance
+
+    Returns
+    -------
+    dict
+        'Peak RSS': growth of the peak resident set size during the
+        execution in bytes (see peak_rss), 'Traced Peak': peak of memory
+        allocated during the execution in bytes (tracemalloc), and
+        'Allocated Blocks': number of memory blocks allocated during the
+        execution and still alive at its end
+
+    Notes
+    -----
+    The case runs twice: once in a forked process for the peak RSS,
+    and once under tracemalloc. Its traces are cleared before the
+    execution so that its peak only covers it. If the caller was
+    already tracing, tracing stays on, but the traces of earlier
+    allocations are lost. tracemalloc slows the execution
+    down, so memory is never measured in timed executions.
+    """
+    function = SCHEDULERS[case.scheduler]
+    cost, lower_limit, upper_limit = prepare_instance(
+        case.tasks, case.resources, case.cost_family, case.limit_policy,
+        rng_seed)
+    args = (case.tasks, case.resources, cost, lower_limit, upper_limit)
+    rss = peak_rss(function, args)
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        # Resets the traces and the peak of the caller's tracing
+        tracemalloc.clear_traces()
+    else:
+        tracemalloc.start()
+    try:
+        assignment = function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    blocks = sum(stat.count for stat in after.statistics('lineno'))
+    del assignment
+    return {'Peak RSS': rss,
+            'Traced Peak': peak,
+            'Allocated Blocks': blocks}
+
+
+def summarize(times):
+    """
+    Computes summary statistics of a list of timings.
+
+    Parameters
+    ----------
+    times : list of float
+        Timings in seconds
+
+    Returns
+    -------
+    dict
+        Median, interquartile range, minimum, and number of timings
+    """
+    q1, median, q3 = np.percentile(times, [25, 50, 75])
+    return {'median': float(median),
+            'iqr': float(q3 - q1),
+            'min': float(np.min(times)),
+            'count': len(times)}
+
+
+def machine_metadata():
+    """
+    Describes the machine and software running the benchmark.
+
+    Returns
+    -------
+    dict
+        Platform, processor, Python and numpy versions, and timer
+    """
+    return {'hostname': platform.node(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'timer_resolution': time.get_clock_info('perf_counter').resolution,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S%z')}
+
+
+def run_suite(
+        cases,
+        samples=20,
+        repetitions=5,
+        warmup=1,
+        shuffle_seed=0,
+        rng_seed=0,
+        callback=None,
+        memory=False,
+        verbose=False
+        ):
+    """
+    Runs all cases of a benchmark.
+
+    Parameters
+    ----------
+    cases : list of Case
+        Cases to run
+    samples : int (default 20)
+        Number of samples per case
+    repetitions : int (default 5)
+        Number of timed executions per sample
+    warmup : int (default 1)
+        Number of untimed executions per case before sampling
+    shuffle_seed : int (default 0)
+        Initial RNG seed used to shuffle the cases in each sample
+        (increased for every sample)
+    rng_seed : int (default 0)
+        Seed of the first resource of the instances
+    callback : callable (default None)
+        Function called as callback(case, times, memory) after each
+        sample (memory is the result of profile_memory for the case,
+        or None)
+    memory : boolean (default False)
+        True if the memory of each case should be profiled once
+        (see profile_memory)
+    verbose : boolean (default False)
+        True if progress should be printed
+
+    Returns
+    -------
+    dict
+        Report with the machine metadata, the settings, and the
+        timings, summary statistics, and memory of each case
+    """
+    # Setup and warm-up
+    profiles = {}
+    for case in cases:
+        prepare_instance(case.tasks, case.resources, case.cost_family,
+                         case.limit_policy, rng_seed)
+        if warmup > 0:
+            time_case(case, warmup, rng_seed)
+        profiles[case] = profile_memory(case, rng_seed) if memory else None
+    timings = {case: [] for case in cases}
+    for sample in range(samples):
+        if verbose:
+            print(f'- Sample {sample+1} of {samples}')
+        # Runs the cases in a random order in each sample
+        np.random.seed(shuffle_seed + sample)
+        order = np.random.permutation(len(cases))
+        for i in order:
+            times = time_case(cases[i], repetitions, rng_seed)
+            timings[cases[i]].append(times)
+            if callback is not None:
+                callback(cases[i], times, profiles[cases[i]])
+    # Releases the cached instances
+    prepare_instance.cache_clear()
+    results = []
+    for case in cases:
+        result = case._asdict()
+        result['samples'] = timings[case]
+        result.update(summarize(list(itertools.chain(*timings[case]))))
+        if memory:
+            result['memory'] = profiles[case]
+        results.append(result)
+    return {'metadata': machine_metadata(),
+            'settings': {'samples': samples,
+                         'repetitions': repetitions,
+                         'warmup': warmup,
+                         'shuffle_seed': shuffle_seed,
+                         'rng_seed': rng_seed,
+                         'memory': memory},
+            'results': results}
+
+
+def write_json(report, filename):
+    """
+    Writes a benchmark report to a JSON file.
+
+    Parameters
+    ----------
+    report : dict
+        Report returned by run_suite
+    filename : string
+        Name of the file to write
+    """
+    with open(filename, 'w') as jsonfile:
+        json.dump(report, jsonfile, indent=1, default=int)
+
+
+def load_timings(filename):
+    """
+    Loads the timing samples of a campaign.
+
+    Parameters
+    ----------
+    filename : string
+        CSV file with columns Scheduler, Tasks, Resources, and Time
+        (lines starting with # are ignored) or JSON report written by
+        write_json
+
+    Returns
+    -------
+    dict
+        Times of the samples (np.array) indexed by
+        (scheduler, tasks, resources)
+
+    Notes
+    -----
+    Each sample of a JSON report is reduced to the sum of its
+    executions, which is the Time stored in the CSV files.
+    """
+    timings = collections.defaultdict(list)
+    if filename.endswith('.json'):
+        with open(filename) as jsonfile:
+            report = json.load(jsonfile)
+        for result in report['results']:
+            key = (result['scheduler'], result['tasks'], result['resources'])
+            timings[key].extend(sum(times) for times in result['samples'])
+    else:
+        with open(filename) as csvfile:
+            lines = [line for line in csvfile
+                     if line.strip() and not line.startswith('#')]
+        columns = lines[0].strip().split(',')
+        for line in lines[1:]:
+            row = dict(zip(columns, line.strip().split(',')))
+            key = (row['Scheduler'], int(row['Tasks']), int(row['Resources']))
+            timings[key].append(float(row['Time']))
+    return {key: np.array(times) for key, times in timings.items()}
+
+
+def compare_timings(
+        baseline,
+        candidate,
+        threshold=0.1,
+        method='bootstrap',
+        alpha=0.05,
+        resamples=10000,
+        rng_seed=0
+        ):
+    """
+    Compares the samples of two campaigns for each case.
+
+    Parameters
+    ----------
+    baseline : dict
+        Samples of the reference campaign (see load_timings)
+    candidate : dict
+        Samples of the new campaign (see load_timings)
+    threshold : float (default 0.1)
+        Relative change of the median considered relevant (0.1 = 10%)
+    method : string (default 'bootstrap')
+        'bootstrap' for a confidence interval on the ratio of medians,
+        or 'mannwhitney' for a Mann-Whitney U test (requires scipy)
+    alpha : float (default 0.05)
+        Significance level
+    resamples : int (default 10000)
+        Number of bootstrap resamples
+    rng_seed : int (default 0)
+        Seed to the random number generator used for bootstrapping
+
+    Returns
+    -------
+    list of dict
+        Comparison of each case present in both campaigns, with the
+        medians, their ratio (candidate / baseline), the confidence
+        interval or p-value, and a verdict ('regression',
+        'improvement', or 'unchanged')
+
+    Notes
+    -----
+    A case is a regression if its median grew by more than the
+    threshold and the difference is significant: the whole confidence
+    interval of the ratio is above 1 + threshold (bootstrap), or the
+    one-sided Mann-Whitney U test rejects equal distributions.
+    Improvements are detected symmetrically.
+    """
+    rng = np.random.default_rng(rng_seed)
+    comparisons = []
+    for key in sorted(set(baseline) & set(candidate)):
+        old, new = baseline[key], candidate[key]
+        ratio = np.median(new) / np.median(old)
+        comparison = {'scheduler': key[0], 'tasks': key[1],
+                      'resources': key[2],
+                      'baseline': float(np.median(old)),
+                      'candidate': float(np.median(new)),
+                      'ratio': float(ratio)}
+        if method == 'bootstrap':
+            # Medians of all resamples computed at once
+            old_medians = np.median(rng.choice(old, (resamples, old.size)),
+                                    axis=1)
+            new_medians = np.median(rng.choice(new, (resamples, new.size)),
+                                    axis=1)
+            low, high = np.percentile(new_medians / old_medians,
+                                      [100*alpha/2, 100*(1 - alpha/2)])
+            comparison['low'], comparison['high'] = float(low), float(high)
+            slower = low > 1 + threshold
+            faster = high < 1 / (1 + threshold)
+        elif method == 'mannwhitney':
+            from scipy import stats
+            slower_p = stats.mannwhitneyu(new, old, alternative='greater').pvalue
+            faster_p = stats.mannwhitneyu(new, old, alternative='less').pvalue
+            comparison['p-value'] = float(min(slower_p, faster_p))
+            slower = slower_p < alpha and ratio > 1 + threshold
+            faster = faster_p < alpha and ratio < 1 / (1 + threshold)
+        else:
+            raise ValueError(f'Unknown comparison method {method}')
+        if slower:
+            comparison['verdict'] = 'regression'
+        elif faster:
+            comparison['verdict'] = 'improvement'
+        else:
+            comparison['verdict'] = 'unchanged'
+        comparisons.append(comparison)
+    return comparisons
@@ -0,0 +1,348 @@
+"""
+Module containing lower bounds for the total cost of the schedules.
+"""
+
+import numpy as np
+
+
+def lower_hulls(
+        cost,
+        lower_limit,
+        upper_limit
+        ):
+    """
+    Computes the lower convex hull of the cost function of each resource.
+
+    Parameters
+    ----------
+    cost : np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource (C)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+
+    Returns
+    -------
+    np.ndarray(shape=(resources, max(upper_limit)+1))
+        Largest convex function below the costs of each resource within
+        its limits (infinite outside them)
+
+    Notes
+    -----
+    The hulls are found with Andrew's monotone chain, visiting the
+    numbers of tasks once and updating the stacks of vertices of all
+    resources together. Each vertex is pushed and popped at most once,
+    so the work is O(tasks) per resource.
+    """
+    lower_limit = np.asarray(lower_limit)
+    upper_limit = np.asarray(upper_limit)
+    resources = len(lower_limit)
+    width = np.max(upper_limit) + 1
+    rows = np.arange(resources)
+    # Stacks of the vertices (numbers of tasks) of each hull
+    stack = np.zeros((resources, width), dtype=int)
+    size = np.zeros(resources, dtype=int)
+    for j in range(np.min(lower_limit), width):
+        active = (lower_limit <= j) & (j <= upper_limit)
+        while True:
+            # Removes the last vertex when it is not below the segment
+            # between the previous vertex and the new point (costs
+            # outside the limits may be infinite and are ignored)
+            check = active & (size >= 2)
+            a = stack[rows, np.maximum(size - 2, 0)]
+            b = stack[rows, np.maximum(size - 1, 0)]
+            with np.errstate(invalid='ignore'):
+                pop = check & ((cost[rows, b] - cost[rows, a]) * (j - a) >=
+                               (cost[:, j] - cost[rows, a]) * (b - a))
+            if not np.any(pop):
+                break
+            size[pop] -= 1
+        stack[active, size[active]] = j
+        size[active] += 1
+    # Evaluates the hulls at all numbers of tasks within the limits
+    hull = np.full((resources, width), np.inf)
+    for i in range(resources):
+        vertices = stack[i, :size[i]]
+        x = np.arange(lower_limit[i], upper_limit[i]+1)
+        hull[i, x] = np.interp(x, vertices, cost[i, vertices])
+    return hull
+
+
+def convex_rows(
+        cost,
+        lower_limit,
+        upper_limit,
+        hull=None,
+        tolerance=1e-9
+        ):
+    """
+    Finds the resources whose costs are convex within their limits.
+
+    Parameters
+    ----------
+    cost : np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource (C)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+    hull : np.ndarray or None (default None)
+        Lower convex hulls of the costs (see lower_hulls)
+    tolerance : float (default 1e-9)
+        Relative tolerance for rounding errors
+
+    Returns
+    -------
+    np.array(shape=(resources), dtype=bool)
+        True for the resources whose costs are equal to their hulls
+    """
+    if hull is None:
+        hull = lower_hulls(cost, lower_limit, upper_limit)
+    width = hull.shape[1]
+    x = np.arange(width)
+    valid = (x >= lower_limit[:, None]) & (x <= upper_limit[:, None])
+    gap = np.abs(cost[:, :width] - hull)
+    scale = np.maximum(1.0, np.abs(cost[:, :width]))
+    return np.all(~valid | (gap <= tolerance * scale), axis=1)
+
+
+def suffix_bounds(
+        tasks,
+        hull,
+        lower_limit,
+        upper_limit
+        ):
+    """
+    Computes lower bounds of the cost of giving t tasks to the resources
+    i, i+1, ..., R-1 for all i and t.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    hull : np.ndarray(shape=(resources, max(upper_limit)+1))
+        Lower convex hulls of the costs (see lower_hulls)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+
+    Returns
+    -------
+    np.ndarray(shape=(resources+1, tasks+1))
+        Bounds G[i][t] (infinite when t tasks cannot respect the limits
+        of the resources; G[resources] is zero for zero tasks)
+
+    Notes
+    -----
+    With convex costs, the optimal schedule gives each resource its
+    lower limit and then the tasks with the smallest marginal costs.
+    As the hulls are below the costs, this greedy solution over the
+    hulls is a lower bound of the optimal total cost.
+    """
+    resources = len(lower_limit)
+    G = np.full((resources+1, tasks+1), np.inf)
+    G[resources][0] = 0.0
+    base = 0.0
+    first = 0
+    # Smallest marginal costs of the hulls of the suffix, in order
+    marginals = np.zeros(0)
+    for i in reversed(range(resources)):
+        base += hull[i][lower_limit[i]]
+        first += lower_limit[i]
+        if first > tasks:
+            break
+        new = np.diff(hull[i][lower_limit[i]:upper_limit[i]+1])
+        # Merging sorted runs is linear with the stable sort
+        marginals = np.sort(np.concatenate((marginals, new)),
+                            kind='stable')[:tasks-first]
+        last = first + len(marginals)
+        G[i][first] = base
+        G[i][first+1:last+1] = base + np.cumsum(marginals)
+    return G
+
+
+def threshold_assignment(
+        tasks,
+        hull,
+        lower_limit,
+        upper_limit
+        ):
+    """
+    Finds the optimal assignment of tasks for the convex hulls.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    hull : np.ndarray(shape=(resources, max(upper_limit)+1))
+        Lower convex hulls of the costs (see lower_hulls)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+
+    Returns
+    -------
+    np.array(shape=(resources))
+        Assignment of tasks to resources
+
+    Notes
+    -----
+    The assignment gives the lower limits and then the tasks with the
+    smallest marginal costs of the hulls (ties broken by resource). It
+    respects the limits, so its total cost is an upper bound of the
+    optimal total cost, and it is optimal when the costs are convex.
+    """
+    resources = len(lower_limit)
+    width = hull.shape[1] - 1
+    x = np.arange(width)
+    valid = (x >= lower_limit[:, None]) & (x < upper_limit[:, None])
+    with np.errstate(invalid='ignore'):
+        keys = np.diff(hull, axis=1)[valid]
+    rows = np.nonzero(valid)[0]
+    chosen = np.argsort(keys, kind='stable')[:tasks - np.sum(lower_limit)]
+    return lower_limit + np.bincount(rows[chosen], minlength=resources)
+
+
+def candidate_choices(
+        tasks,
+        cost,
+        lower_limit,
+        upper_limit,
+        upper_bound,
+        hull=None,
+        bound=None,
+        tolerance=1e-9
+        ):
+    """
+    Finds the numbers of tasks of each resource that can be part of an
+    assignment with a total cost of at most an upper bound.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    cost : np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource (C)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+    upper_bound : float
+        Total cost of a known assignment
+    hull : np.ndarray or None (default None)
+        Lower convex hulls of the costs (see lower_hulls)
+    bound : float or None (default None)
+        Lower bound of the total cost (see lower_bound)
+    tolerance : float (default 1e-9)
+        Relative tolerance for rounding errors
+
+    Returns
+    -------
+    list of np.array(dtype=int)
+        Numbers of tasks kept for each resource, in increasing order
+
+    Notes
+    -----
+    Giving j tasks to resource i costs at least bound + cost[i][j] -
+    hull[i][j], as the hulls of the other resources and of resource i
+    at any other number of tasks are below their costs. Choices whose
+    gap above the hull exceeds upper_bound - bound are removed.
+    Removing choices only because a larger number of tasks is cheaper
+    would not be exact, since the number of tasks is fixed.
+    """
+    if hull is None:
+        hull = lower_hulls(cost, lower_limit, upper_limit)
+    if bound is None:
+        bound = suffix_bounds(tasks, hull, lower_limit, upper_limit)[0][tasks]
+    width = hull.shape[1]
+    x = np.arange(width)
+    valid = (x >= lower_limit[:, None]) & (x <= upper_limit[:, None])
+    slack = upper_bound - bound + tolerance * max(1.0, abs(upper_bound))
+    with np.errstate(invalid='ignore'):
+        keep = valid & (cost[:, :width] - hull <= slack)
+    return [np.flatnonzero(row) for row in keep]
+
+
+def lower_bound(
+        tasks,
+        resources,
+        cost,
+        lower_limit,
+        upper_limit
+        ):
+    """
+    Computes a lower bound of the total cost of any valid schedule.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    resources : int
+        Number of resources (R)
+    cost : np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource (C)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+
+    Returns
+    -------
+    numpy.float64
+        Lower bound (optimal cost of the convex relaxation), infinite if
+        the limits cannot be respected
+
+    Notes
+    -----
+    The bound is exact when the costs are convex (increasing or
+    constant marginal costs) within the limits.
+    """
+    hull = lower_hulls(cost, lower_limit, upper_limit)
+    return suffix_bounds(tasks, hull, lower_limit, upper_limit)[0][tasks]
+
+
+def certify(
+        tasks,
+        resources,
+        cost,
+        lower_limit,
+        upper_limit,
+        assignment,
+        tolerance=1e-9
+        ):
+    """
+    Checks if an assignment is proven optimal by the lower bound.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    resources : int
+        Number of resources (R)
+    cost : np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource (C)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+    assignment : np.array(shape=(resources))
+        Assignment of tasks to resources
+    tolerance : float (default 1e-9)
+        Relative tolerance for rounding errors
+
+    Returns
+    -------
+    boolean
+        True if the total cost of the assignment reaches the lower bound
+
+    Notes
+    -----
+    A False answer does not mean that the assignment is not optimal,
+    as the bound is not tight for non-convex costs.
+    """
+    total_cost = np.sum(cost[np.arange(resources), assignment])
+    bound = lower_bound(tasks, resources, cost, lower_limit, upper_limit)
+    return total_cost <= bound + tolerance * max(1.0, abs(bound))
@@ -255,3 +255,218 @@ def create_random_costs(
               f'. RNG seed = {rng_seed}')
     # Fills row in the matrix
     matrix[index][:] = values
+
+
+class CostModel:
+    """
+    Cost functions of a group of resources evaluated on demand.
+
+    Attributes
+    ----------
+    function : callable
+        Cost function receiving the parameters of a resource and a
+        number of tasks (or an np.array of numbers of tasks)
+    parameters : np.ndarray(shape=(resources, number of parameters))
+        Parameters of the cost function of each resource
+
+    Notes
+    -----
+    A CostModel can be given to schedulers that read costs on demand
+    (e.g., schedulers.marin) instead of a (resources, tasks+1) matrix.
+    """
+
+    def __init__(self, function, parameters):
+        self.function = function
+        self.parameters = parameters
+
+    def __call__(self, index, x):
+        """
+        Computes the cost of resource index for x tasks.
+
+        Parameters
+        ----------
+        index : int
+            Resource
+        x : int or np.array(dtype=int)
+            Number(s) of tasks
+
+        Returns
+        -------
+        numpy.float64 or np.array
+            Cost(s) of the resource
+        """
+        return self.function(self.parameters[index], x)
+
+    def __len__(self):
+        return len(self.parameters)
+
+    def matrix(self, tau):
+        """
+        Fills a Cost matrix with the costs of all resources.
+
+        Parameters
+        ----------
+        tau : int
+            Size of the rows to fill (number of tasks)
+
+        Returns
+        -------
+        np.ndarray(shape=(resources, tau+1))
+            Matrix of costs
+        """
+        x = np.arange(tau+1)
+        return np.array([self(i, x) for i in range(len(self))])
+
+
+def _linear(parameters, x):
+    alpha, beta = parameters
+    return alpha + beta*x
+
+
+def _quadratic(parameters, x):
+    alpha, beta, gamma = parameters
+    return alpha + beta*x + gamma*x*x
+
+
+def _nlogn(parameters, x):
+    alpha, beta = parameters
+    return alpha + beta*x*np.log(x+1)
+
+
+def _logn(parameters, x):
+    alpha, beta = parameters
+    return alpha + beta*np.log(x+1)
+
+
+def _sample_parameters(rng_seed, resources, size):
+    """
+    Samples the parameters of the cost functions of all resources.
+
+    Parameters
+    ----------
+    rng_seed : int
+        Seed of the first resource (resource i uses rng_seed + i)
+    resources : int
+        Number of resources
+    size : int
+        Number of parameters per resource
+
+    Returns
+    -------
+    np.ndarray(shape=(resources, size))
+        Parameters sampled from a uniform distribution in the
+        interval [low_random, high_random)
+    """
+    parameters = np.zeros(shape=(resources, size))
+    for i in range(resources):
+        np.random.seed(rng_seed + i)
+        parameters[i] = np.random.uniform(low_random, high_random, size)
+    return parameters
+
+
+def create_linear_model(
+        rng_seed,
+        resources
+        ):
+    """
+    Creates linear cost functions for a group of resources.
+
+    Parameters
+    ----------
+    rng_seed : int
+        Seed of the first resource (resource i uses rng_seed + i)
+    resources : int
+        Number of resources
+
+    Returns
+    -------
+    CostModel
+        Cost functions evaluated on demand
+
+    Notes
+    -----
+    Resource i has the same costs as a row filled by
+    create_linear_costs with seed rng_seed + i.
+    """
+    return CostModel(_linear, _sample_parameters(rng_seed, resources, 2))
+
+
+def create_quadratic_model(
+        rng_seed,
+        resources
+        ):
+    """
+    Creates quadratic cost functions for a group of resources.
+
+    Parameters
+    ----------
+    rng_seed : int
+        Seed of the first resource (resource i uses rng_seed + i)
+    resources : int
+        Number of resources
+
+    Returns
+    -------
+    CostModel
+        Cost functions evaluated on demand
+
+    Notes
+    -----
+    Resource i has the same costs as a row filled by
+    create_quadratic_costs with seed rng_seed + i.
+    """
+    return CostModel(_quadratic, _sample_parameters(rng_seed, resources, 3))
+
+
+def create_nlogn_model(
+        rng_seed,
+        resources
+        ):
+    """
+    Creates n log n cost functions for a group of resources.
+
+    Parameters
+    ----------
+    rng_seed : int
+        Seed of the first resource (resource i uses rng_seed + i)
+    resources : int
+        Number of resources
+
+    Returns
+    -------
+    CostModel
+        Cost functions evaluated on demand
+
+    Notes
+    -----
+    Resource i has the same costs as a row filled by
+    create_nlogn_costs with seed rng_seed + i.
+    """
+    return CostModel(_nlogn, _sample_parameters(rng_seed, resources, 2))
+
+
+def create_logn_model(
+        rng_seed,
+        resources
+        ):
+    """
+    Creates log n cost functions for a group of resources.
+
+    Parameters
+    ----------
+    rng_seed : int
+        Seed of the first resource (resource i uses rng_seed + i)
+    resources : int
+        Number of resources
+
+    Returns
+    -------
+    CostModel
+        Cost functions evaluated on demand
+
+    Notes
+    -----
+    Resource i has the same costs as a row filled by
+    create_logn_costs with seed rng_seed + i.
+    """
+    return CostModel(_logn, _sample_parameters(rng_seed, resources, 2))
@@ -0,0 +1,722 @@
+"""
+Module containing a configurable runner for the total cost experiments.
+"""
+
+import collections
+import concurrent.futures
+import functools
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import numpy as np
+
+from . import benchmark
+from . import support
+
+
+# One point of an experiment
+Point = collections.namedtuple('Point', ['scheduler', 'tasks', 'resources',
+                                         'rng_seed'])
+
+# Functions running the points of an experiment
+BACKENDS = {}
+# Seconds between checks of the workers of the job queue
+POLL_SECONDS = 1.0
+
+# Cost matrices attached by each worker, indexed by (resources, rng_seed)
+_costs = {}
+# Shared memory blocks attached by each worker (kept alive with _costs)
+_blocks = []
+
+
+def register_backend(name, function):
+    """
+    Registers an execution backend.
+
+    Parameters
+    ----------
+    name : string
+        Name of the backend in the configuration files
+    function : callable
+        Function called as function(points, costs, lower, limited,
+        workers) returning the (total cost, tasks assigned) of each
+        point in the order of the points
+    """
+    BACKENDS[name] = function
+
+
+def experiment_limits(
+        tasks,
+        resources,
+        lower=5,
+        limited=True
+        ):
+    """
+    Gives the limits used in the total cost experiments.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    resources : int
+        Number of resources (R)
+    lower : int (default 5)
+        Lower limit of all resources
+    limited : bool (default True)
+        True if the second half of the resources has an upper limit of
+        2*(tasks/resources), False if no resource has an upper limit
+
+    Returns
+    -------
+    np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+    """
+    lower_limit = np.full(shape=resources, fill_value=lower, dtype=int)
+    upper_limit = np.full(shape=resources, fill_value=tasks, dtype=int)
+    if limited:
+        np.put(upper_limit, np.arange(resources//2, resources),
+               2*(tasks//resources))
+    return lower_limit, upper_limit
+
+
+def create_costs(
+        cost_family,
+        rng_seed,
+        resources,
+        max_tasks
+        ):
+    """
+    Generates the cost matrix of an experiment.
+
+    Parameters
+    ----------
+    cost_family : string
+        Registered cost family (see benchmark.COST_FAMILIES)
+    rng_seed : int
+        Seed of the first resource (resource i uses rng_seed + i)
+    resources : int
+        Number of resources (R)
+    max_tasks : int
+        Largest number of tasks in the matrix
+
+    Returns
+    -------
+    np.ndarray(shape=(resources, max_tasks+1))
+        Cost functions per resource (C)
+    """
+    cost = np.zeros(shape=(resources, max_tasks+1))
+    for i in range(resources):
+        benchmark.COST_FAMILIES[cost_family](rng_seed + i, cost, i, max_tasks)
+    return cost
+
+
+def run_point(
+        point,
+        cost,
+        lower=5,
+        limited=True
+        ):
+    """
+    Runs a scheduler for one point of an experiment.
+
+    Parameters
+    ----------
+    point : Point
+        Scheduler, number of tasks, number of resources, and seed
+    cost : np.ndarray(shape=(resources, max_tasks+1))
+        Cost functions per resource (C)
+    lower : int (default 5)
+        Lower limit of all resources
+    limited : bool (default True)
+        True if half of the resources have upper limits
+
+    Returns
+    -------
+    numpy.float64
+        Total cost of the assignment
+    int
+        Number of tasks assigned
+    """
+    lower_limit, upper_limit = experiment_limits(point.tasks, point.resources,
+                                                 lower, limited)
+    function = benchmark.SCHEDULERS[point.scheduler]
+    assignment = function(point.tasks, point.resources, cost, lower_limit,
+                          upper_limit)
+    return support.get_total_cost(cost, assignment), np.sum(assignment)
+
+
+def _shared_memory():
+    """
+    Imports multiprocessing.shared_memory, or returns None before
+    Python 3.8.
+    """
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:  # Python < 3.8
+        return None
+    return shared_memory
+
+
+def _serial_fallback(points, costs, lower, limited):
+    """
+    Runs the points serially when shared memory is not available.
+    """
+    print('- Shared memory requires Python 3.8, running the points' +
+          ' serially.')
+    yield from run_serial(points, costs, lower, limited)
+
+
+def _attach_costs(blocks):
+    """
+    Attaches the cost matrices shared by the main process (worker
+    initializer).
+
+    Parameters
+    ----------
+    blocks : dict
+        (name, shape) of the shared memory block of each cost matrix
+    """
+    shared_memory = _shared_memory()
+    for key, (name, shape) in blocks.items():
+        # Workers share the resource tracker of the main process, which
+        # unlinks the block only once
+        block = shared_memory.SharedMemory(name=name)
+        cost = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        cost.setflags(write=False)
+        _blocks.append(block)
+        _costs[key] = cost
+
+
+def _run_shared_point(point, lower, limited):
+    """
+    Runs a point with the cost matrix attached by the worker.
+    """
+    return run_point(point, _costs[point.resources, point.rng_seed], lower,
+                     limited)
+
+
+def _share_costs(costs):
+    """
+    Copies the cost matrices to shared memory blocks.
+
+    Parameters
+    ----------
+    costs : dict
+        Cost matrices indexed by (resources, rng_seed)
+
+    Returns
+    -------
+    dict
+        (name, shape) of the block of each cost matrix
+    list of SharedMemory
+        Blocks to close and unlink at the end
+    """
+    shared_memory = _shared_memory()
+    blocks = {}
+    shared = []
+    try:
+        for key, cost in costs.items():
+            block = shared_memory.SharedMemory(create=True, size=cost.nbytes)
+            shared.append(block)
+            np.ndarray(cost.shape, dtype=cost.dtype, buffer=block.buf)[:] = cost
+            blocks[key] = (block.name, cost.shape)
+    except BaseException:
+        _release(shared)
+        raise
+    return blocks, shared
+
+
+def _release(shared):
+    """
+    Closes and unlinks shared memory blocks.
+    """
+    for block in shared:
+        block.close()
+        block.unlink()
+
+
+def run_serial(points, costs, lower, limited, workers=1):
+    """
+    Runs the points one after the other in the main process.
+    """
+    for point in points:
+        yield run_point(point, costs[point.resources, point.rng_seed], lower,
+                        limited)
+
+
+def run_process_pool(points, costs, lower, limited, workers=None):
+    """
+    Runs the points in a ProcessPoolExecutor sharing the cost matrices.
+    """
+    if workers is None:
+        workers = os.cpu_count()
+    if workers == 1:
+        yield from run_serial(points, costs, lower, limited)
+        return
+    if _shared_memory() is None:
+        yield from _serial_fallback(points, costs, lower, limited)
+        return
+    blocks, shared = _share_costs(costs)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_attach_costs,
+                initargs=(blocks,)) as executor:
+            # map returns the results in the order of the points
+            chunksize = max(1, len(points) // (4*workers))
+            function = functools.partial(_run_shared_point, lower=lower,
+                                         limited=limited)
+            yield from executor.map(function, points, chunksize=chunksize)
+    finally:
+        _release(shared)
+
+
+def _queue_worker(blocks, jobs, results, lower, limited):
+    """
+    Runs the jobs of a queue until it receives None.
+
+    Parameters
+    ----------
+    blocks : dict
+        (name, shape) of the shared memory block of each cost matrix
+    jobs : multiprocessing.Queue
+        Pairs (index, point) to run
+    results : multiprocessing.Queue
+        Receives pairs (index, result), where result is an exception if
+        the point failed
+    lower : int
+        Lower limit of all resources
+    limited : bool
+        True if half of the resources have upper limits
+    """
+    _attach_costs(blocks)
+    for index, point in iter(jobs.get, None):
+        try:
+            result = _run_shared_point(point, lower, limited)
+        except Exception as error:
+            result = error
+        results.put((index, result))
+
+
+def _check_workers(processes):
+    """
+    Raises a RuntimeError if a worker of the job queue died.
+    """
+    for process in processes:
+        if process.exitcode not in (None, 0):
+            raise RuntimeError(f'Worker {process.pid} of the job queue died' +
+                               f' (exit code {process.exitcode})')
+    if not any(process.is_alive() for process in processes):
+        raise RuntimeError('All workers of the job queue finished before' +
+                           ' their results arrived')
+
+
+def run_job_queue(points, costs, lower, limited, workers=None):
+    """
+    Runs the points through a job queue consumed by worker processes.
+
+    Notes
+    -----
+    This backend stands in for a cluster job queue: workers pull one
+    point at a time, so they stay busy when points have very different
+    durations. Results arrive out of order and are yielded in the order
+    of the points. A RuntimeError is raised if a worker dies (e.g.,
+    killed for lack of memory), as its point would never finish.
+    """
+    if workers is None:
+        workers = os.cpu_count()
+    if _shared_memory() is None:
+        yield from _serial_fallback(points, costs, lower, limited)
+        return
+    blocks, shared = _share_costs(costs)
+    jobs = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_queue_worker,
+                                         args=(blocks, jobs, results, lower,
+                                               limited),
+                                         daemon=True)
+                 for _ in range(workers)]
+    try:
+        for process in processes:
+            process.start()
+        for job in enumerate(points):
+            jobs.put(job)
+        for _ in processes:
+            jobs.put(None)
+        # Buffers results until the next one in order arrives
+        pending = {}
+        for index in range(len(points)):
+            while index not in pending:
+                try:
+                    key, result = results.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    _check_workers(processes)
+                    continue
+                pending[key] = result
+            result = pending.pop(index)
+            if isinstance(result, Exception):
+                raise result
+            yield result
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        _release(shared)
+
+
+register_backend('serial', run_serial)
+register_backend('process', run_process_pool)
+register_backend('queue', run_job_queue)
+
+
+def expand_points(
+        scheduler_names,
+        tasks_list,
+        resources_list,
+        rng_seeds
+        ):
+    """
+    Expands the parameter grid into a list of points.
+
+    Parameters
+    ----------
+    scheduler_names : list of strings
+        Registered schedulers (see benchmark.SCHEDULERS)
+    tasks_list : iterable of int
+        Numbers of tasks
+    resources_list : iterable of int
+        Numbers of resources
+    rng_seeds : iterable of int
+        Seeds of the first resource of the cost matrices
+
+    Returns
+    -------
+    list of Point
+        Points ordered by seed, resources, tasks, and scheduler (the
+        order of the original experiment scripts)
+    """
+    for name in scheduler_names:
+        if name not in benchmark.SCHEDULERS:
+            raise ValueError(f'Unknown scheduler {name}')
+    return [Point(name, tasks, resources, rng_seed)
+            for rng_seed, resources, tasks, name in
+            itertools.product(rng_seeds, resources_list, tasks_list,
+                              scheduler_names)]
+
+
+def run_campaign(
+        logger,
+        cost_family,
+        rng_seed,
+        resources_list,
+        tasks_list,
+        scheduler_names,
+        max_tasks,
+        lower=5,
+        limited=True,
+        workers=None,
+        backend='process',
+        journal=None
+        ):
+    """
+    Runs a total cost experiment and stores its results in a logger.
+
+    Parameters
+    ----------
+    logger : support.Logger
+        Logger receiving one 'Scheduler,Tasks,Resources,Total Cost'
+        line per point (plus a Seed column if there are many seeds)
+    cost_family : string
+        Registered cost family (see benchmark.COST_FAMILIES)
+    rng_seed : int or list of int
+        Seed of the first resource (resource i uses rng_seed + i)
+    resources_list : iterable of int
+        Numbers of resources
+    tasks_list : iterable of int
+        Numbers of tasks
+    scheduler_names : list of strings
+        Registered schedulers (see benchmark.SCHEDULERS)
+    max_tasks : int
+        Largest number of tasks in the cost matrices
+    lower : int (default 5)
+        Lower limit of all resources
+    limited : bool (default True)
+        True if half of the resources have upper limits
+    workers : int or None (default None)
+        Number of processes (None = number of CPUs, 1 = no processes)
+    backend : string (default 'process')
+        Registered backend (see BACKENDS)
+    journal : support.Journal or None (default None)
+        Journal of completed points. Points found in it are not run
+        again, and new points are appended to it as they finish
+
+    Notes
+    -----
+    The points (tasks, scheduler) are independent, so they can run in
+    parallel. Each cost matrix is generated once in the main process
+    and shared read-only with the workers through shared memory.
+    Results are stored in the same order as in a serial run, so the
+    CSV files do not depend on the backend or the number of workers.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend {backend}' +
+                         f' (options: {", ".join(BACKENDS)})')
+    rng_seeds = [rng_seed] if np.isscalar(rng_seed) else list(rng_seed)
+    resources_list = list(resources_list)
+    points = expand_points(scheduler_names, tasks_list, resources_list,
+                           rng_seeds)
+    if journal is None:
+        pending = points
+    else:
+        pending = [point for point in points if tuple(point) not in journal]
+        if len(pending) < len(points):
+            print(f'- Skipping {len(points) - len(pending)} points found' +
+                  f' in journal {journal.filename}.')
+    # Generates only the cost matrices of the points to run
+    costs = {(point.resources, point.rng_seed): None for point in pending}
+    for resources, seed in costs:
+        costs[resources, seed] = create_costs(cost_family, seed, resources,
+                                              max_tasks)
+    results = BACKENDS[backend](pending, costs, lower, limited, workers)
+    try:
+        if journal is not None:
+            results = _journaled(points, results, journal)
+        store_results(logger, points, results, len(rng_seeds) > 1)
+    finally:
+        # Finishes the backend (e.g., releasing its shared memory)
+        if hasattr(results, 'close'):
+            results.close()
+
+
+def _journaled(points, results, journal):
+    """
+    Merges the results in a journal with the results of a backend.
+
+    Parameters
+    ----------
+    points : list of Point
+        All points of the experiment
+    results : iterable of tuples
+        (total cost, tasks assigned) of the points missing in the journal
+    journal : support.Journal
+        Journal of completed points
+
+    Yields
+    ------
+    tuple
+        (total cost, tasks assigned) of each point, in order
+    """
+    results = iter(results)
+    try:
+        for point in points:
+            record = journal.records.get(tuple(point))
+            if record is None:
+                total_cost, assigned = next(results)
+                record = dict(point._asdict(), total_cost=float(total_cost),
+                              assigned=int(assigned))
+                journal.append(record)
+            yield record['total_cost'], record['assigned']
+    finally:
+        if hasattr(results, 'close'):
+            results.close()
+
+
+def store_results(
+        logger,
+        points,
+        results,
+        seed_column=False
+        ):
+    """
+    Checks the results of the points and stores them in the logger.
+
+    Parameters
+    ----------
+    logger : support.Logger
+        Logger receiving the results
+    points : list of Point
+        Points of the experiment
+    results : iterable of tuples
+        (total cost, tasks assigned) of each point, in order
+    seed_column : bool (default False)
+        True if the seed is stored after the total cost
+    """
+    current = None
+    current_tasks = None
+    for point, (total_cost, assigned) in zip(points, results):
+        if point.resources != current:
+            current = point.resources
+            current_tasks = None
+            print(f'- Running experiment for {current} resources.')
+        if point.tasks != current_tasks:
+            current_tasks = point.tasks
+            if current_tasks % 1000 == 0:
+                print(f'-- Running with {current_tasks} tasks.')
+        if assigned != point.tasks:
+            print(f'-- {point.scheduler} failed to assign {point.tasks}' +
+                  f' tasks to {point.resources} resources ({assigned}' +
+                  ' were assigned).')
+        info = f'{point.scheduler},{point.tasks},{point.resources},{total_cost}'
+        if seed_column:
+            info += f',{point.rng_seed}'
+        logger.store(info)
+
+
+def load_config(filename):
+    """
+    Reads an experiment configuration file.
+
+    Parameters
+    ----------
+    filename : string
+        JSON (.json), TOML (.toml), or YAML (.yaml, .yml) file
+
+    Returns
+    -------
+    dict
+        Configuration of the experiment
+
+    Notes
+    -----
+    TOML files require Python 3.11 (or the tomli package) and YAML
+    files require the PyYAML package.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.json':
+        with open(filename) as config_file:
+            return json.load(config_file)
+    if extension == '.toml':
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ImportError('Reading TOML files requires Python 3.11' +
+                                  ' or the tomli package') from None
+        with open(filename, 'rb') as config_file:
+            return tomllib.load(config_file)
+    if extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError('Reading YAML files requires the PyYAML' +
+                              ' package') from None
+        with open(filename) as config_file:
+            return yaml.safe_load(config_file)
+    raise ValueError(f'Unknown configuration format {extension}' +
+                     ' (options: .json, .toml, .yaml, .yml)')
+
+
+def _as_values(values):
+    """
+    Converts a list or a {start, stop, step} range to a list.
+    """
+    if isinstance(values, dict):
+        return list(range(values['start'], values['stop'],
+                          values.get('step', 1)))
+    if isinstance(values, (list, tuple)):
+        return list(values)
+    return [values]
+
+
+def run_config(
+        config,
+        backend=None,
+        workers=None,
+        resume=False
+        ):
+    """
+    Runs the experiment described by a configuration.
+
+    Parameters
+    ----------
+    config : dict or string
+        Configuration or name of its file (see load_config)
+    backend : string or None (default None)
+        Backend replacing the one in the configuration
+    workers : int or None (default None)
+        Number of workers replacing the one in the configuration
+    resume : bool (default False)
+        True to use a journal even if the configuration does not name
+        one (the name of the output file followed by '.journal')
+
+    Notes
+    -----
+    A configuration contains the keys:
+        - 'output': name of the CSV file
+        - 'description': header of the CSV file (string or list of lines)
+        - 'cost_family': registered cost family
+        - 'rng_seed': seed of the first resource (or a list of seeds)
+        - 'resources': list of numbers of resources
+        - 'tasks': list of numbers of tasks or {start, stop, step}
+        - 'max_tasks': largest number of tasks in the cost matrices
+          (default: the largest number of tasks)
+        - 'schedulers': list of registered schedulers
+        - 'lower_limit': lower limit of all resources (default 5)
+        - 'upper_limit': 'half-limited' (default) or 'unlimited'
+        - 'backend': registered backend (default 'process')
+        - 'workers': number of workers (default: number of CPUs)
+        - 'journal': journal of completed points used to resume the
+          experiment (default: no journal)
+        - 'columnar': columnar format also written at the end (see
+          support.convert_results, default: only CSV)
+    """
+    if isinstance(config, str):
+        config = load_config(config)
+    description = config.get('description', '')
+    if isinstance(description, list):
+        description = '\n'.join(description) + '\n'
+    tasks_list = _as_values(config['tasks'])
+    max_tasks = config.get('max_tasks', max(tasks_list))
+    lower = config.get('lower_limit', 5)
+    policy = config.get('upper_limit', 'half-limited')
+    if policy not in ('half-limited', 'unlimited'):
+        raise ValueError(f'Unknown upper limit policy {policy}' +
+                         ' (options: half-limited, unlimited)')
+
+    # Results are streamed to the file as the points finish
+    logger = support.Logger(config['output'], streaming=True,
+                            flush_seconds=10,
+                            columnar=config.get('columnar'))
+    # Stores the description of the experiments
+    logger.header(description)
+    # Header of the CSV file
+    header = 'Scheduler,Tasks,Resources,Total Cost'
+    if len(_as_values(config['rng_seed'])) > 1:
+        header += ',Seed'
+    logger.store(header)
+    journal_name = config.get('journal')
+    if journal_name is None and resume:
+        journal_name = config['output'] + '.journal'
+    journal = None
+    if journal_name is not None:
+        # Parameters that must not change between runs of the journal
+        campaign = {'cost_family': config['cost_family'],
+                    'max_tasks': max_tasks,
+                    'lower_limit': lower,
+                    'upper_limit': policy}
+        journal = support.Journal(journal_name, Point._fields, campaign)
+    try:
+        run_campaign(logger,
+                     config['cost_family'],
+                     _as_values(config['rng_seed']),
+                     _as_values(config['resources']),
+                     tasks_list,
+                     config['schedulers'],
+                     max_tasks,
+                     lower=lower,
+                     limited=(policy == 'half-limited'),
+                     workers=workers or config.get('workers'),
+                     backend=backend or config.get('backend', 'process'),
+                     journal=journal)
+    finally:
+        if journal is not None:
+            journal.close()
+    # Finishes logging
+    logger.finish()
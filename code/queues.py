@@ -0,0 +1,226 @@
+"""
+Module containing priority queues used by the greedy schedulers.
+"""
+
+import functools
+import heapq
+import math
+import numpy as np
+
+
+class HeapQueue:
+    """
+    Binary heap of (key, resource) pairs based on heapq.
+
+    Attributes
+    ----------
+    heap : list of tuples
+        Pairs (key, resource) organized as a heap
+    push : callable
+        Inserts a (key, resource) pair
+    pop : callable
+        Removes and returns the pair with the smallest key
+
+    Notes
+    -----
+    push and pop are bound directly to heapq's functions, so using the
+    queue costs the same as using heapq on a list.
+    """
+
+    def __init__(self, items):
+        self.heap = list(items)
+        heapq.heapify(self.heap)
+        self.push = functools.partial(heapq.heappush, self.heap)
+        self.pop = functools.partial(heapq.heappop, self.heap)
+
+    def peek(self):
+        """
+        Returns the pair with the smallest key without removing it.
+
+        Returns
+        -------
+        tuple or None
+            Pair (key, resource), or None if the queue is empty
+        """
+        return self.heap[0] if self.heap else None
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class BucketQueue:
+    """
+    Bucket queue of (key, resource) pairs for quantized keys.
+
+    Attributes
+    ----------
+    resolution : float
+        Width of the interval of keys covered by each bucket
+    buckets : dict
+        Heaps of (key, resource) pairs indexed by bucket number
+    current : int or None
+        Smallest bucket number that may contain pairs
+    size : int
+        Number of pairs in the queue
+
+    Notes
+    -----
+    When keys are multiples of the resolution (e.g., integer costs with
+    resolution 1), all pairs in a bucket share the same key and push
+    and pop take O(1) amortized time. Pairs are kept ordered by (key,
+    resource) inside each bucket, so the pop order is the same as with
+    a HeapQueue for any keys.
+    """
+
+    def __init__(self, items, resolution=1.0):
+        self.resolution = resolution
+        self.buckets = {}
+        self.current = None
+        self.size = 0
+        for item in items:
+            self.push(item)
+
+    def push(self, item):
+        """
+        Inserts a pair in the queue.
+
+        Parameters
+        ----------
+        item : tuple
+            Pair (key, resource)
+        """
+        number = self._number(item[0])
+        bucket = self.buckets.get(number)
+        if bucket is None:
+            self.buckets[number] = [item]
+        else:
+            heapq.heappush(bucket, item)
+        if self.current is None or number < self.current:
+            self.current = number
+        self.size += 1
+
+    def pop(self):
+        """
+        Removes and returns the pair with the smallest key.
+
+        Returns
+        -------
+        tuple
+            Pair (key, resource)
+        """
+        self._advance()
+        bucket = self.buckets[self.current]
+        item = heapq.heappop(bucket)
+        if not bucket:
+            del self.buckets[self.current]
+        self.size -= 1
+        return item
+
+    def peek(self):
+        """
+        Returns the pair with the smallest key without removing it.
+
+        Returns
+        -------
+        tuple or None
+            Pair (key, resource), or None if the queue is empty
+        """
+        if self.size == 0:
+            return None
+        self._advance()
+        return self.buckets[self.current][0]
+
+    def _number(self, key):
+        """
+        Gives the bucket number of a key (infinite keys, e.g., from
+        infinite costs, get infinite bucket numbers).
+        """
+        number = key / self.resolution
+        if math.isinf(number):
+            return number
+        return math.floor(number)
+
+    def _advance(self):
+        """
+        Moves the current bucket to the first non-empty bucket.
+        """
+        if self.size == 0:
+            raise IndexError('pop from an empty queue')
+        steps = 0
+        while self.current not in self.buckets:
+            self.current += 1
+            steps += 1
+            # Jumps directly to the next bucket when keys are sparse or
+            # the current bucket is infinite
+            if steps > len(self.buckets) or math.isinf(self.current):
+                self.current = min(self.buckets)
+                break
+
+    def __len__(self):
+        return self.size
+
+
+# Queues that can be selected by name
+QUEUES = {'heapq': HeapQueue, 'bucket': BucketQueue}
+
+
+def create_queue(
+        queue,
+        items
+        ):
+    """
+    Creates a priority queue with a list of initial pairs.
+
+    Parameters
+    ----------
+    queue : string or callable
+        Name of the queue in QUEUES or a callable receiving the initial
+        pairs (e.g., functools.partial(BucketQueue, resolution=0.1))
+    items : iterable of tuples
+        Initial pairs (key, resource)
+
+    Returns
+    -------
+    HeapQueue, BucketQueue, or the result of the callable
+        Priority queue with push, pop, and peek methods
+    """
+    if isinstance(queue, str):
+        if queue not in QUEUES:
+            raise ValueError(f'Unknown priority queue {queue}' +
+                             f' (options: {", ".join(QUEUES)}, batch)')
+        queue = QUEUES[queue]
+    return queue(items)
+
+
+def smallest(
+        keys,
+        k
+        ):
+    """
+    Finds the k smallest keys with a single partition.
+
+    Parameters
+    ----------
+    keys : np.array
+        Keys to search
+    k : int
+        Number of keys to extract
+
+    Returns
+    -------
+    np.array(dtype=int)
+        Positions of the k smallest keys
+
+    Notes
+    -----
+    Ties at the k-th smallest key are broken by position, as it
+    happens when (key, position) pairs are popped from a heap.
+    """
+    if k <= 0:
+        return np.zeros(0, dtype=int)
+    if k >= keys.size:
+        return np.arange(keys.size)
+    kth = np.partition(keys, k-1)[k-1]
+    below = np.flatnonzero(keys < kth)
+    ties = np.flatnonzero(keys == kth)[:k - below.size]
+    return np.concatenate([below, ties])
@@ -2,15 +2,285 @@
 Module containing scheduling algorithms.
 """
 
+import bisect
+import collections
+import contextlib
+import functools
+import time
 import numpy as np
-import heapq
+
+from . import bounds
+from . import queues
+
+
+class SchedulerStats:
+    """
+    Timers and counters collected inside the schedulers.
+
+    Attributes
+    ----------
+    timers : dict
+        Time spent in each phase in seconds
+    counters : dict
+        Number of events of each kind (e.g., 'dp_cells' relaxed,
+        'improvements' found, 'heap_pops', 'heap_pushes',
+        'translate_calls')
+
+    Notes
+    -----
+    Phases can be nested (e.g., 'translate' happens inside 'scan'),
+    so timers do not add up to the total execution time.
+    """
+
+    def __init__(self):
+        self.timers = collections.defaultdict(float)
+        self.counters = collections.defaultdict(int)
+
+    def count(self, name, n=1):
+        """
+        Adds n events to a counter.
+
+        Parameters
+        ----------
+        name : string
+            Name of the counter
+        n : int (default 1)
+            Number of events
+        """
+        self.counters[name] += int(n)
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        """
+        Measures the time spent inside a with block.
+
+        Parameters
+        ----------
+        phase : string
+            Name of the phase
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[phase] += time.perf_counter() - start
+
+    def as_dict(self):
+        """
+        Returns the statistics as a dictionary.
+
+        Returns
+        -------
+        dict
+            Timers and counters
+        """
+        return {'timers': dict(self.timers), 'counters': dict(self.counters)}
+
+
+class _NoPhase:
+    """
+    Phase used when instrumentation is disabled (does nothing).
+    """
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+# Statistics being collected (None when instrumentation is disabled)
+_stats = None
+# Phase used when instrumentation is disabled
+_no_phase = _NoPhase()
+
+
+@contextlib.contextmanager
+def instrument():
+    """
+    Collects statistics of the schedulers called inside a with block.
+
+    Yields
+    ------
+    SchedulerStats
+        Statistics filled by the schedulers
+
+    Notes
+    -----
+    Instrumentation is disabled by default and costs a few checks per
+    call when disabled. Statistics are global to the process, so calls
+    running in other threads at the same time are also counted.
+
+    Examples
+    --------
+    >>> with schedulers.instrument() as stats:
+    ...     schedulers.mardec(tasks, resources, cost, lower, upper)
+    >>> stats.timers['mcmkp_matrices']
+    """
+    global _stats
+    previous = _stats
+    _stats = SchedulerStats()
+    try:
+        yield _stats
+    finally:
+        _stats = previous
+
+
+def _phase(name):
+    """
+    Returns a context manager timing a phase when instrumented.
+    """
+    if _stats is None:
+        return _no_phase
+    return _stats.timer(name)
+
+
+class MarginalCosts:
+    """
+    Reads marginal costs from a cost source on demand.
+
+    Attributes
+    ----------
+    cost : np.ndarray, callable, or list of iterables
+        Cost source. Matrices are indexed directly, callables are
+        evaluated as cost(i, x) for an int or np.array of numbers of
+        tasks x (e.g., a devices.CostModel), and iterables (one per
+        resource) yield the costs for 0, 1, 2, ... tasks
+    streams : list of iterators or None
+        Iterators over the costs of each resource (iterables only)
+    base : list of int
+        Number of tasks of the first buffered cost of each resource
+    buffer : list of lists
+        Costs read from the iterators but not consumed yet
+
+    Notes
+    -----
+    Iterables are consumed as the number of tasks grows, so only the
+    costs around the current assignment of each resource are kept in
+    memory. Costs before an already consumed position cannot be read.
+    """
+
+    def __init__(self, cost):
+        self.cost = cost
+        self.streams = None
+        if not isinstance(cost, np.ndarray) and not callable(cost):
+            self.streams = [iter(row) for row in cost]
+            self.base = [0] * len(self.streams)
+            self.buffer = [[] for _ in self.streams]
+
+    def at(self, i, a):
+        """
+        Returns the cost of one more task for a resource.
+
+        Parameters
+        ----------
+        i : int
+            Resource
+        a : int
+            Number of tasks currently assigned to the resource
+
+        Returns
+        -------
+        numpy.float64
+            Marginal cost C_i(a+1) - C_i(a)
+        """
+        if isinstance(self.cost, np.ndarray):
+            return self.cost[i][a+1] - self.cost[i][a]
+        if self.streams is None:
+            return self.cost(i, a+1) - self.cost(i, a)
+        values = self.values(i, a, a+2)
+        return values[1] - values[0]
+
+    def row(self, i, start, stop):
+        """
+        Returns the marginal costs of a resource over a range of tasks.
+
+        Parameters
+        ----------
+        i : int
+            Resource
+        start : int
+            Number of tasks currently assigned to the resource
+        stop : int
+            Number of tasks after receiving all marginal tasks
+
+        Returns
+        -------
+        np.array(shape=(stop-start))
+            Marginal costs C_i(a+1) - C_i(a) for a in [start, stop)
+        """
+        return np.diff(self.values(i, start, stop+1))
+
+    def values(self, i, start, stop):
+        """
+        Returns the costs of a resource over a range of tasks.
+
+        Parameters
+        ----------
+        i : int
+            Resource
+        start : int
+            First number of tasks
+        stop : int
+            Last number of tasks (excluded)
+
+        Returns
+        -------
+        np.array(shape=(stop-start))
+            Costs C_i(x) for x in [start, stop)
+        """
+        if isinstance(self.cost, np.ndarray):
+            return self.cost[i][start:stop]
+        if self.streams is None:
+            return np.asarray(self.cost(i, np.arange(start, stop)))
+        # Drops the costs that will not be read again
+        skip = start - self.base[i]
+        if skip < 0:
+            raise ValueError(f'Costs of resource {i} for less than' +
+                             f' {self.base[i]} tasks were already consumed')
+        buffer = self.buffer[i]
+        dropped = min(skip, len(buffer))
+        del buffer[:dropped]
+        for _ in range(skip - dropped):
+            next(self.streams[i])
+        self.base[i] = start
+        # Reads new costs until the range is covered
+        while len(buffer) < stop - start:
+            buffer.append(next(self.streams[i]))
+        return np.array(buffer[:stop-start])
+
+
+def _prune(K, remaining, limit):
+    """
+    Discards the partial solutions that cannot lead to a total cost
+    within a limit.
+
+    Parameters
+    ----------
+    K : np.array(shape=(tasks+1))
+        Minimal costs of the partial solutions (modified)
+    remaining : np.array(shape=(tasks+1))
+        Lower bound of the cost of the tasks left for each partial
+        solution (indexed by the number of tasks already assigned)
+    limit : float
+        Largest total cost accepted
+
+    Returns
+    -------
+    list of int
+        Numbers of tasks of the partial solutions kept, in order
+    """
+    K[K + remaining > limit] = np.inf
+    return np.flatnonzero(K < np.inf).tolist()
+
 
 def mc2mkp(
         tasks,
         resources,
         cost,
         lower_limit,
-        upper_limit
+        upper_limit,
+        upper_bound=None
         ):
     """
     Finds an assignment of tasks to resources based on the dynamic
@@ -28,31 +298,79 @@ def mc2mkp(
         Lower limit of number of tasks per resource
     upper_limit : np.array(shape=(resources), dtype=int)
         Upper limit of number of tasks per resource
+    upper_bound : float or None (default None)
+        Total cost of a known assignment (e.g., from a heuristic) used
+        to prune partial solutions
 
     Returns
     -------
     np.array(shape=(resources))
         Assignment of tasks to resources
+
+    Raises
+    ------
+    ValueError
+        If no assignment has a total cost of at most upper_bound
+
+    Notes
+    -----
+    With an upper bound, a partial solution Z_i(t) is discarded when
+    its cost plus a lower bound of the cost of the tasks left for the
+    next resources (see bounds.suffix_bounds) exceeds the upper bound,
+    and only the remaining partial solutions are extended. Numbers of
+    tasks whose costs are too far above the convex hull of their
+    resource are not tried (see bounds.candidate_choices).
     """
     # Initialization
+    stats = _stats
+    improvements = 0
+    cells = 0
     # K = minimal costs
     # I = Partial solutions (schedule for a given resource and t)
     K = np.full(shape=(resources, tasks+1), fill_value=np.inf)
     I = np.zeros(shape=(resources, tasks+1), dtype=int)
+    # Numbers of tasks tried for each resource
+    choices = [range(lower_limit[i], upper_limit[i]+1)
+               for i in range(resources)]
+    if upper_bound is not None:
+        hull = bounds.lower_hulls(cost, lower_limit, upper_limit)
+        G = bounds.suffix_bounds(tasks, hull, lower_limit, upper_limit)
+        choices = [row.tolist() for row in bounds.candidate_choices(
+            tasks, cost, lower_limit, upper_limit, upper_bound, hull,
+            G[0][tasks])]
+        # Tolerance for the rounding errors of the bounds
+        limit = upper_bound + 1e-9 * max(1.0, abs(upper_bound))
     # Solutions for Z_1
-    for j in range(lower_limit[0], upper_limit[0]+1):
+    for j in choices[0]:
         K[0][j] = cost[0][j]
         I[0][j] = j
+    # Partial solutions extended for the next resource
+    states = range(tasks+1)
+    if upper_bound is not None:
+        states = _prune(K[0], G[1][::-1], limit)
     # Solutions for Z_i
     for i in range(1, resources):
         # All possible values for x_i
-        for j in range(lower_limit[i], upper_limit[i]+1):
+        for j in choices[i]:
             c = cost[i][j]
-            for t in range(j, tasks+1):
-                if K[i-1][t-j] + c < K[i][t]:
+            # Partial solutions of Z_{i-1} that leave room for j tasks
+            previous = states[:bisect.bisect_right(states, tasks-j)]
+            for s in previous:
+                t = s + j
+                if K[i-1][s] + c < K[i][t]:
                     # New best solution for Z_i(t)
-                    K[i][t] = K[i-1][t-j] + c
+                    K[i][t] = K[i-1][s] + c
                     I[i][t] = j
+                    if stats is not None:
+                        improvements += 1
+            cells += len(previous)
+        if upper_bound is not None:
+            states = _prune(K[i], G[i+1][::-1], limit)
+    if stats is not None:
+        stats.count('dp_cells', cells)
+        stats.count('improvements', improvements)
+    if upper_bound is not None and not K[resources-1][tasks] < np.inf:
+        raise ValueError(f'No assignment costs at most {upper_bound}')
     # Gets the final assignment from the support matrices
     assignment = np.zeros(resources, dtype=int)
     t = tasks
@@ -63,7 +381,7 @@ def mc2mkp(
     return assignment
 
 
-def marin(
+def mc2mkp_batch(
         tasks,
         resources,
         cost,
@@ -71,7 +389,207 @@ def marin(
         upper_limit
         ):
     """
-    Finds an assignment of tasks to resources using MarIn.
+    Finds assignments for multiple independent instances using the
+    dynamic programming algorithm for the (MC)^2MKP problem.
+
+    Parameters
+    ----------
+    tasks : np.array(shape=(instances), dtype=int)
+        Number of tasks of each instance (tau)
+    resources : int
+        Number of resources (R) of the largest instance
+    cost : np.ndarray(shape=(instances, resources, max(tasks)+1))
+        Cost functions per resource of each instance (C). Costs are
+        only read up to the upper limits, so fewer columns are enough
+    lower_limit : np.ndarray(shape=(instances, resources), dtype=int)
+        Lower limit of number of tasks per resource of each instance
+    upper_limit : np.ndarray(shape=(instances, resources), dtype=int)
+        Upper limit of number of tasks per resource of each instance
+
+    Returns
+    -------
+    np.ndarray(shape=(instances, resources))
+        Assignment of tasks to resources of each instance
+
+    Notes
+    -----
+    Instances with fewer resources are padded with resources whose
+    lower and upper limits are zero (see support.stack_instances).
+    The loops over resources and numbers of tasks of mc2mkp are kept,
+    while the instances and the partial numbers of tasks (t) are
+    updated together with array operations. Candidates are compared in
+    the same order and with the same strict comparison as in mc2mkp, so
+    each instance gets the same assignment as with mc2mkp.
+    """
+    tasks = np.asarray(tasks)
+    cost = np.asarray(cost, dtype=float)
+    instances = tasks.size
+    max_tasks = np.max(tasks)
+    # Largest number of tasks of a resource with a cost
+    width = min(cost.shape[2] - 1, max_tasks)
+    b = np.arange(instances)
+    # K = minimal costs
+    # I = Partial solutions (schedule for a given resource and t)
+    K = np.full(shape=(instances, max_tasks+1), fill_value=np.inf)
+    I = np.zeros(shape=(instances, resources, max_tasks+1), dtype=int)
+    # Solutions for Z_1
+    j = np.arange(width+1)
+    valid = (j >= lower_limit[:, 0, None]) & (j <= upper_limit[:, 0, None])
+    K[:, :width+1][valid] = cost[:, 0, :width+1][valid]
+    I[:, 0, :width+1][valid] = np.broadcast_to(j, valid.shape)[valid]
+    # Solutions for Z_i
+    for i in range(1, resources):
+        previous = K
+        K = np.full(shape=(instances, max_tasks+1), fill_value=np.inf)
+        first = np.min(lower_limit[:, i])
+        last = min(np.max(upper_limit[:, i]), width)
+        # All possible values for x_i
+        for j in range(first, last+1):
+            active = (j >= lower_limit[:, i]) & (j <= upper_limit[:, i])
+            # Costs of giving j tasks to resource i for all t >= j
+            candidate = previous[:, :max_tasks+1-j] + cost[:, i, j, None]
+            better = (candidate < K[:, j:]) & active[:, None]
+            # New best solutions for Z_i(t)
+            K[:, j:][better] = candidate[better]
+            I[:, i, j:][better] = j
+    # Gets the final assignments from the support matrices
+    assignment = np.zeros((instances, resources), dtype=int)
+    t = tasks.copy()
+    for i in reversed(range(resources)):
+        assignment[:, i] = I[b, i, t]  # Number of tasks to resource i
+        t = t - assignment[:, i]       # index for the solution of i-1
+    return assignment
+
+
+def mc2mkp_hull(
+        tasks,
+        resources,
+        cost,
+        lower_limit,
+        upper_limit,
+        upper_bound=None
+        ):
+    """
+    Finds an assignment of tasks to resources using (MC)^2MKP over the
+    resources with non-convex costs and a single resource standing for
+    all resources with convex costs.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    resources : int
+        Number of resources (R)
+    cost : np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource (C)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+    upper_bound : float or None (default None)
+        Total cost of a known assignment (see mc2mkp)
+
+    Returns
+    -------
+    np.array(shape=(resources))
+        Assignment of tasks to resources
+
+    Notes
+    -----
+    A resource is convex when its costs are equal to their lower convex
+    hull within its limits (see bounds.convex_rows). The cheapest way
+    to give k tasks to a group of convex resources is to give them
+    their lower limits and the k - sum(lower_limit) smallest marginal
+    costs, so the group is replaced by one resource with these costs
+    and the result is exact. The dynamic programming then handles
+    fewer resources, which helps fleets with mostly convex costs.
+    """
+    with _phase('hull'):
+        convex = bounds.convex_rows(cost, lower_limit, upper_limit)
+    merged = np.flatnonzero(convex)
+    if len(merged) < 2:
+        return mc2mkp(tasks, resources, cost, lower_limit, upper_limit,
+                      upper_bound)
+    kept = np.flatnonzero(~convex)
+    # Marginal costs of the convex resources (row-major order keeps the
+    # resource order for ties)
+    width = np.max(upper_limit[merged])
+    x = np.arange(width)
+    valid = ((x >= lower_limit[merged, None]) &
+             (x < upper_limit[merged, None]))
+    keys = np.diff(cost[merged, :width+1], axis=1)[valid]
+    rows = np.nonzero(valid)[0]
+    first = np.sum(lower_limit[merged])
+    order = np.argsort(keys, kind='stable')[:max(tasks - first, 0)]
+    # Costs of the merged resource
+    columns = max(cost.shape[1], tasks+1)
+    reduced = np.full((len(kept)+1, columns), np.inf)
+    reduced[:len(kept), :cost.shape[1]] = cost[kept]
+    last = min(first + len(order), tasks)
+    reduced[-1][first:last+1] = (np.sum(cost[merged, lower_limit[merged]]) +
+                                 np.concatenate(([0.0],
+                                                 np.cumsum(keys[order]))))
+    lower = np.append(lower_limit[kept], first)
+    upper = np.append(upper_limit[kept], last)
+    partial = mc2mkp(tasks, len(kept)+1, reduced, lower, upper, upper_bound)
+    # Splits the tasks of the merged resource among the convex resources
+    assignment = np.zeros(resources, dtype=int)
+    assignment[kept] = partial[:-1]
+    assignment[merged] = lower_limit[merged] + np.bincount(
+        rows[order[:partial[-1] - first]], minlength=len(merged))
+    return assignment
+
+
+def hull_threshold(
+        tasks,
+        resources,
+        cost,
+        lower_limit,
+        upper_limit
+        ):
+    """
+    Finds an assignment of tasks to resources that is optimal for the
+    lower convex hulls of the costs.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    resources : int
+        Number of resources (R)
+    cost : np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource (C)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+
+    Returns
+    -------
+    np.array(shape=(resources))
+        Assignment of tasks to resources
+
+    Notes
+    -----
+    Its total cost is usually close to the lower bound for costs with
+    noise, so it gives a good upper bound to prune (MC)^2MKP (see
+    bounds.threshold_assignment).
+    """
+    hull = bounds.lower_hulls(cost, lower_limit, upper_limit)
+    return bounds.threshold_assignment(tasks, hull, lower_limit, upper_limit)
+
+
+def dispatch(
+        tasks,
+        resources,
+        cost,
+        lower_limit,
+        upper_limit,
+        heuristics=None
+        ):
+    """
+    Finds an optimal assignment of tasks to resources, running (MC)^2MKP
+    only if no heuristic is proven optimal by the lower bound.
 
     Parameters
     ----------
@@ -85,6 +603,10 @@ def marin(
         Lower limit of number of tasks per resource
     upper_limit : np.array(shape=(resources), dtype=int)
         Upper limit of number of tasks per resource
+    heuristics : list of callables or None (default None)
+        Schedulers called as function(tasks, resources, cost,
+        lower_limit, upper_limit) (default: MarIn, MarCo, and
+        hull_threshold)
 
     Returns
     -------
@@ -93,35 +615,172 @@ def marin(
 
     Notes
     -----
+    The best valid heuristic assignment is returned when its total cost
+    reaches the lower bound (see bounds.certify), which happens with
+    increasing or constant marginal costs. Otherwise, its total cost
+    prunes the partial solutions of (MC)^2MKP, which only handles the
+    resources with non-convex costs (see mc2mkp_hull).
+    """
+    if heuristics is None:
+        heuristics = [marin, marco, hull_threshold]
+    best = None
+    best_cost = np.inf
+    r = np.arange(resources)
+    for heuristic in heuristics:
+        assignment = heuristic(tasks, resources, cost, lower_limit,
+                               upper_limit)
+        if np.sum(assignment) != tasks or \
+                np.any(assignment < lower_limit) or \
+                np.any(assignment > upper_limit):
+            continue
+        total_cost = np.sum(cost[r, assignment])
+        if total_cost < best_cost:
+            best, best_cost = assignment, total_cost
+    if best is None:
+        return mc2mkp_hull(tasks, resources, cost, lower_limit, upper_limit)
+    with _phase('certify'):
+        optimal = bounds.certify(tasks, resources, cost, lower_limit,
+                                 upper_limit, best)
+    if optimal:
+        return best
+    return mc2mkp_hull(tasks, resources, cost, lower_limit, upper_limit,
+                       upper_bound=best_cost)
+
+
+def marin(
+        tasks,
+        resources,
+        cost,
+        lower_limit,
+        upper_limit,
+        bulk=False,
+        queue='heapq'
+        ):
+    """
+    Finds an assignment of tasks to resources using MarIn.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    resources : int
+        Number of resources (R)
+    cost : np.ndarray(shape=(resources, tasks+1)), callable, or iterables
+        Cost functions per resource (C), read on demand
+        (see MarginalCosts)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+    bulk : boolean (default False)
+        True if runs of tasks should be assigned per heap pop
+    queue : string or callable (default 'heapq')
+        Priority queue to use ('heapq', 'bucket', or a callable accepted
+        by queues.create_queue), or 'batch' for a vectorized extraction
+        of the smallest marginal costs
+
+    Returns
+    -------
+    np.array(shape=(resources))
+        Assignment of tasks to resources
+
+    Raises
+    ------
+    ValueError
+        If the 'batch' option is combined with the bulk mode or with a
+        cost source that is not a matrix
+
+    Notes
+    -----
+    Only the costs around the current assignment of each resource are
+    read, so cost models and streams run in O(resources) memory.
+
+    In bulk mode, the popped resource receives all the tasks whose
+    marginal costs stay below the next key in the heap at once. The
+    schedule is the same, but resources with long runs of cheap tasks
+    need a single pop instead of one per task.
+
+    The 'batch' option requires a cost matrix and picks the smallest
+    marginal costs of all resources with a single partition. It gives
+    the same schedule only if the marginal costs are increasing.
+
     Based on OLAR, published on “Optimal task assignment for
     heterogeneous federated learning devices,” in 2021 IEEE
     International Parallel and Distributed Processing Symposium
     (IPDPS), 2021, pp. 661–670.
     """
+    if isinstance(queue, str) and queue == 'batch':
+        if bulk:
+            raise ValueError('The batch extraction does not support the' +
+                             ' bulk mode')
+        return marin_batch(tasks, resources, cost, lower_limit, upper_limit)
     # Initialization
+    stats = _stats
+    pushes = 0
     heap = []
+    marginal = MarginalCosts(cost)
     # Assigns lower limit to all resources
     assignment = np.copy(lower_limit)
     for i in range(resources):
         # Initializes the heap
         if assignment[i] < upper_limit[i]:
-            heap.append(((cost[i][assignment[i]+1]
-                          - cost[i][assignment[i]]), i))
-    heapq.heapify(heap)
+            heap.append((marginal.at(i, assignment[i]), i))
+    heap = queues.create_queue(queue, heap)
     # Computes zeta (sum of lower limits)
     zeta = np.sum(lower_limit)
+    if bulk:
+        # Iterates assigning runs of the remaining tasks
+        t = zeta
+        pops = 0
+        while t < tasks:
+            c, j = heap.pop()  # Find minimum cost
+            # Next key in the heap (j wins ties against larger indices)
+            top = heap.peek()
+            if top is not None:
+                key, k = top
+                side = 'right' if j < k else 'left'
+            else:
+                key, side = np.inf, 'right'
+            # Reads the marginal costs of j in growing windows until
+            # one of them passes the key
+            stop = min(upper_limit[j], assignment[j] + tasks - t)
+            size = 2
+            while True:
+                end = min(assignment[j] + size, stop)
+                run = marginal.row(j, assignment[j], end)
+                # The running maximum is sorted even if the costs are not
+                n = np.searchsorted(np.maximum.accumulate(run), key, side)
+                if n < run.size or end == stop:
+                    break
+                size *= 2
+            n = max(n, 1)  # the popped task is always assigned
+            assignment[j] += n  # Assigns a run of tasks
+            t += n
+            # Checks if more tasks can be assigned to j
+            if assignment[j] < upper_limit[j]:
+                heap.push((marginal.at(j, assignment[j]), j))
+                pushes += 1
+            pops += 1
+        if stats is not None:
+            stats.count('heap_pops', pops)
+            stats.count('heap_pushes', pushes)
+        return assignment
     # Iterates assigning the remaining tasks
+    pop, push = heap.pop, heap.push
     for t in range(zeta+1, tasks+1):
-        c, j = heapq.heappop(heap)  # Find minimum cost
+        c, j = pop()  # Find minimum cost
         assignment[j] += 1  # Assigns task t
         # Checks if more tasks can be assigned to j
         if assignment[j] < upper_limit[j]:
-            heapq.heappush(heap, ((cost[j][assignment[j]+1]
-                                   - cost[j][assignment[j]]), j))
+            push((marginal.at(j, assignment[j]), j))
+            pushes += 1
+    if stats is not None:
+        stats.count('heap_pops', max(tasks - zeta, 0))
+        stats.count('heap_pushes', pushes)
     return assignment
 
 
-def marco(
+def marin_batch(
         tasks,
         resources,
         cost,
@@ -129,6 +788,61 @@ def marco(
         upper_limit
         ):
     """
+    Finds an assignment of tasks to resources using MarIn with a
+    vectorized extraction of the smallest marginal costs.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    resources : int
+        Number of resources (R)
+    cost : np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource (C)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+
+    Returns
+    -------
+    np.array(shape=(resources))
+        Assignment of tasks to resources
+
+    Raises
+    ------
+    ValueError
+        If the costs are not a matrix (e.g., a cost model or streams)
+
+    Notes
+    -----
+    When marginal costs are increasing, the tasks popped by MarIn are
+    the (tasks - sum(lower_limit)) smallest marginal costs over all
+    resources, with ties broken by resource. They are found here with a
+    single partition over the marginal cost matrix.
+    """
+    if not isinstance(cost, np.ndarray):
+        raise ValueError('The batch extraction requires a cost matrix')
+    # Marginal costs of every task within the limits of each resource
+    width = np.max(upper_limit)
+    x = np.arange(width)
+    valid = (x >= lower_limit[:, None]) & (x < upper_limit[:, None])
+    keys = np.diff(cost[:, :width+1], axis=1)[valid]
+    # Row-major order keeps the resource order for ties
+    rows = np.nonzero(valid)[0]
+    chosen = queues.smallest(keys, tasks - np.sum(lower_limit))
+    return lower_limit + np.bincount(rows[chosen], minlength=resources)
+
+
+def marco(
+        tasks,
+        resources,
+        cost,
+        lower_limit,
+        upper_limit,
+        queue='batch'
+        ):
+    """
     Finds an assignment of tasks to resources using MarCo.
 
     Parameters
@@ -143,30 +857,56 @@ def marco(
         Lower limit of number of tasks per resource
     upper_limit : np.array(shape=(resources), dtype=int)
         Upper limit of number of tasks per resource
+    queue : string or callable (default 'batch')
+        'batch' for a vectorized sort of the resources, or a priority
+        queue ('heapq', 'bucket', or a callable accepted by
+        queues.create_queue) to pop them one by one
 
     Returns
     -------
     np.array(shape=(resources))
         Assignment of tasks to resources
+
+    Notes
+    -----
+    In batch mode, resources are sorted once by their first marginal
+    cost (ties broken by index, as with a heap of (cost, index) pairs)
+    and filled in order with np.cumsum instead of being popped one by
+    one. All options give the same schedule.
     """
-    # Initialization
-    heap = []
     # Assigns lower limit to all resources
     assignment = np.copy(lower_limit)
-    for i in range(resources):
-        # Initializes the heap
-        if assignment[i] < upper_limit[i]:
-            heap.append((cost[i][1] - cost[i][0], i))
-    heapq.heapify(heap)
-    # Computes how many tasks have been assigned already
-    t = np.sum(lower_limit)
-    # Iterates assigning the remaining tasks in groups
-    while t < tasks:
-        c, j = heapq.heappop(heap)  # Find minimum cost
-        # Finds how many tasks the resource can still receive
-        a = min(upper_limit[j] - lower_limit[j], tasks - t)
-        assignment[j] += a  # Assigns a group of tasks
-        t += a
+    # Computes how many tasks are still left to assign
+    tasks_left = tasks - np.sum(lower_limit)
+    if tasks_left <= 0:
+        # The cost matrix may not have a column for a first extra task
+        return assignment
+    # Resources that can still receive tasks
+    r = np.arange(resources)
+    r = r[assignment < upper_limit]
+    marginal = cost[r, 1] - cost[r, 0]
+    if not (isinstance(queue, str) and queue == 'batch'):
+        heap = queues.create_queue(queue, zip(marginal, r))
+        pops = 0
+        # Iterates assigning the remaining tasks in groups
+        while tasks_left > 0:
+            c, j = heap.pop()  # Find minimum cost
+            # Finds how many tasks the resource can still receive
+            a = min(upper_limit[j] - lower_limit[j], tasks_left)
+            assignment[j] += a  # Assigns a group of tasks
+            tasks_left -= a
+            pops += 1
+        if _stats is not None:
+            _stats.count('heap_pushes', r.size)
+            _stats.count('heap_pops', pops)
+        return assignment
+    # Orders them by marginal cost (stable sort keeps the index order)
+    order = r[np.argsort(marginal, kind='stable')]
+    # Capacity of each resource and tasks assigned before reaching it
+    capacity = upper_limit[order] - lower_limit[order]
+    before = np.cumsum(capacity) - capacity
+    # Assigns groups of tasks until no tasks are left
+    assignment[order] += np.clip(tasks_left - before, 0, capacity)
     return assignment
 
 
@@ -201,24 +941,59 @@ def mardecun(
     l = np.sum(lower_limit)
     t = tasks - l  # and how many are still left to assign
     # Resource with minimal cost for the remaining tasks
-    min_resource = 0
-    min_cost = cost[0][lower_limit[0] + t] - cost[0][lower_limit[0]]
-    for i in range(1, resources):
-        new_cost = cost[i][lower_limit[i] + t] - cost[i][lower_limit[i]]
-        if min_cost > new_cost:
-            # New minimal
-            min_resource = i
-            min_cost = new_cost
+    # (argmin keeps the first resource in case of ties)
+    r = np.arange(resources)
+    min_resource = np.argmin(cost[r, lower_limit + t] - cost[r, lower_limit])
     # Assigns all remaining tasks to the same resource
     assignment[min_resource] += t
     return assignment
 
+
+def mardecun_batch(
+        tasks,
+        resources,
+        cost,
+        lower_limit
+        ):
+    """
+    Finds assignments for multiple numbers of tasks using MarDecUn.
+
+    Parameters
+    ----------
+    tasks : np.array(shape=(instances), dtype=int)
+        Numbers of tasks to schedule (one tau per instance)
+    resources : int
+        Number of resources (R)
+    cost : np.ndarray(shape=(resources, max(tasks)+1))
+        Cost functions per resource (C)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+
+    Returns
+    -------
+    np.ndarray(shape=(instances, resources))
+        Assignment of tasks to resources for each number of tasks
+    """
+    tasks = np.asarray(tasks)
+    # Tasks left to assign after the lower limits for each instance
+    t = tasks - np.sum(lower_limit)
+    # Cost of receiving the remaining tasks for all resources and instances
+    r = np.arange(resources)
+    marginal = (cost[r[:, None], lower_limit[:, None] + t[None, :]]
+                - cost[r, lower_limit][:, None])
+    min_resource = np.argmin(marginal, axis=0)
+    # Assigns all remaining tasks to the same resource in each instance
+    assignment = np.tile(lower_limit, (tasks.size, 1))
+    assignment[np.arange(tasks.size), min_resource] += t
+    return assignment
+
 def mardec(
         tasks,
         resources,
         cost,
         lower_limit,
-        upper_limit
+        upper_limit,
+        sparse=False
         ):
     """
     Finds an assignment of tasks to resources using MarDec.
@@ -235,6 +1010,9 @@ def mardec(
         Lower limit of number of tasks per resource
     upper_limit : np.array(shape=(resources), dtype=int)
         Upper limit of number of tasks per resource
+    sparse : bool (default False)
+        True to store only the reachable numbers of tasks of the
+        partial solutions (see mcmkp_frontiers)
 
     Returns
     -------
@@ -258,52 +1036,154 @@ def mardec(
     # Case 1: solution with a resource from Runl at intermediary capacity
     if Runl.size > 0:
         # Prepares and gets the matrices in one single function
-        K, I = mcmkp_matrices(tasks_left, Rlim, cost, lower_limit, upper_limit)
+        with _phase('mcmkp_matrices'):
+            K, solution = _partial_solutions(tasks_left, Rlim, cost,
+                                             lower_limit, upper_limit, sparse)
         # Evaluates all partial solutions
-        for t in range(0, tasks_left+1):
-            # Finds the unlimited resource with the smallest cost
-            # when receiving t extra tasks
-            min_resource = Runl[0]
-            min_cost = cost[min_resource][lower_limit[min_resource] + t] \
-                       - cost[min_resource][lower_limit[min_resource]]
-            for i in range(1, Runl.size):
-                new_resource = Runl[i]
-                new_cost = cost[new_resource][lower_limit[new_resource] + t] \
-                           - cost[new_resource][lower_limit[new_resource]]
-                if new_cost < min_cost:
-                    min_cost = new_cost
-                    min_resource = new_resource
-            # Checks if it finds a better solution with this resource
-            if min_cost + K[Rlim.size - 1][tasks_left - t] < total_cost:
-                # Updates the best solution
-                total_cost = min_cost + K[Rlim.size - 1][tasks_left - t]
-                assignment = translate(I, lower_limit, tasks_left - t, Rlim)
-                assignment[min_resource] += t
+        with _phase('scan'):
+            # Only the totals reached by the limited resources have
+            # partial solutions (K is infinite elsewhere)
+            reached = np.flatnonzero(K < np.inf)
+            for t in (tasks_left - reached[::-1]).tolist():
+                # Finds the unlimited resource with the smallest cost
+                # when receiving t extra tasks
+                min_resource = Runl[0]
+                min_cost = cost[min_resource][lower_limit[min_resource] + t] \
+                           - cost[min_resource][lower_limit[min_resource]]
+                for i in range(1, Runl.size):
+                    new_resource = Runl[i]
+                    new_cost = cost[new_resource][lower_limit[new_resource] + t] \
+                               - cost[new_resource][lower_limit[new_resource]]
+                    if new_cost < min_cost:
+                        min_cost = new_cost
+                        min_resource = new_resource
+                # Checks if it finds a better solution with this resource
+                if min_cost + K[tasks_left - t] < total_cost:
+                    # Updates the best solution
+                    total_cost = min_cost + K[tasks_left - t]
+                    with _phase('translate'):
+                        assignment = solution(tasks_left - t)
+                    assignment[min_resource] += t
 
     # Case 2: solution with a resource from Rlim at intermediary capacity
     for i in range(Rlim.size):
         # Remove the i-th limited resource for evaluation
-        Reval = np.delete(Rlim, i)
+        with _phase('delete'):
+            Reval = np.delete(Rlim, i)
         # Prepares and gets the matrices in one single function
-        K, I = mcmkp_matrices(tasks_left, Reval, cost, lower_limit, upper_limit)
+        with _phase('mcmkp_matrices'):
+            K, solution = _partial_solutions(tasks_left, Reval, cost,
+                                             lower_limit, upper_limit, sparse)
         # Evaluates all partial solutions
         max_tasks = min(tasks_left+1, upper_limit[Rlim[i]] - lower_limit[Rlim[i]])
-        for t in range(0, max_tasks):
-            # Finds the cost for the limited resource of interest
-            # when receiving t extra tasks
-            min_resource = Rlim[i]
-            min_cost = cost[min_resource][lower_limit[min_resource] + t] \
-                       - cost[min_resource][lower_limit[min_resource]]
-            # Checks if it finds a better solution with this resource
-            if min_cost + K[Reval.size - 1][tasks_left - t] < total_cost:
-                # Updates the best solution
-                total_cost = min_cost + K[Reval.size - 1][tasks_left - t]
-                assignment = translate(I, lower_limit, tasks_left - t, Reval)
-                assignment[min_resource] += t
+        with _phase('scan'):
+            extra = tasks_left - np.flatnonzero(K < np.inf)[::-1]
+            for t in extra[extra < max_tasks].tolist():
+                # Finds the cost for the limited resource of interest
+                # when receiving t extra tasks
+                min_resource = Rlim[i]
+                min_cost = cost[min_resource][lower_limit[min_resource] + t] \
+                           - cost[min_resource][lower_limit[min_resource]]
+                # Checks if it finds a better solution with this resource
+                if min_cost + K[tasks_left - t] < total_cost:
+                    # Updates the best solution
+                    total_cost = min_cost + K[tasks_left - t]
+                    with _phase('translate'):
+                        assignment = solution(tasks_left - t)
+                    assignment[min_resource] += t
 
     # Returns the best schedule found
     return assignment
 
+
+def _partial_solutions(tasks, R, cost, lower_limit, upper_limit, sparse):
+    """
+    Runs the MCMKP algorithm for MarDec.
+
+    Returns
+    -------
+    np.array(shape=(tasks+1))
+        Minimal costs using all resources in R
+    callable
+        Function giving the assignment for a number of tasks
+    """
+    if not sparse:
+        K, I = mcmkp_matrices(tasks, R, cost, lower_limit, upper_limit)
+        return K[R.size - 1], functools.partial(translate, I, lower_limit,
+                                                R=R)
+    frontiers = mcmkp_frontiers(tasks, R, cost, lower_limit, upper_limit)
+    K = np.full(shape=tasks+1, fill_value=np.inf)
+    if frontiers:
+        totals, costs, extra = frontiers[-1]
+        K[totals] = costs
+    else:
+        K[0] = 0.0
+    return K, functools.partial(translate_frontiers, frontiers, lower_limit,
+                                R=R)
+
+
+def subset_sums(
+        tasks,
+        sizes
+        ):
+    """
+    Finds the totals reachable by adding subsets of sizes.
+
+    Parameters
+    ----------
+    tasks : int
+        Largest total of interest
+    sizes : np.array(dtype=int)
+        Sizes that can be added (e.g., extra tasks of the resources)
+
+    Returns
+    -------
+    list of int
+        Bitsets of the totals up to tasks reachable with the first i+1
+        sizes (bit t is set if t is reachable)
+
+    Notes
+    -----
+    The bitsets are Python integers updated with one shift and one or
+    per size, so the work is O(tasks/64) word operations per size.
+    """
+    mask = (1 << (int(tasks) + 1)) - 1
+    bits = 1  # Zero is reachable with the empty subset
+    reach = []
+    for size in sizes:
+        bits = (bits | (bits << int(size))) & mask
+        reach.append(bits)
+    return reach
+
+
+def reachable_totals(
+        bits,
+        limit
+        ):
+    """
+    Lists the totals in a bitset (see subset_sums).
+
+    Parameters
+    ----------
+    bits : int
+        Bitset of reachable totals
+    limit : int
+        Largest total of interest
+
+    Returns
+    -------
+    list of int
+        Reachable totals up to limit, in increasing order
+    """
+    limit = int(limit)
+    if limit < 0:
+        return []
+    bits &= (1 << (limit + 1)) - 1
+    raw = np.frombuffer(bits.to_bytes(limit // 8 + 1, 'little'),
+                        dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder='little')).tolist()
+
+
 def mcmkp_matrices(
         tasks,
         R,
@@ -339,9 +1219,14 @@ def mcmkp_matrices(
     The proposed solutions consider only two scenarios:
         - Mapping zero extra tasks to a resource (its lower limit)
         - Mapping the most tasks possible to a resource (its upper limit)
+    The costs are only relaxed from the totals reachable by the previous
+    resources (see subset_sums), as the other entries are infinite.
     """
     # Initialization
     resources = R.size
+    cells = 0
+    # Totals of extra tasks reachable by the first i+1 resources
+    reach = subset_sums(tasks, upper_limit[R] - lower_limit[R])
     # K = minimal costs
     # I = Partial solutions (schedule for a given resource and t)
     K = np.full(shape=(resources, tasks+1), fill_value=np.inf)
@@ -364,14 +1249,127 @@ def mcmkp_matrices(
         k = R[i]  # i resource in the list
         j = upper_limit[k] - lower_limit[k]  # number of extra tasks
         c = cost[k][upper_limit[k]] - cost[k][lower_limit[k]]  # cost
-        for t in range(j, tasks+1):
-            if K[i-1][t-j] + c < K[i][t]:
+        # Only the totals reached by the previous resources can improve
+        totals = reachable_totals(reach[i-1], tasks - j)
+        for s in totals:
+            t = s + j
+            if K[i-1][s] + c < K[i][t]:
                 # New best solution for Z_i(t)
-                K[i][t] = K[i-1][t-j] + c
+                K[i][t] = K[i-1][s] + c
                 I[i][t] = j
+        cells += len(totals)
+    if _stats is not None:
+        _stats.count('dp_cells', cells)
+        # Each total improves at most once per resource, and only
+        # improved totals of Z_i (i > 1) have nonzero partial solutions
+        _stats.count('improvements', np.count_nonzero(I[1:]))
     return K, I
 
 
+def mcmkp_frontiers(
+        tasks,
+        R,
+        cost,
+        lower_limit,
+        upper_limit
+        ):
+    """
+    Runs the MCMKP algorithm of mcmkp_matrices keeping only the numbers
+    of tasks that can be reached.
+
+    Parameters
+    ----------
+    tasks : int
+        Number of tasks (tau)
+    R : np.ndarray(dtype=int)
+        List of resources to consider
+    cost : np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource (C)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    upper_limit : np.array(shape=(resources), dtype=int)
+        Upper limit of number of tasks per resource
+
+    Returns
+    -------
+    list of tuples
+        For each resource of R, the reachable numbers of extra tasks
+        (sorted), their minimal costs, and the extra tasks given to the
+        resource
+
+    Notes
+    -----
+    Each frontier is found from the previous one with array operations,
+    so the work and memory are proportional to the number of reachable
+    totals instead of tasks+1 per resource. Ties keep the solution with
+    zero extra tasks for the resource, as in mcmkp_matrices, so both
+    lead to the same assignments.
+    """
+    totals = np.zeros(1, dtype=int)
+    costs = np.zeros(1)
+    frontiers = []
+    for k in R:
+        j = upper_limit[k] - lower_limit[k]  # number of extra tasks
+        c = cost[k][upper_limit[k]] - cost[k][lower_limit[k]]  # cost
+        fits = totals <= tasks - j
+        new_totals = np.concatenate((totals, totals[fits] + j))
+        new_costs = np.concatenate((costs, costs[fits] + c))
+        extra = np.concatenate((np.zeros(totals.size, dtype=int),
+                                np.full(np.count_nonzero(fits), j)))
+        # Sorts by total, then cost, then extra tasks, and keeps the
+        # first solution of each total
+        order = np.lexsort((extra, new_costs, new_totals))
+        new_totals = new_totals[order]
+        first = np.ones(order.size, dtype=bool)
+        first[1:] = new_totals[1:] != new_totals[:-1]
+        totals = new_totals[first]
+        costs = new_costs[order][first]
+        frontiers.append((totals, costs, extra[order][first]))
+    if _stats is not None:
+        _stats.count('dp_cells', sum(frontier[0].size
+                                     for frontier in frontiers))
+    return frontiers
+
+
+def translate_frontiers(
+        frontiers,
+        lower_limit,
+        tasks,
+        R
+        ):
+    """
+    Translates a partial solution of mcmkp_frontiers to a schedule.
+
+    Parameters
+    ----------
+    frontiers : list of tuples
+        Reachable totals, costs, and extra tasks (see mcmkp_frontiers)
+    lower_limit : np.array(shape=(resources), dtype=int)
+        Lower limit of number of tasks per resource
+    tasks : int
+        Number of tasks (tau)
+    R : np.ndarray(dtype=int)
+        List of resources to consider
+
+    Returns
+    -------
+    np.array(shape=(resources))
+        Assignment of tasks to resources
+    """
+    if _stats is not None:
+        _stats.count('translate_calls')
+    # Assigns the lower limits to all resources
+    assignment = np.copy(lower_limit)
+    # Goes through the frontiers to find the extra tasks to assign
+    t = tasks
+    for i in reversed(range(R.size)):
+        totals, costs, extra = frontiers[i]
+        j = extra[np.searchsorted(totals, t)]  # Extra tasks to R[i]
+        assignment[R[i]] += j
+        t = t - j    # total for the frontier of the i-th -1 resource
+    return assignment
+
+
 def translate(
         I,
         lower_limit,
@@ -397,6 +1395,8 @@ def translate(
     np.array(shape=(resources))
         Assignment of tasks to resources
     """
+    if _stats is not None:
+        _stats.count('translate_calls')
     # Assigns the lower limits to all resources
     assignment = np.copy(lower_limit)
     # Goes through the partial solutions to find the extra tasks to assign
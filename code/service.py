@@ -0,0 +1,325 @@
+"""
+Module containing a long-lived scheduling service with a result cache.
+"""
+
+import asyncio
+import collections
+import hashlib
+import json
+import numpy as np
+
+from . import benchmark
+
+# Longest line accepted by the socket server (cost matrices are sent as
+# JSON lines)
+LINE_LIMIT = 2**26
+
+
+def model_digest(cost):
+    """
+    Gives the identifier of a cost model.
+
+    Parameters
+    ----------
+    cost : np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource (C)
+
+    Returns
+    -------
+    string
+        Hexadecimal blake2b digest of the shape, type, and values
+    """
+    cost = np.ascontiguousarray(cost)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((cost.shape, cost.dtype.str)).encode())
+    digest.update(cost.data)
+    return digest.hexdigest()
+
+
+class SchedulerService:
+    """
+    Scheduling service reusing the results of repeated requests.
+
+    Attributes
+    ----------
+    cache_size : int
+        Maximum number of assignments kept in the cache
+    executor : concurrent.futures.Executor or None
+        Executor running the schedulers (default: the loop's executor)
+    model_limit : int
+        Maximum number of cost models kept
+    models : collections.OrderedDict
+        Registered cost matrices indexed by their identifiers, from
+        least to most recently used
+    cache : collections.OrderedDict
+        Assignments indexed by request, from least to most recently used
+    in_flight : dict
+        Tasks computing the assignments of requests not yet in the cache
+    counts : collections.Counter
+        Number of cache hits, misses, coalesced requests, evictions, and
+        model evictions
+
+    Notes
+    -----
+    A request is identified by its cost model, scheduler, number of
+    tasks, and limits. Identical requests arriving while the first one
+    is being computed wait for the same result instead of running the
+    scheduler again. Cached assignments are read-only arrays shared by
+    all callers. When more than model_limit models are registered, the
+    least recently used one is forgotten with its cached assignments,
+    and its clients must register it again.
+    """
+
+    def __init__(self, cache_size=1024, executor=None, model_limit=64):
+        self.cache_size = cache_size
+        self.executor = executor
+        self.model_limit = model_limit
+        self.models = collections.OrderedDict()
+        self.cache = collections.OrderedDict()
+        self.in_flight = {}
+        self.counts = collections.Counter()
+
+    def register_model(self, cost, model_id=None):
+        """
+        Registers a cost model.
+
+        Parameters
+        ----------
+        cost : np.ndarray(shape=(resources, tasks+1))
+            Cost functions per resource (C)
+        model_id : string or None (default None)
+            Identifier of the model (default: digest of the costs)
+
+        Returns
+        -------
+        string
+            Identifier of the model
+
+        Notes
+        -----
+        Registering different costs under an existing identifier
+        removes the cached assignments of the old costs.
+        """
+        cost = np.array(cost, dtype=float)
+        cost.setflags(write=False)
+        digest = model_digest(cost)
+        if model_id is None:
+            model_id = digest
+        if model_id in self.models and self.models[model_id][1] != digest:
+            self.forget_model(model_id)
+        self.models[model_id] = (cost, digest)
+        self.models.move_to_end(model_id)
+        while len(self.models) > self.model_limit:
+            self.forget_model(next(iter(self.models)))
+            self.counts['model_evictions'] += 1
+        return model_id
+
+    def forget_model(self, model_id):
+        """
+        Removes a cost model and its cached assignments.
+
+        Parameters
+        ----------
+        model_id : string
+            Identifier of the model
+        """
+        cost, digest = self.models.pop(model_id)
+        # Other identifiers of the same costs keep their assignments
+        if any(other == digest for _, other in self.models.values()):
+            return
+        for key in [key for key in self.cache if key[0] == digest]:
+            del self.cache[key]
+
+    def _key(self, model_id, scheduler, tasks, lower_limit, upper_limit):
+        """
+        Gives the cache key of a request.
+        """
+        if model_id not in self.models:
+            raise KeyError(f'Unknown cost model {model_id}')
+        if scheduler not in benchmark.SCHEDULERS:
+            raise ValueError(f'Unknown scheduler {scheduler}')
+        self.models.move_to_end(model_id)
+        digest = self.models[model_id][1]
+        return (digest, scheduler, int(tasks),
+                np.asarray(lower_limit, dtype=int).tobytes(),
+                np.asarray(upper_limit, dtype=int).tobytes())
+
+    async def schedule(
+            self,
+            model_id,
+            tasks,
+            lower_limit,
+            upper_limit,
+            scheduler='(MC)2MKP'
+            ):
+        """
+        Finds an assignment of tasks to the resources of a cost model.
+
+        Parameters
+        ----------
+        model_id : string
+            Identifier of a registered cost model
+        tasks : int
+            Number of tasks (tau)
+        lower_limit : np.array(shape=(resources), dtype=int)
+            Lower limit of number of tasks per resource
+        upper_limit : np.array(shape=(resources), dtype=int)
+            Upper limit of number of tasks per resource
+        scheduler : string (default '(MC)2MKP')
+            Registered scheduler (see benchmark.SCHEDULERS)
+
+        Returns
+        -------
+        np.array(shape=(resources))
+            Assignment of tasks to resources (read-only)
+
+        Raises
+        ------
+        KeyError
+            If the cost model is not registered
+        ValueError
+            If the scheduler is unknown
+        """
+        key = self._key(model_id, scheduler, tasks, lower_limit, upper_limit)
+        assignment = self.cache.get(key)
+        if assignment is not None:
+            self.counts['hits'] += 1
+            self.cache.move_to_end(key)
+            return assignment
+        computation = self.in_flight.get(key)
+        if computation is None:
+            self.counts['misses'] += 1
+            computation = asyncio.ensure_future(self._compute(
+                key, self.models[model_id][0], scheduler, int(tasks),
+                np.array(lower_limit, dtype=int),
+                np.array(upper_limit, dtype=int)))
+            self.in_flight[key] = computation
+        else:
+            self.counts['coalesced'] += 1
+        # A cancelled caller does not cancel the computation shared with
+        # other callers
+        return await asyncio.shield(computation)
+
+    async def _compute(self, key, cost, scheduler, tasks, lower_limit,
+                       upper_limit):
+        """
+        Runs a scheduler in the executor and caches its assignment.
+        """
+        try:
+            loop = asyncio.get_event_loop()
+            assignment = await loop.run_in_executor(
+                self.executor, benchmark.SCHEDULERS[scheduler], tasks,
+                len(cost), cost, lower_limit, upper_limit)
+        finally:
+            del self.in_flight[key]
+        assignment = np.array(assignment)
+        assignment.setflags(write=False)
+        # The model may have been forgotten while the scheduler ran
+        if not any(digest == key[0] for _, digest in self.models.values()):
+            return assignment
+        self.cache[key] = assignment
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+            self.counts['evictions'] += 1
+        return assignment
+
+    async def handle(self, message):
+        """
+        Answers a request of the socket protocol.
+
+        Parameters
+        ----------
+        message : dict
+            Either {'cost': matrix, 'model': optional identifier} to
+            register a cost model, or {'model': identifier, 'tasks':
+            int, 'lower_limit': list, 'upper_limit': list, 'scheduler':
+            optional name} to schedule tasks
+
+        Returns
+        -------
+        dict
+            {'model': identifier}, {'assignment': list}, or
+            {'error': message}
+        """
+        try:
+            if 'cost' in message:
+                return {'model': self.register_model(message['cost'],
+                                                     message.get('model'))}
+            assignment = await self.schedule(
+                message['model'], message['tasks'], message['lower_limit'],
+                message['upper_limit'],
+                message.get('scheduler', '(MC)2MKP'))
+            return {'assignment': assignment.tolist()}
+        except Exception as error:
+            return {'error': f'{type(error).__name__}: {error}'}
+
+    async def _serve_client(self, reader, writer):
+        """
+        Answers the requests of a connection, one JSON object per line.
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError as error:
+                    answer = {'error': f'ValueError: {error}'}
+                else:
+                    answer = await self.handle(message)
+                writer.write(json.dumps(answer).encode() + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def start_server(self, path):
+        """
+        Starts answering requests on a Unix socket.
+
+        Parameters
+        ----------
+        path : string
+            Path of the socket
+
+        Returns
+        -------
+        asyncio.Server
+            Server (see asyncio.start_unix_server)
+
+        Notes
+        -----
+        Each line sent to the socket is a JSON request (see handle) and
+        receives one line with the JSON answer. Requests of a connection
+        are answered in order; concurrent connections share the cache
+        and the computations in flight.
+        """
+        return await asyncio.start_unix_server(self._serve_client, path,
+                                               limit=LINE_LIMIT)
+
+
+async def request(path, message):
+    """
+    Sends one request to a scheduling service on a Unix socket.
+
+    Parameters
+    ----------
+    path : string
+        Path of the socket
+    message : dict
+        Request (see SchedulerService.handle)
+
+    Returns
+    -------
+    dict
+        Answer of the service
+    """
+    reader, writer = await asyncio.open_unix_connection(path)
+    try:
+        writer.write(json.dumps(message).encode() + b'\n')
+        await writer.drain()
+        return json.loads(await reader.readline())
+    finally:
+        writer.close()
+        if hasattr(writer, 'wait_closed'):  # Python 3.7+
+            await writer.wait_closed()
@@ -2,8 +2,13 @@
 Module containing support functions for the experiments
 """
 
+import json
 import numpy as np
+import os
+import queue
 import shutil
+import threading
+import time
 from io import StringIO
 
 
@@ -15,16 +20,51 @@ class Logger:
     ----------
     filename : string
         Name of the file to write
-    log_buffer : StringIO
-        Text buffer containing results
+    log_buffer : StringIO or None
+        Text buffer containing results (None when streaming)
     verbosity : boolean
         True if strings should be printed to the standard output too
+    streaming : boolean
+        True if strings are written to the file as they are stored
+    flush_records : int or None
+        Number of strings stored between flushes of the file (streaming)
+    flush_seconds : float or None
+        Maximum time in seconds between flushes of the file (streaming)
+    background : boolean
+        True if a writer thread does the file operations (streaming)
+    columnar : string or None
+        Columnar format also written by finish() (see convert_results)
+
+    Notes
+    -----
+    By default, strings are kept in memory and written by finish(). In
+    streaming mode, the file is opened by the first string and strings
+    go through a buffered file handle, so memory does not grow with the
+    number of results and they can be read while the experiment runs.
+    The file is flushed every flush_records strings and/or every
+    flush_seconds seconds (otherwise, when the buffer is full). With a
+    background thread, store() only adds the string to a bounded queue.
+    A Logger can be used as a context manager calling finish() at exit.
     """
 
-    def __init__(self, filename, verbosity=False):
+    def __init__(self, filename, verbosity=False, streaming=False,
+                 flush_records=None, flush_seconds=None, background=False,
+                 columnar=None):
         self.filename = filename
-        self.log_buffer = StringIO()
         self.verbosity = verbosity
+        self.streaming = streaming or background
+        self.flush_records = flush_records
+        self.flush_seconds = flush_seconds
+        self.background = background
+        self.columnar = columnar
+        self.log_buffer = None if self.streaming else StringIO()
+        self._logfile = None
+        self._opened = False
+        self._unflushed = 0
+        self._last_flush = 0.0
+        self._queue = None
+        self._writer = None
+        self._error = None
 
     def header(self, info):
         """
@@ -35,7 +75,7 @@ class Logger:
         info : string
             String to log
         """
-        self.log_buffer.write(info)
+        self._write(info, False)
 
     def store(self, info):
         """
@@ -46,17 +86,438 @@ class Logger:
         info : string
             String to log
         """
-        self.log_buffer.write(info + '\n')
+        self._write(info + '\n', True)
         if self.verbosity is True:
             print(f'Result: {info}')
 
+    def _write(self, text, record):
+        """
+        Sends a text to the log buffer, the file, or the writer thread.
+        """
+        if not self.streaming:
+            self.log_buffer.write(text)
+        elif self.background:
+            if self._writer is None:
+                self._start_writer()
+            if self._error is not None:
+                raise self._error
+            self._queue.put((text, record))
+        else:
+            if self._logfile is None:
+                self._open()
+            self._append(text, record)
+
+    def _open(self):
+        """
+        Opens the file for streaming.
+        """
+        # Appends if the file was already written (e.g., after finish())
+        self._logfile = open(self.filename, 'a' if self._opened else 'w')
+        self._opened = True
+        self._last_flush = time.monotonic()
+
+    def _append(self, text, record):
+        """
+        Writes a text to the file and flushes it if needed.
+        """
+        self._logfile.write(text)
+        self._unflushed += record
+        if self.flush_records is not None and \
+                self._unflushed >= self.flush_records:
+            self._flush()
+        elif self.flush_seconds is not None and \
+                time.monotonic() - self._last_flush >= self.flush_seconds:
+            self._flush()
+
+    def _flush(self):
+        """
+        Flushes the file.
+        """
+        self._logfile.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def _start_writer(self):
+        """
+        Starts the thread writing to the file.
+        """
+        # The queue is bounded so memory stays bounded if the disk is slow
+        self._queue = queue.Queue(maxsize=10000)
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _write_loop(self):
+        """
+        Writes the texts in the queue until it receives None.
+        """
+        try:
+            self._open()
+            timeout = self.flush_seconds
+            while True:
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    # Flushes the last strings when the experiment is slow
+                    if self._unflushed > 0:
+                        self._flush()
+                    continue
+                if item is None:
+                    break
+                self._append(*item)
+        except Exception as error:
+            self._error = error
+            # Keeps consuming so store() and finish() do not block
+            while self._queue.get() is not None:
+                pass
+        finally:
+            if self._logfile is not None:
+                self._logfile.close()
+
     def finish(self):
         """
         Writes the log buffer to a file.
         """
-        with open(self.filename, 'w') as logfile:
-            self.log_buffer.seek(0)
-            shutil.copyfileobj(self.log_buffer, logfile)
+        if not self.streaming:
+            with open(self.filename, 'w') as logfile:
+                self.log_buffer.seek(0)
+                shutil.copyfileobj(self.log_buffer, logfile)
+        elif self.background:
+            if self._writer is None:
+                self._start_writer()
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+            if self._error is not None:
+                raise self._error
+        else:
+            if self._logfile is None:
+                self._open()
+            self._logfile.close()
+            self._logfile = None
+        if self.columnar is not None:
+            convert_results(self.filename, self.columnar)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.finish()
+
+
+# Extensions of the columnar formats
+COLUMNAR_FORMATS = {'parquet': '.parquet', 'feather': '.feather', 'npz': '.npz'}
+
+
+def _parse_csv(filename):
+    """
+    Reads a CSV file of results with its description.
+
+    Parameters
+    ----------
+    filename : string
+        CSV file whose first lines (starting with '#') describe the
+        experiment
+
+    Returns
+    -------
+    dict
+        Typed columns (np.array) indexed by name, in order
+    string
+        Description of the experiment
+    """
+    description = []
+    with open(filename) as csv_file:
+        for line in csv_file:
+            if not line.startswith('#'):
+                break
+            description.append(line)
+        names = line.rstrip('\n').split(',')
+        rows = [line.rstrip('\n').split(',') for line in csv_file
+                if line.strip() and not line.startswith('#')]
+    values = zip(*rows) if rows else [()] * len(names)
+    columns = {}
+    for name, column in zip(names, values):
+        # Uses the narrowest type that represents all values
+        for dtype in (np.int64, np.float64):
+            try:
+                columns[name] = np.array(column, dtype=dtype)
+                break
+            except ValueError:
+                continue
+        else:
+            columns[name] = np.array(column, dtype=str)
+    return columns, ''.join(description)
+
+
+def _pyarrow_available():
+    try:
+        import pyarrow
+    except ImportError:
+        return False
+    return True
+
+
+def convert_results(
+        filename,
+        columnar='auto'
+        ):
+    """
+    Writes a CSV file of results in a typed columnar format.
+
+    Parameters
+    ----------
+    filename : string
+        CSV file of results
+    columnar : string (default 'auto')
+        'parquet' or 'feather' (requires pyarrow), 'npz' (NumPy), or
+        'auto' (parquet if pyarrow is available, npz otherwise)
+
+    Returns
+    -------
+    string
+        Name of the new file (same name with the format's extension)
+
+    Notes
+    -----
+    The description of the experiment (the comment lines of the CSV)
+    is stored as metadata ('description' in the Arrow schema, or the
+    'description' array of the npz file). npz files contain a NumPy
+    structured array named 'results'.
+    """
+    if columnar == 'auto':
+        columnar = 'parquet' if _pyarrow_available() else 'npz'
+    if columnar not in COLUMNAR_FORMATS:
+        raise ValueError(f'Unknown columnar format {columnar}' +
+                         f' (options: {", ".join(COLUMNAR_FORMATS)}, auto)')
+    columns, description = _parse_csv(filename)
+    output = os.path.splitext(filename)[0] + COLUMNAR_FORMATS[columnar]
+    if columnar == 'npz':
+        results = np.empty(len(next(iter(columns.values()))),
+                           dtype=[(name, column.dtype)
+                                  for name, column in columns.items()])
+        for name, column in columns.items():
+            results[name] = column
+        np.savez_compressed(output, results=results,
+                            description=np.array(description))
+        return output
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(f'Writing {columnar} files requires pyarrow' +
+                          ' (the npz format only requires NumPy)') from None
+    table = pyarrow.table(columns)
+    table = table.replace_schema_metadata({'description': description})
+    if columnar == 'parquet':
+        pyarrow.parquet.write_table(table, output)
+    else:
+        pyarrow.feather.write_feather(table, output)
+    return output
+
+
+def read_results(filename):
+    """
+    Reads a file of results into a pandas DataFrame.
+
+    Parameters
+    ----------
+    filename : string
+        CSV, Parquet, Feather, or npz file of results
+
+    Returns
+    -------
+    pandas.DataFrame
+        Results, with the description of the experiment in
+        attrs['description']
+
+    Notes
+    -----
+    When given a CSV file, a columnar file with the same name that is
+    not older than the CSV file is read instead.
+    """
+    import pandas as pd
+    stem, extension = os.path.splitext(filename)
+    if extension == '.csv':
+        for candidate in COLUMNAR_FORMATS.values():
+            if os.path.exists(stem + candidate) and \
+                    os.path.getmtime(stem + candidate) >= \
+                    os.path.getmtime(filename):
+                return read_results(stem + candidate)
+        columns, description = _parse_csv(filename)
+        results = pd.DataFrame(columns)
+    elif extension == '.npz':
+        with np.load(filename) as data:
+            results = pd.DataFrame(data['results'])
+            description = str(data['description'])
+    elif extension in ('.parquet', '.feather'):
+        import pyarrow.feather
+        import pyarrow.parquet
+        if extension == '.parquet':
+            table = pyarrow.parquet.read_table(filename)
+        else:
+            table = pyarrow.feather.read_table(filename)
+        metadata = table.schema.metadata or {}
+        description = metadata.get(b'description', b'').decode()
+        results = table.to_pandas()
+    else:
+        raise ValueError(f'Unknown results format {extension}')
+    results.attrs['description'] = description
+    return results
+
+
+class Journal:
+    """
+    Append-only journal of the completed points of a campaign.
+
+    Attributes
+    ----------
+    filename : string
+        Name of the journal file (one JSON record per line)
+    key_fields : tuple of strings
+        Fields of a record identifying its point
+    campaign : dict or None
+        Parameters shared by all points (e.g., cost family and limits)
+    records : dict
+        Records of the completed points indexed by their keys
+
+    Notes
+    -----
+    Each record is flushed and synced to disk when it is appended, so a
+    crash loses at most the point being written. A truncated last line
+    (from a crash during a write) is removed when the journal is opened.
+    Opening a journal written for a different campaign raises a
+    ValueError instead of mixing their results.
+    """
+
+    def __init__(self, filename, key_fields, campaign=None):
+        self.filename = filename
+        self.key_fields = tuple(key_fields)
+        self.campaign = campaign
+        self.records = {}
+        self._read()
+        self.journal_file = open(self.filename, 'a')
+        if campaign is not None and os.path.getsize(self.filename) == 0:
+            self._write({'campaign': campaign})
+
+    def _read(self):
+        """
+        Loads the records of an existing journal.
+        """
+        if not os.path.exists(self.filename):
+            return
+        with open(self.filename, 'rb+') as journal_file:
+            lines = journal_file.read().split(b'\n')
+            if lines[-1]:
+                # Removes a partially written record
+                journal_file.truncate(journal_file.tell() - len(lines[-1]))
+        for line in lines[:-1]:
+            record = json.loads(line)
+            if 'campaign' in record:
+                if self.campaign is not None and \
+                        record['campaign'] != self.campaign:
+                    raise ValueError(f'Journal {self.filename} belongs to' +
+                                     ' a different campaign')
+            else:
+                self.records[self.key(record)] = record
+
+    def key(self, record):
+        """
+        Gives the key of a record.
+
+        Parameters
+        ----------
+        record : dict
+            Record containing the key fields
+
+        Returns
+        -------
+        tuple
+            Values of the key fields
+        """
+        return tuple(record[field] for field in self.key_fields)
+
+    def append(self, record):
+        """
+        Stores a record durably.
+
+        Parameters
+        ----------
+        record : dict
+            Record containing (at least) the key fields
+        """
+        self._write(record)
+        self.records[self.key(record)] = record
+
+    def _write(self, record):
+        self.journal_file.write(json.dumps(record) + '\n')
+        self.journal_file.flush()
+        os.fsync(self.journal_file.fileno())
+
+    def __contains__(self, key):
+        return key in self.records
+
+    def __len__(self):
+        return len(self.records)
+
+    def close(self):
+        """
+        Closes the journal file.
+        """
+        self.journal_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def stack_instances(
+        costs,
+        lower_limits,
+        upper_limits
+        ):
+    """
+    Stacks instances of different sizes for the batch schedulers.
+
+    Parameters
+    ----------
+    costs : list of np.ndarray(shape=(resources, tasks+1))
+        Cost functions per resource of each instance
+    lower_limits : list of np.array(shape=(resources), dtype=int)
+        Lower limits of each instance
+    upper_limits : list of np.array(shape=(resources), dtype=int)
+        Upper limits of each instance
+
+    Returns
+    -------
+    np.ndarray(shape=(instances, max resources, max tasks+1))
+        Costs of all instances
+    np.ndarray(shape=(instances, max resources), dtype=int)
+        Lower limits of all instances
+    np.ndarray(shape=(instances, max resources), dtype=int)
+        Upper limits of all instances
+
+    Notes
+    -----
+    Missing resources get zero costs and lower and upper limits of zero,
+    so they never receive tasks. Missing numbers of tasks get infinite
+    costs.
+    """
+    instances = len(costs)
+    resources = max(cost.shape[0] for cost in costs)
+    width = max(cost.shape[1] for cost in costs)
+    cost = np.full((instances, resources, width), np.inf)
+    cost[:, :, 0] = 0.0
+    lower = np.zeros((instances, resources), dtype=int)
+    upper = np.zeros((instances, resources), dtype=int)
+    for b in range(instances):
+        rows, columns = costs[b].shape
+        cost[b, :rows, :columns] = costs[b]
+        lower[b, :rows] = lower_limits[b]
+        upper[b, :rows] = upper_limits[b]
+    return cost, lower, upper
 
 
 def get_total_cost(
@@ -0,0 +1,52 @@
+"""
+Compares two timing campaigns and fails if any case got slower.
+
+Usage:
+    python3 compare_timing_results.py baseline.csv candidate.csv
+           [--threshold 0.1] [--method bootstrap|mannwhitney]
+
+Both files can be CSV results (e.g., results_of_timing_with_fixed_resources.csv)
+or JSON reports written by the timing scripts. The exit status is 1 if
+a regression is found, and 0 otherwise.
+"""
+
+import argparse
+import sys
+import code.benchmark as benchmark
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Compares two timing campaigns.')
+    parser.add_argument('baseline', help='reference results (CSV or JSON)')
+    parser.add_argument('candidate', help='new results (CSV or JSON)')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative change of the median to flag (default 0.1)')
+    parser.add_argument('--method', default='bootstrap',
+                        choices=['bootstrap', 'mannwhitney'],
+                        help='statistical comparison (default bootstrap)')
+    parser.add_argument('--alpha', type=float, default=0.05,
+                        help='significance level (default 0.05)')
+    args = parser.parse_args(arguments)
+
+    baseline = benchmark.load_timings(args.baseline)
+    candidate = benchmark.load_timings(args.candidate)
+    comparisons = benchmark.compare_timings(baseline, candidate,
+                                            threshold=args.threshold,
+                                            method=args.method,
+                                            alpha=args.alpha)
+    print('Scheduler,Tasks,Resources,Baseline,Candidate,Ratio,Verdict')
+    for c in comparisons:
+        print(f"{c['scheduler']},{c['tasks']},{c['resources']}," +
+              f"{c['baseline']},{c['candidate']},{c['ratio']:.3f},{c['verdict']}")
+    missing = set(baseline) ^ set(candidate)
+    if missing:
+        print(f'-- {len(missing)} cases are only present in one of the campaigns.')
+    regressions = [c for c in comparisons if c['verdict'] == 'regression']
+    improvements = [c for c in comparisons if c['verdict'] == 'improvement']
+    print(f'-- {len(regressions)} regressions and {len(improvements)}' +
+          f' improvements over {len(comparisons)} cases.')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Converts CSV files of results to a typed columnar format.
+
+Usage:
+    python3 convert_results.py [files or folders]
+           [--format auto|parquet|feather|npz]
+
+Without arguments, all CSV files in original_results and
+chameleon_results are converted. Each file is written next to its CSV
+file with the same name (e.g., results_with_random_costs.npz). Parquet
+and Feather require pyarrow, while npz only requires NumPy ('auto'
+picks Parquet when pyarrow is available). The description of the
+experiment is kept as metadata. support.read_results reads the
+converted files in place of the CSV files.
+"""
+
+import argparse
+import glob
+import os
+import code.support as support
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Converts CSV files of results.')
+    parser.add_argument('paths', nargs='*',
+                        default=['original_results', 'chameleon_results'],
+                        help='CSV files or folders containing them')
+    parser.add_argument('--format', default='auto',
+                        choices=['auto'] + sorted(support.COLUMNAR_FORMATS),
+                        help='columnar format (default auto)')
+    args = parser.parse_args(arguments)
+
+    for path in args.paths:
+        if os.path.isdir(path):
+            filenames = sorted(glob.glob(os.path.join(path, '*.csv')))
+        else:
+            filenames = [path]
+        for filename in filenames:
+            output = support.convert_results(filename, args.format)
+            print(f'{filename} -> {output}')
+
+
+if __name__ == '__main__':
+    main()
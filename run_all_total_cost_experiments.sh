@@ -2,6 +2,6 @@
 
 set -x
 
-find . -name "experiment_*.py" | while read line; do
-    python3 $line 
+find ./configs -name "experiment_*.json" | while read line; do
+    python3 run_experiment.py $line
 done
@@ -0,0 +1,39 @@
+"""
+Runs total cost experiments described by configuration files.
+
+Usage:
+    python3 run_experiment.py configs/experiment_with_random_costs.json
+           [--backend serial|process|queue] [--workers N] [--resume]
+
+Each configuration (JSON, TOML, or YAML) describes the cost functions,
+limits, schedulers, and the grid of tasks and resources of one
+experiment, as well as the CSV file receiving its results. See
+code/experiments.py (run_config) for the list of keys. With --resume,
+completed points are journaled to [output].journal and skipped when
+the experiment is run again (e.g., after a crash).
+"""
+
+import argparse
+import code.experiments as experiments
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Runs total cost experiments.')
+    parser.add_argument('configs', nargs='+',
+                        help='configuration files (JSON, TOML, or YAML)')
+    parser.add_argument('--backend', choices=sorted(experiments.BACKENDS),
+                        help='execution backend (default: from the configuration)')
+    parser.add_argument('--workers', type=int,
+                        help='number of workers (default: from the configuration)')
+    parser.add_argument('--resume', action='store_true',
+                        help='journal completed points and skip them in later runs')
+    args = parser.parse_args(arguments)
+
+    for config in args.configs:
+        print(f'Running experiment {config}.')
+        experiments.run_config(config, backend=args.backend,
+                               workers=args.workers, resume=args.resume)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 """# Description of the experiment:
 #
 # - We generate the costs to up to 2.000 tasks for 20 to 80 resources
-#   with steps of 10.
+#   with steps of 20.
 # - All costs follow linear functions (i.e., constant marginal costs)
 #   with RNG seeds [0..79].
 # - We schedule 2.000 tasks.
@@ -9,20 +9,26 @@
 # - All resources have a lower limit of 1.
 # - The first half of the resources have no upper limit.
 # - The second half has an upper limit of 2*(tasks/resources).
-# - Each sample is composed of 5 executions of the schedulers.
-# - We get 20 samples for each pair (scheduler, tasks)
-# - The order of execution of the different schedulers is
+# - Each case is run once before being timed (warm-up).
+# - Each sample is composed of 5 executions of the schedulers,
+#   each one timed individually. Time is the sum of the 5 executions.
+# - We get 20 samples for each pair (scheduler, resources)
+# - The order of execution of the different cases is
 #   randomly defined. We set an initial RNG seed = 1000 and increase
 #   it every time we need a new order.
+# - All timings and machine information are stored in a JSON file.
+# - If profile_memory is True, each case is also run once with
+#   tracemalloc, and its memory is stored in extra columns.
 """
 
 
-import timeit
-import numpy as np
 import code.support as support
+import code.benchmark as benchmark
 
 # File containing the results
-logger = support.Logger('results_of_timing_with_fixed_tasks.csv')
+logger = support.Logger('results_of_timing_with_fixed_tasks.csv',
+                        streaming=True, flush_records=1)
+report_file = 'results_of_timing_with_fixed_tasks.json'
 tasks = 2000
 min_resources = 20
 max_resources = 81
@@ -30,6 +36,7 @@ step_resources = 20
 size_of_sample = 5
 number_of_samples = 20
 shuffle_initial_seed = 1000
+profile_memory = False
 scheduler_name = ['(MC)2MKP', 'MarIn', 'MarCo', 'MarDecUn', 'MarDec', 'FedAvg']
 
 
@@ -37,8 +44,12 @@ def run_timing():
     # Stores the description of the experiments
     logger.header(__doc__)
     # Header of the CSV file
-    logger.store('Scheduler,Tasks,Resources,Time')
-    # Runs experiments for 10000 tasks
+    if profile_memory:
+        logger.store('Scheduler,Tasks,Resources,Time,' +
+                     'Peak RSS,Traced Peak,Allocated Blocks')
+    else:
+        logger.store('Scheduler,Tasks,Resources,Time')
+    # Runs experiments for 2000 tasks
     run_for_fixed_tasks()
     # Finishes logging
     logger.finish()
@@ -48,70 +59,38 @@ def run_for_fixed_tasks():
     """
     Runs experiments for a fixed number of tasks.
     """
+    cases = benchmark.expand_cases(scheduler_name,
+                                   [tasks],
+                                   range(min_resources, max_resources,
+                                         step_resources))
+    report = benchmark.run_suite(cases,
+                                 samples=number_of_samples,
+                                 repetitions=size_of_sample,
+                                 shuffle_seed=shuffle_initial_seed,
+                                 callback=store_sample,
+                                 memory=profile_memory,
+                                 verbose=True)
+    benchmark.write_json(report, report_file)
 
-    # counting the rounds of the experiment to update the RNG seed
-    rounds = 0
-    # runs experiments for all numbers of resources
-    for resources in range(min_resources, max_resources, step_resources):
-        print(f'- Running experiments with {resources} resources')
-        # sets the string to be used for each scheduler
-        calls = []
-        # version that verifies the results
-        #calls.append(f"print(support.check_total_assigned(tasks, schedulers.mc2mkp(tasks, {resources}, cost, lower_limit, upper_limit)))")
-        #calls.append(f"print(support.check_total_assigned(tasks, schedulers.marin(tasks, {resources}, cost, lower_limit, upper_limit)))")
-        #calls.append(f"print(support.check_total_assigned(tasks, schedulers.marco(tasks, {resources}, cost, lower_limit, upper_limit)))")
-        #calls.append(f"print(support.check_total_assigned(tasks, schedulers.mardecun(tasks, {resources}, cost, lower_limit)))")
-        #calls.append(f"print(support.check_total_assigned(tasks, schedulers.mardec(tasks, {resources}, cost, lower_limit, upper_limit)))")
-        #calls.append(f"print(support.check_total_assigned(tasks, schedulers.fedavg(tasks, {resources})))")
-        # version that does not verify the results
-        calls.append(f"a = schedulers.mc2mkp(tasks, {resources}, cost, lower_limit, upper_limit)")
-        calls.append(f"a = schedulers.marin(tasks, {resources}, cost, lower_limit, upper_limit)")
-        calls.append(f"a = schedulers.marco(tasks, {resources}, cost, lower_limit, upper_limit)")
-        calls.append(f"a = schedulers.mardecun(tasks, {resources}, cost, lower_limit)")
-        calls.append(f"a = schedulers.mardec(tasks, {resources}, cost, lower_limit, upper_limit)")
-        calls.append(f"a = schedulers.fedavg(tasks, {resources})")
 
-        # Setup up to generate 80 resources with 2001 costs
-        setup = f"""
-import numpy as np
-import code.schedulers as schedulers
-import code.devices as devices
-import code.support as support
-
-rng_seed_resources = 0
-tasks = 2000
-seed_for_random = 0
-resources = {resources}
-k = 1
-# Initializes the cost matrix with zeros
-cost = np.zeros(shape=(resources, tasks+1))
-# Fills the cost matrix with costs based on a linear function
-base_seed = rng_seed_resources
-for i in range(resources):
-    devices.create_linear_costs(base_seed, cost, i, tasks)
-    base_seed += 1
-# Prepares the upper and lower limit arrays
-lower_limit = np.full(shape=resources, fill_value=1, dtype=int)
-upper_limit = np.full(shape=resources, fill_value={tasks}, dtype=int)
-np.put(upper_limit, np.arange(resources//2, resources), 2*(tasks//resources))
-"""
-
-        # gathers all samples for a given (number of tasks, scheduler)
-        for sample in range(number_of_samples):
-            # sets the RNG seed and generates an order of execution
-            np.random.seed(shuffle_initial_seed + rounds)
-            rounds += 1
-            order = np.arange(6)  # six different schedulers
-            np.random.shuffle(order)  # random order
+def store_sample(case, times, memory):
+    """
+    Stores the timing information of a sample in the logger.
 
-            # gathers samples for all schedulers
-            for i in order:
-                # gathers one sample
-                timing = timeit.timeit(setup=setup,
-                                       stmt=calls[i],
-                                       number=size_of_sample)
-                # stores the timing information
-                logger.store(f'{scheduler_name[i]},{tasks},{resources},{timing}')
+    Parameters
+    ----------
+    case : benchmark.Case
+        Case of the sample
+    times : list of float
+        Time of each execution in the sample
+    memory : dict or None
+        Memory profile of the case
+    """
+    info = f'{case.scheduler},{case.tasks},{case.resources},{sum(times)}'
+    if memory is not None:
+        info += (f",{memory['Peak RSS']},{memory['Traced Peak']}" +
+                 f",{memory['Allocated Blocks']}")
+    logger.store(info)
 
 
 if __name__ == '__main__':
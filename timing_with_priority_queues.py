@@ -0,0 +1,99 @@
+"""# Description of the experiment:
+#
+# - We generate the costs to up to 10.000 tasks for 100 resources.
+# - All costs follow linear functions (i.e., constant marginal costs)
+#   with RNG seeds [0..99], rounded to integers (quantized costs).
+# - We schedule from 1.000 to 10.000 tasks in increments of 1.000.
+# - We run MarIn and MarCo with each priority queue option
+#   (heapq, bucket, and batch).
+# - All resources have a lower limit of 1.
+# - The first half of the resources have no upper limit.
+# - The second half has an upper limit of 2*(tasks/resources).
+# - Each case is run once before being timed (warm-up).
+# - Each sample is composed of 5 executions of the schedulers,
+#   each one timed individually. Time is the sum of the 5 executions.
+# - We get 20 samples for each pair (scheduler, tasks)
+# - The order of execution of the different cases is
+#   randomly defined. We set an initial RNG seed = 0 and increase
+#   it every time we need a new order.
+# - All timings and machine information are stored in a JSON file.
+# - If profile_memory is True, each case is also run once with
+#   tracemalloc, and its memory is stored in extra columns.
+"""
+
+
+import code.support as support
+import code.benchmark as benchmark
+
+# File containing the results
+logger = support.Logger('results_of_timing_with_priority_queues.csv',
+                        streaming=True, flush_records=1)
+report_file = 'results_of_timing_with_priority_queues.json'
+resources = 100
+min_tasks = 1000
+max_tasks = 10001
+step_tasks = 1000
+size_of_sample = 5
+number_of_samples = 20
+shuffle_initial_seed = 0
+profile_memory = False
+scheduler_name = [f'{name}-{queue}'
+                  for name in ['MarIn', 'MarCo']
+                  for queue in ['heapq', 'bucket', 'batch']]
+
+
+def run_timing():
+    # Stores the description of the experiments
+    logger.header(__doc__)
+    # Header of the CSV file
+    if profile_memory:
+        logger.store('Scheduler,Tasks,Resources,Time,' +
+                     'Peak RSS,Traced Peak,Allocated Blocks')
+    else:
+        logger.store('Scheduler,Tasks,Resources,Time')
+    # Runs experiments for 100 resources
+    run_for_priority_queues()
+    # Finishes logging
+    logger.finish()
+
+
+def run_for_priority_queues():
+    """
+    Runs experiments for all priority queues.
+    """
+    cases = benchmark.expand_cases(scheduler_name,
+                                   range(min_tasks, max_tasks, step_tasks),
+                                   [resources],
+                                   cost_families=['integer-linear'])
+    report = benchmark.run_suite(cases,
+                                 samples=number_of_samples,
+                                 repetitions=size_of_sample,
+                                 shuffle_seed=shuffle_initial_seed,
+                                 callback=store_sample,
+                                 memory=profile_memory,
+                                 verbose=True)
+    benchmark.write_json(report, report_file)
+
+
+def store_sample(case, times, memory):
+    """
+    Stores the timing information of a sample in the logger.
+
+    Parameters
+    ----------
+    case : benchmark.Case
+        Case of the sample
+    times : list of float
+        Time of each execution in the sample
+    memory : dict or None
+        Memory profile of the case
+    """
+    info = f'{case.scheduler},{case.tasks},{case.resources},{sum(times)}'
+    if memory is not None:
+        info += (f",{memory['Peak RSS']},{memory['Traced Peak']}" +
+                 f",{memory['Allocated Blocks']}")
+    logger.store(info)
+
+
+if __name__ == '__main__':
+    run_timing()
@@ -1,15 +1,36 @@
 #!/usr/bin/env python3
 """Unitary tests for the different modules."""
 
+import asyncio
 import unittest
+import unittest.mock
 import numpy as np
 import os
+import json
+import tempfile
+import tracemalloc
 
+import code.analysis as analysis
+import code.async_schedulers as async_schedulers
+import code.benchmark as benchmark
+import code.bounds as bounds
 import code.devices as devices
+import code.experiments as experiments
+import code.queues as queues
 import code.schedulers as schedulers
+import code.service as service
 import code.support as support
 
 
+def run_async(coroutine):
+    """Runs a coroutine in a new event loop (asyncio.run needs Python 3.7)."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
 class TestDevice(unittest.TestCase):
     def setUp(self):
         self.tests = 2
@@ -95,6 +116,19 @@ class TestDevice(unittest.TestCase):
         self.assertEqual(self.matrix[1][2], 2.6358044127646556)
         self.assertEqual(self.matrix[1][3], 0.5455206761146033)
 
+    def test_cost_models(self):
+        models = [(devices.create_linear_model, devices.create_linear_costs),
+                  (devices.create_quadratic_model, devices.create_quadratic_costs),
+                  (devices.create_nlogn_model, devices.create_nlogn_costs),
+                  (devices.create_logn_model, devices.create_logn_costs)]
+        for create_model, create_costs in models:
+            model = create_model(5, self.tests)
+            self.assertEqual(len(model), self.tests)
+            for i in range(self.tests):
+                create_costs(5 + i, self.matrix, i, self.size)
+            self.assertTrue(np.array_equal(model.matrix(self.size), self.matrix))
+            self.assertEqual(model(1, 2), self.matrix[1][2])
+
 
 class TestSchedulers(unittest.TestCase):
     def setUp(self):
@@ -131,6 +165,95 @@ class TestSchedulers(unittest.TestCase):
         self.assertEqual(assignment[1], 2)
         self.assertEqual(assignment[2], 4)
 
+    def test_marin_cost_sources(self):
+        cost = np.array([[0.1, 1.1, 3.1, 7.1, 12.1],
+                         [0.0, 1.5, 4.0, 7.5, 11.5],
+                         [0.0, 2.0, 4.5, 7.5, 10.5]])
+
+        def rows():
+            # each row is generated lazily
+            return [(value for value in row) for row in cost]
+
+        sources = [lambda i, x: cost[i][x], rows()]
+        for source in sources:
+            assignment = schedulers.marin(self.tasks,
+                                          self.resources,
+                                          source,
+                                          self.lower_limit,
+                                          self.upper_limit)
+            self.assertEqual(list(assignment), [2, 2, 4])
+
+        model = devices.create_nlogn_model(0, 50)
+        lower_limit = np.full(shape=50, fill_value=2, dtype=int)
+        upper_limit = np.full(shape=50, fill_value=40, dtype=int)
+        expected = schedulers.marin(1000, 50, model.matrix(40),
+                                    lower_limit, upper_limit)
+        assignment = schedulers.marin(1000, 50, model,
+                                      lower_limit, upper_limit)
+        self.assertEqual(list(assignment), list(expected))
+
+    def test_marin_bulk(self):
+        cost = np.array([[0.1, 1.1, 3.1, 7.1, 12.1],
+                         [0.0, 1.5, 4.0, 7.5, 11.5],
+                         [0.0, 2.0, 4.5, 7.5, 10.5]])
+        assignment = schedulers.marin(self.tasks,
+                                      self.resources,
+                                      cost,
+                                      self.lower_limit,
+                                      self.upper_limit,
+                                      bulk=True)
+        self.assertEqual(list(assignment), [2, 2, 4])
+
+        # one cheap resource receives long runs of tasks
+        resources = 20
+        cost = np.zeros(shape=(resources, 501))
+        for i in range(resources):
+            devices.create_nlogn_costs(i, cost, i, 500)
+        cost[3] /= 50
+        lower_limit = np.full(shape=resources, fill_value=5, dtype=int)
+        upper_limit = np.full(shape=resources, fill_value=500, dtype=int)
+        np.put(upper_limit, np.arange(resources//2, resources), 40)
+        for tasks in (100, 450, 900):
+            expected = schedulers.marin(tasks, resources, cost,
+                                        lower_limit, upper_limit)
+            assignment = schedulers.marin(tasks, resources, cost,
+                                          lower_limit, upper_limit,
+                                          bulk=True)
+            self.assertEqual(list(assignment), list(expected))
+
+    def test_marin_queues(self):
+        cost = np.array([[0.0, 1.0, 3.0, 7.0, 12.0],
+                         [0.0, 1.0, 4.0, 7.0, 11.0],
+                         [0.0, 2.0, 4.0, 7.0, 10.0]])
+        for queue in ['heapq', 'bucket', 'batch']:
+            assignment = schedulers.marin(self.tasks,
+                                          self.resources,
+                                          cost,
+                                          self.lower_limit,
+                                          self.upper_limit,
+                                          queue=queue)
+            self.assertEqual(list(assignment), [2, 3, 3])
+        with self.assertRaises(ValueError):
+            schedulers.marin(self.tasks, self.resources, cost,
+                             self.lower_limit, self.upper_limit,
+                             queue='unknown')
+        # the batch extraction needs a matrix and assigns one task at a time
+        with self.assertRaises(ValueError):
+            schedulers.marin(self.tasks, self.resources, cost,
+                             self.lower_limit, self.upper_limit,
+                             bulk=True, queue='batch')
+        with self.assertRaises(ValueError):
+            schedulers.marin(self.tasks, self.resources, list(cost),
+                             self.lower_limit, self.upper_limit,
+                             queue='batch')
+
+    def test_marginal_costs_stream(self):
+        marginal = schedulers.MarginalCosts([iter([0.0, 1.0, 3.0, 6.0])])
+        self.assertEqual(marginal.at(0, 1), 2.0)
+        self.assertEqual(list(marginal.row(0, 1, 3)), [2.0, 3.0])
+        with self.assertRaises(ValueError):
+            marginal.at(0, 0)
+
     def test_marco(self):
         cost = np.array([[0.1, 1.1, 2.1, 3.1, 4.1],
                          [0.0, 1.5, 3.0, 4.5, 6.0],
@@ -144,6 +267,39 @@ class TestSchedulers(unittest.TestCase):
         self.assertEqual(assignment[1], 3)
         self.assertEqual(assignment[2], 1)
 
+    def test_marco_queues(self):
+        cost = np.array([[0.1, 1.1, 2.1, 3.1, 4.1],
+                         [0.0, 1.5, 3.0, 4.5, 6.0],
+                         [0.0, 2.0, 4.0, 6.0, 8.0]])
+        for queue in ['heapq', 'bucket', 'batch']:
+            assignment = schedulers.marco(self.tasks,
+                                          self.resources,
+                                          cost,
+                                          self.lower_limit,
+                                          self.upper_limit,
+                                          queue=queue)
+            self.assertEqual(list(assignment), [4, 3, 1])
+
+    def test_marco_ties_and_full_resources(self):
+        cost = np.array([[0.0, 2.0, 4.0, 6.0, 8.0],
+                         [0.0, 1.0, 2.0, 3.0, 4.0],
+                         [0.0, 2.0, 4.0, 6.0, 8.0],
+                         [0.0, 0.5, 1.0, 1.5, 2.0]])
+        lower_limit = np.array([1, 1, 0, 2])
+        upper_limit = np.array([4, 3, 4, 2])
+        assignment = schedulers.marco(7, 4, cost, lower_limit, upper_limit)
+        # resource 3 is already full, resource 1 is the cheapest,
+        # and resource 0 wins the tie against resource 2
+        self.assertEqual(list(assignment), [2, 3, 0, 2])
+
+    def test_marco_no_tasks(self):
+        # the cost matrix has no column for a first task
+        zeros = np.zeros(3, dtype=int)
+        for queue in ['heapq', 'batch']:
+            assignment = schedulers.marco(0, 3, np.zeros((3, 1)), zeros,
+                                          zeros + 1, queue=queue)
+            self.assertEqual(list(assignment), [0, 0, 0])
+
     def test_mardecun(self):
         cost = np.array([[0.0, 4.0, 7.0, 9.0, 10.0],
                          [0.0, 3.0, 6.0, 9.0, 12.0],
@@ -157,6 +313,44 @@ class TestSchedulers(unittest.TestCase):
         self.assertEqual(assignment[1], 1)
         self.assertEqual(assignment[2], 4)
 
+    def test_mc2mkp_batch(self):
+        costs = [np.array([[0.0, 3.0, 2.0, 4.0, 6.0],
+                           [0.0, 1.0, 5.0, 2.0, 3.0],
+                           [0.0, 8.0, 6.0, 4.0, 2.0]]),
+                 np.array([[0.0, 1.0, 2.0, 3.0],
+                           [0.0, 2.0, 2.0, 2.0]])]
+        lower_limits = [self.lower_limit, np.array([0, 0])]
+        upper_limits = [self.upper_limit, np.array([3, 3])]
+        tasks = np.array([self.tasks, 3])
+        cost, lower, upper = support.stack_instances(costs, lower_limits,
+                                                     upper_limits)
+        self.assertEqual(cost.shape, (2, 3, 5))
+        assignments = schedulers.mc2mkp_batch(tasks, 3, cost, lower, upper)
+        self.assertEqual(list(assignments[0]), [3, 1, 4])
+        self.assertEqual(list(assignments[1]), [0, 3, 0])
+        for i in range(tasks.size):
+            assignment = schedulers.mc2mkp(tasks[i], len(costs[i]), costs[i],
+                                           lower_limits[i], upper_limits[i])
+            self.assertEqual(list(assignments[i][:len(costs[i])]),
+                             list(assignment))
+
+    def test_mardecun_batch(self):
+        cost = np.array([[0.0, 4.0, 7.0, 9.0, 10.0],
+                         [0.0, 3.0, 6.0, 9.0, 12.0],
+                         [0.0, 3.0, 5.0, 7.0, 8.5]])
+        tasks = np.array([3, 4, 6])
+        assignments = schedulers.mardecun_batch(tasks,
+                                                self.resources,
+                                                cost,
+                                                self.lower_limit)
+        self.assertEqual(assignments.shape, (3, self.resources))
+        for i in range(tasks.size):
+            assignment = schedulers.mardecun(tasks[i],
+                                             self.resources,
+                                             cost,
+                                             self.lower_limit)
+            self.assertEqual(list(assignments[i]), list(assignment))
+
     def test_mardec(self):
         cost = np.array([[0.0, 4.0, 7.0, 9.0, 10.0],
                          [0.0, 3.0, 6.0, 9.0, 12.0],
@@ -176,6 +370,48 @@ class TestSchedulers(unittest.TestCase):
         self.assertEqual(assignment[2], 4)
         self.assertEqual(assignment[3], 0)
 
+    def test_mardec_sparse(self):
+        cost = np.array([[0.0, 4.0, 7.0, 9.0, 10.0],
+                         [0.0, 3.0, 6.0, 9.0, 12.0],
+                         [0.0, 3.0, 5.0, 7.0, 8.5],
+                         [0.0, 4.0, 7.0, 10.0, 11.0]])
+        lower_limit = np.array([1, 1, 1, 0])
+        upper_limit = np.array([4, 3, 4, 2])
+        for tasks in range(6, 13):
+            dense = schedulers.mardec(tasks, 4, cost, lower_limit,
+                                      upper_limit)
+            sparse = schedulers.mardec(tasks, 4, cost, lower_limit,
+                                       upper_limit, sparse=True)
+            self.assertEqual(list(dense), list(sparse))
+        # no resource has an upper limit below the tasks left
+        sparse = schedulers.mardec(4, 4, cost, lower_limit, upper_limit,
+                                   sparse=True)
+        self.assertEqual(list(sparse), [1, 1, 2, 0])
+        frontiers = schedulers.mcmkp_frontiers(5, np.array([1, 3]), cost,
+                                               lower_limit, upper_limit)
+        # totals 0, 2 (resource 1), 2 (resource 3, tie), and 4
+        totals, costs, extra = frontiers[-1]
+        self.assertEqual(list(totals), [0, 2, 4])
+        self.assertEqual(list(costs), [0.0, 6.0, 13.0])
+        self.assertEqual(list(extra), [0, 0, 2])
+
+    def test_subset_sums(self):
+        reach = schedulers.subset_sums(10, np.array([3, 5, 3]))
+        self.assertEqual(len(reach), 3)
+        self.assertEqual(schedulers.reachable_totals(reach[0], 10), [0, 3])
+        # 11 = 3 + 5 + 3 is above the number of tasks
+        self.assertEqual(schedulers.reachable_totals(reach[2], 10),
+                         [0, 3, 5, 6, 8])
+        self.assertEqual(schedulers.reachable_totals(reach[2], 5), [0, 3, 5])
+        self.assertEqual(schedulers.reachable_totals(reach[2], -1), [])
+        # the costs are only finite for the reachable totals
+        cost = np.array([[0.0, 1.0, 2.0, 3.0, 4.0, 5.0],
+                         [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]])
+        K, I = schedulers.mcmkp_matrices(5, np.array([0, 1]), cost,
+                                         np.array([0, 0]), np.array([2, 3]))
+        self.assertEqual(list(np.flatnonzero(K[1] < np.inf)), [0, 2, 3, 5])
+        self.assertEqual(list(I[1][[0, 2, 3, 5]]), [0, 0, 3, 3])
+
     def test_fedavg(self):
         tasks = 10
         resources = 3
@@ -184,6 +420,488 @@ class TestSchedulers(unittest.TestCase):
         self.assertEqual(assignment[1], 3)
         self.assertEqual(assignment[2], 3)
 
+    def test_instrument(self):
+        cost = np.array([[0.0, 4.0, 7.0, 9.0, 10.0],
+                         [0.0, 3.0, 6.0, 9.0, 12.0],
+                         [0.0, 3.0, 5.0, 7.0, 8.5],
+                         [0.0, 4.0, 7.0, 10.0, 11.0]])
+        lower_limit = np.array([1, 1, 1, 0])
+        upper_limit = np.array([4, 3, 4, 2])
+        with schedulers.instrument() as stats:
+            assignment = schedulers.mardec(6, 4, cost, lower_limit,
+                                           upper_limit)
+            schedulers.marin(6, 4, cost, lower_limit, upper_limit)
+        self.assertEqual(list(assignment), [1, 1, 4, 0])
+        self.assertGreater(stats.counters['translate_calls'], 0)
+        self.assertEqual(stats.counters['heap_pops'], 3)
+        for phase in ['mcmkp_matrices', 'scan', 'translate', 'delete']:
+            self.assertIn(phase, stats.timers)
+        with schedulers.instrument() as stats:
+            schedulers.mc2mkp(6, 4, cost, lower_limit, upper_limit)
+        self.assertGreater(stats.counters['dp_cells'], 0)
+        self.assertGreater(stats.counters['improvements'], 0)
+        # Disabled outside of the with block
+        self.assertIsNone(schedulers._stats)
+
+
+class TestService(unittest.TestCase):
+    def setUp(self):
+        self.cost = np.array([[0.0, 3.0, 2.0, 4.0, 6.0],
+                              [0.0, 1.0, 5.0, 2.0, 3.0],
+                              [0.0, 8.0, 6.0, 4.0, 2.0]])
+        self.lower_limit = [1, 1, 1]
+        self.upper_limit = [4, 4, 4]
+
+    def test_schedule(self):
+        async def run():
+            scheduler = service.SchedulerService(cache_size=1)
+            model = scheduler.register_model(self.cost)
+            # identical concurrent requests share one computation
+            first = await asyncio.gather(*[
+                scheduler.schedule(model, 8, self.lower_limit,
+                                   self.upper_limit) for _ in range(3)])
+            second = await scheduler.schedule(model, 8, self.lower_limit,
+                                              self.upper_limit)
+            await scheduler.schedule(model, 6, self.lower_limit,
+                                     self.upper_limit)
+            return first, second, scheduler.counts
+
+        first, second, counts = run_async(run())
+        self.assertEqual(list(first[0]), [3, 1, 4])
+        self.assertIs(first[0], first[2])
+        self.assertIs(first[0], second)
+        self.assertEqual(counts, {'misses': 2, 'coalesced': 2, 'hits': 1,
+                                  'evictions': 1})
+
+    def test_model_limit(self):
+        scheduler = service.SchedulerService(model_limit=2)
+        first = scheduler.register_model(self.cost)
+        second = scheduler.register_model(self.cost + 1)
+        # using the first model makes the second the least recently used
+        run_async(scheduler.schedule(first, 8, self.lower_limit,
+                                     self.upper_limit))
+        third = scheduler.register_model(self.cost + 2)
+        self.assertEqual(list(scheduler.models), [first, third])
+        self.assertEqual(scheduler.counts['model_evictions'], 1)
+        self.assertEqual(len(scheduler.cache), 1)
+        with self.assertRaises(KeyError):
+            scheduler._key(second, '(MC)2MKP', 8, self.lower_limit,
+                           self.upper_limit)
+
+    def test_forget_while_running(self):
+        async def run():
+            scheduler = service.SchedulerService()
+            model = scheduler.register_model(self.cost)
+            request = asyncio.ensure_future(scheduler.schedule(
+                model, 8, self.lower_limit, self.upper_limit))
+            await asyncio.sleep(0)
+            scheduler.forget_model(model)
+            return await request, scheduler.cache
+
+        assignment, cache = run_async(run())
+        # the caller gets its result, but it is not cached
+        self.assertEqual(list(assignment), [3, 1, 4])
+        self.assertEqual(len(cache), 0)
+
+    def test_socket(self):
+        async def run(path):
+            scheduler = service.SchedulerService()
+            server = await scheduler.start_server(path)
+            try:
+                model = await service.request(path, {'cost':
+                                                     self.cost.tolist()})
+                answer = await service.request(path, {
+                    'model': model['model'], 'tasks': 8,
+                    'lower_limit': self.lower_limit,
+                    'upper_limit': self.upper_limit})
+                error = await service.request(path, {
+                    'model': 'unknown', 'tasks': 8,
+                    'lower_limit': self.lower_limit,
+                    'upper_limit': self.upper_limit})
+            finally:
+                server.close()
+                await server.wait_closed()
+            return answer, error
+
+        with tempfile.TemporaryDirectory() as folder:
+            answer, error = run_async(run(os.path.join(folder, 'socket')))
+        self.assertEqual(answer, {'assignment': [3, 1, 4]})
+        self.assertIn('error', error)
+
+
+class TestAsyncSchedulers(unittest.TestCase):
+    def test_schedule(self):
+        cost = np.array([[0.0, 3.0, 2.0, 4.0, 6.0],
+                         [0.0, 1.0, 5.0, 2.0, 3.0],
+                         [0.0, 8.0, 6.0, 4.0, 2.0]])
+        limits = (np.ones(3, dtype=int), np.full(3, 4))
+        result = run_async(async_schedulers.schedule(8, 3, cost, *limits))
+        self.assertEqual(result.scheduler, '(MC)2MKP')
+        self.assertEqual(list(result.assignment), [3, 1, 4])
+
+    def test_deadline(self):
+        resources, tasks = 20, 1000
+        cost = np.cumsum(np.ones((resources, tasks+1)), axis=1)
+        limits = (np.zeros(resources, dtype=int), np.full(resources, tasks))
+        result = run_async(async_schedulers.schedule(
+            tasks, resources, cost, *limits, executor='process',
+            timeout=0.05))
+        self.assertEqual(result.scheduler, 'MarIn')
+        self.assertEqual(np.sum(result.assignment), tasks)
+
+    def test_anytime(self):
+        cost = np.array([[0.0, 3.0, 2.0, 4.0, 6.0],
+                         [0.0, 1.0, 5.0, 2.0, 3.0],
+                         [0.0, 8.0, 6.0, 4.0, 2.0]])
+        limits = (np.ones(3, dtype=int), np.full(3, 4))
+        improvements = []
+        best = run_async(async_schedulers.anytime(
+            8, 3, cost, *limits, budget=10, callback=improvements.append))
+        # The optimal cost is found by MarIn already
+        self.assertEqual(best.total_cost, 7.0)
+        self.assertIs(improvements[-1], best)
+        total_costs = [improvement.total_cost for improvement in improvements]
+        self.assertEqual(total_costs, sorted(set(total_costs), reverse=True))
+        # Without time for refinements, the best heuristic is returned
+        best = run_async(async_schedulers.anytime(8, 3, cost, *limits,
+                                                  budget=0))
+        self.assertNotIn(best.scheduler, async_schedulers.ANYTIME_REFINEMENTS)
+        # Errors of the callback are not hidden
+
+        def callback(improvement):
+            raise RuntimeError('broken callback')
+        with self.assertRaises(RuntimeError):
+            run_async(async_schedulers.anytime(8, 3, cost, *limits,
+                                               budget=0,
+                                               callback=callback))
+
+
+class TestBounds(unittest.TestCase):
+    def setUp(self):
+        self.cost = np.array([[0.0, 3.0, 2.0, 4.0, 6.0],
+                              [0.0, 1.0, 5.0, 2.0, 3.0],
+                              [0.0, 8.0, 6.0, 4.0, 2.0]])
+        self.lower_limit = np.ones(3, dtype=int)
+        self.upper_limit = np.full(3, 4)
+
+    def test_lower_hulls(self):
+        hull = bounds.lower_hulls(self.cost, self.lower_limit,
+                                  self.upper_limit)
+        self.assertEqual(hull[0][0], np.inf)
+        self.assertEqual(list(hull[0][1:]), [3.0, 2.0, 4.0, 6.0])
+        self.assertEqual(list(hull[1][1:]), [1.0, 1.5, 2.0, 3.0])
+        self.assertEqual(list(hull[2][1:]), [8.0, 6.0, 4.0, 2.0])
+
+    def test_lower_bound(self):
+        # the optimal cost is 7 (see test_mc2mkp)
+        bound = bounds.lower_bound(8, 3, self.cost, self.lower_limit,
+                                   self.upper_limit)
+        self.assertEqual(bound, 5.5)
+        self.assertFalse(bounds.certify(8, 3, self.cost, self.lower_limit,
+                                        self.upper_limit, [3, 1, 4]))
+        # the bound is exact for increasing marginal costs
+        cost = np.array([[0.0, 1.0, 3.0, 6.0, 10.0],
+                         [0.0, 2.0, 4.0, 6.0, 8.0],
+                         [0.0, 1.5, 3.5, 6.5, 10.5]])
+        assignment = schedulers.marin(8, 3, cost, self.lower_limit,
+                                      self.upper_limit)
+        self.assertTrue(bounds.certify(8, 3, cost, self.lower_limit,
+                                       self.upper_limit, assignment))
+
+    def test_pruning(self):
+        assignment = schedulers.mc2mkp(8, 3, self.cost, self.lower_limit,
+                                       self.upper_limit, upper_bound=7.0)
+        self.assertEqual(list(assignment), [3, 1, 4])
+        with self.assertRaises(ValueError):
+            schedulers.mc2mkp(8, 3, self.cost, self.lower_limit,
+                              self.upper_limit, upper_bound=6.9)
+        assignment = schedulers.dispatch(8, 3, self.cost, self.lower_limit,
+                                         self.upper_limit)
+        self.assertEqual(support.get_total_cost(self.cost, assignment), 7.0)
+
+    def test_candidate_choices(self):
+        # giving 2 tasks to resource 1 costs 3.5 more than its hull, and
+        # the bound (5.5) is 1.5 below the optimal cost
+        choices = bounds.candidate_choices(8, self.cost, self.lower_limit,
+                                           self.upper_limit, upper_bound=7.0)
+        self.assertEqual([list(row) for row in choices],
+                         [[1, 2, 3, 4], [1, 3, 4], [1, 2, 3, 4]])
+        # a larger number of tasks is cheaper for resource 0, but the
+        # optimal assignment is [1, 1]
+        cost = np.array([[0.0, 5.0, 1.0],
+                         [10.0, 0.0, 100.0]])
+        lower_limit = np.zeros(2, dtype=int)
+        upper_limit = np.full(2, 2)
+        hull = bounds.lower_hulls(cost, lower_limit, upper_limit)
+        threshold = bounds.threshold_assignment(2, hull, lower_limit,
+                                                upper_limit)
+        self.assertEqual(list(threshold), [1, 1])
+        assignment = schedulers.mc2mkp(2, 2, cost, lower_limit, upper_limit,
+                                       upper_bound=5.0)
+        self.assertEqual(list(assignment), [1, 1])
+
+    def test_mc2mkp_hull(self):
+        # resources 1 and 2 are convex from their lower limits
+        lower_limit = np.array([1, 2, 2])
+        cost = np.array([[0.0, 3.0, 2.0, 4.0, 3.0],
+                         [0.0, 1.0, 5.0, 6.0, 8.0],
+                         [0.0, 8.0, 6.0, 4.0, 2.0]])
+        convex = bounds.convex_rows(cost, lower_limit, self.upper_limit)
+        self.assertEqual(list(convex), [False, True, True])
+        for tasks in range(5, 13):
+            assignment = schedulers.mc2mkp(tasks, 3, cost, lower_limit,
+                                           self.upper_limit)
+            merged = schedulers.mc2mkp_hull(tasks, 3, cost, lower_limit,
+                                            self.upper_limit)
+            self.assertEqual(np.sum(merged), tasks)
+            self.assertEqual(support.get_total_cost(cost, merged),
+                             support.get_total_cost(cost, assignment))
+
+
+class TestQueues(unittest.TestCase):
+    def setUp(self):
+        self.items = [(3.0, 0), (1.0, 2), (1.0, 1), (2.5, 3), (7.0, 4)]
+
+    def test_pop_order(self):
+        expected = sorted(self.items)
+        for queue in ['heapq', 'bucket']:
+            q = queues.create_queue(queue, self.items)
+            self.assertEqual(q.peek(), expected[0])
+            popped = [q.pop() for _ in range(len(self.items))]
+            self.assertEqual(popped, expected)
+            self.assertIsNone(q.peek())
+
+    def test_bucket_push(self):
+        q = queues.BucketQueue(self.items, resolution=0.5)
+        q.pop()
+        q.push((0.5, 5))
+        q.push((100.0, 6))
+        popped = [q.pop() for _ in range(len(q))]
+        self.assertEqual(popped, [(0.5, 5), (1.0, 2), (2.5, 3),
+                                  (3.0, 0), (7.0, 4), (100.0, 6)])
+        with self.assertRaises(IndexError):
+            q.pop()
+        # infinite keys are kept in their own buckets
+        q = queues.BucketQueue([(np.inf, 0), (2.0, 1), (-np.inf, 2)])
+        q.push((np.inf, -1))
+        popped = [q.pop() for _ in range(len(q))]
+        self.assertEqual(popped, [(-np.inf, 2), (2.0, 1), (np.inf, -1),
+                                  (np.inf, 0)])
+
+    def test_smallest(self):
+        keys = np.array([3.0, 1.0, 2.0, 1.0, 2.0, 2.0])
+        self.assertEqual(list(queues.smallest(keys, 0)), [])
+        self.assertEqual(list(queues.smallest(keys, 4)), [1, 3, 2, 4])
+        self.assertEqual(list(queues.smallest(keys, 10)), list(range(6)))
+
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.cases = benchmark.expand_cases(['MarCo', 'FedAvg'],
+                                            [20, 40], [4],
+                                            ['linear', 'random'])
+
+    def test_expand_cases(self):
+        self.assertEqual(len(self.cases), 8)
+        self.assertEqual(self.cases[0],
+                         benchmark.Case('MarCo', 20, 4, 'linear',
+                                        'half-limited'))
+        with self.assertRaises(ValueError):
+            benchmark.expand_cases(['Unknown'], [20], [4])
+
+    def test_prepare_instance(self):
+        cost, lower_limit, upper_limit = benchmark.prepare_instance(
+            20, 4, 'linear', 'half-limited')
+        self.assertEqual(cost.shape, (4, 21))
+        self.assertEqual(list(upper_limit), [20, 20, 10, 10])
+        self.assertFalse(cost.flags.writeable)
+        # instances are generated only once
+        self.assertIs(cost, benchmark.prepare_instance(
+            20, 4, 'linear', 'half-limited')[0])
+
+    def test_run_suite(self):
+        samples = []
+        report = benchmark.run_suite(
+            self.cases, samples=2, repetitions=3,
+            callback=lambda case, times, memory: samples.append(times))
+        self.assertEqual(len(samples), 2 * len(self.cases))
+        self.assertIn('numpy', report['metadata'])
+        for result in report['results']:
+            self.assertEqual(result['count'], 6)
+            self.assertEqual(len(result['samples']), 2)
+            self.assertLessEqual(result['min'], result['median'])
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'report.json')
+            benchmark.write_json(report, filename)
+            with open(filename) as jsonfile:
+                self.assertEqual(json.load(jsonfile)['settings']['samples'], 2)
+
+    def test_profile_memory(self):
+        case = benchmark.Case('(MC)2MKP', 100, 5, 'linear', 'half-limited')
+        memory = benchmark.profile_memory(case)
+        # (MC)^2MKP allocates two (resources, tasks+1) matrices
+        self.assertGreaterEqual(memory['Traced Peak'], 2 * 5 * 101 * 8)
+        # the assignment is still alive at the end
+        self.assertGreaterEqual(memory['Allocated Blocks'], 1)
+
+        def allocate(tasks, resources, cost, lower_limit, upper_limit):
+            # writes a temporary array of 8 MB
+            np.ones(10**6).sum()
+            return np.zeros(resources, dtype=int)
+        benchmark.register_scheduler('Allocate', allocate)
+        try:
+            allocation = benchmark.profile_memory(
+                benchmark.Case('Allocate', 100, 5, 'linear', 'half-limited'))
+        finally:
+            del benchmark.SCHEDULERS['Allocate']
+        self.assertGreaterEqual(allocation['Traced Peak'], 8 * 10**6)
+        self.assertLess(allocation['Traced Peak'], 9 * 10**6)
+        if allocation['Peak RSS'] is not None:
+            self.assertGreaterEqual(allocation['Peak RSS'], 7 * 10**6)
+        # tracing started by the caller is kept
+        tracemalloc.start()
+        try:
+            benchmark.profile_memory(case)
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+        report = benchmark.run_suite([case], samples=1, repetitions=1,
+                                     memory=True)
+        self.assertIn('Traced Peak', report['results'][0]['memory'])
+
+    def test_compare_timings(self):
+        rng = np.random.default_rng(0)
+        baseline = {('MarIn', 100, 10): rng.normal(1.0, 0.01, 20),
+                    ('MarCo', 100, 10): rng.normal(1.0, 0.01, 20),
+                    ('MarDec', 100, 10): rng.normal(1.0, 0.01, 20)}
+        candidate = {('MarIn', 100, 10): rng.normal(1.5, 0.01, 20),
+                     ('MarCo', 100, 10): rng.normal(1.0, 0.01, 20),
+                     ('MarDec', 100, 10): rng.normal(0.5, 0.01, 20)}
+        for method in ['bootstrap', 'mannwhitney']:
+            comparisons = benchmark.compare_timings(baseline, candidate,
+                                                    method=method,
+                                                    resamples=1000)
+            verdicts = {c['scheduler']: c['verdict'] for c in comparisons}
+            self.assertEqual(verdicts, {'MarIn': 'regression',
+                                        'MarCo': 'unchanged',
+                                        'MarDec': 'improvement'})
+
+    def test_load_timings(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'timing.csv')
+            with open(filename, 'w') as csvfile:
+                csvfile.write('# description\nScheduler,Tasks,Resources,Time\n' +
+                              'MarIn,200,100,0.5\nMarIn,200,100,0.25\n')
+            timings = benchmark.load_timings(filename)
+        self.assertEqual(list(timings[('MarIn', 200, 100)]), [0.5, 0.25])
+
+
+class TestExperiments(unittest.TestCase):
+    def test_run_campaign(self):
+        names = ['(MC)2MKP', 'MarIn', 'MarDec', 'FedAvg']
+        outputs = []
+        for backend, workers in [('serial', 1), ('process', 2), ('queue', 2)]:
+            logger = support.Logger('unused.csv')
+            experiments.run_campaign(logger, 'nlogn', 200, [4, 6],
+                                     range(40, 81, 20), names, 81,
+                                     workers=workers, backend=backend)
+            outputs.append(logger.log_buffer.getvalue())
+        # results do not depend on the backend or the number of processes
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], outputs[2])
+        # without shared memory (Python < 3.8), the points run serially
+        with unittest.mock.patch.object(experiments, '_shared_memory',
+                                        lambda: None):
+            for backend in ['process', 'queue']:
+                logger = support.Logger('unused.csv')
+                experiments.run_campaign(logger, 'nlogn', 200, [4, 6],
+                                         range(40, 81, 20), names, 81,
+                                         workers=2, backend=backend)
+                self.assertEqual(logger.log_buffer.getvalue(), outputs[0])
+        lines = outputs[0].splitlines()
+        self.assertEqual(len(lines), 2 * 3 * len(names))
+        self.assertEqual(lines[0].split(',')[:3], ['(MC)2MKP', '40', '4'])
+        # same results as running the scheduler directly
+        cost = experiments.create_costs('nlogn', 200, 6, 81)
+        lower_limit, upper_limit = experiments.experiment_limits(60, 6)
+        assignment = schedulers.mardec(60, 6, cost, lower_limit, upper_limit)
+        self.assertEqual(lines[len(names) * 4 + 2],
+                         f'MarDec,60,6,{support.get_total_cost(cost, assignment)}')
+        with self.assertRaises(ValueError):
+            experiments.run_campaign(logger, 'nlogn', 200, [4], [40], names,
+                                     81, backend='unknown')
+
+    def test_job_queue_dead_worker(self):
+        def crash(tasks, resources, cost, lower_limit, upper_limit):
+            os._exit(1)
+        benchmark.register_scheduler('Crash', crash)
+        try:
+            points = experiments.expand_points(['Crash'], [40], [4], [200])
+            costs = {(4, 200): experiments.create_costs('nlogn', 200, 4, 40)}
+            # the campaign fails instead of waiting forever
+            with self.assertRaises(RuntimeError):
+                list(experiments.run_job_queue(points, costs, 5, True, 2))
+        finally:
+            del benchmark.SCHEDULERS['Crash']
+
+    def test_run_config(self):
+        with tempfile.TemporaryDirectory() as folder:
+            config = {'output': os.path.join(folder, 'results.csv'),
+                      'description': ['# Test', '#'],
+                      'cost_family': 'linear',
+                      'rng_seed': [100, 200],
+                      'resources': [4],
+                      'tasks': {'start': 40, 'stop': 61, 'step': 20},
+                      'schedulers': ['MarCo', 'MarDecUn'],
+                      'upper_limit': 'unlimited',
+                      'backend': 'serial'}
+            filename = os.path.join(folder, 'config.json')
+            with open(filename, 'w') as config_file:
+                json.dump(config, config_file)
+            self.assertEqual(experiments.load_config(filename), config)
+            experiments.run_config(filename)
+            with open(config['output']) as results:
+                lines = results.read().splitlines()
+        self.assertEqual(lines[:3], ['# Test', '#',
+                                     'Scheduler,Tasks,Resources,Total Cost,Seed'])
+        self.assertEqual(len(lines), 3 + 2 * 2 * 2)
+        self.assertTrue(lines[3].startswith('MarCo,40,4,'))
+        self.assertTrue(lines[-1].endswith(',200'))
+        with self.assertRaises(ValueError):
+            experiments.load_config('config.ini')
+
+    def test_resume_campaign(self):
+        calls = []
+
+        def counting_marco(*args):
+            calls.append(args[0])
+            return schedulers.marco(*args)
+
+        benchmark.register_scheduler('Counting-MarCo', counting_marco)
+        names = ['Counting-MarCo', 'FedAvg']
+        fresh = support.Logger('unused.csv')
+        experiments.run_campaign(fresh, 'linear', 100, [4], [40, 60, 80],
+                                 names, 81, backend='serial')
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'campaign.journal')
+            # first run stops before all tasks are scheduled
+            with support.Journal(filename, experiments.Point._fields) as journal:
+                experiments.run_campaign(support.Logger('unused.csv'),
+                                         'linear', 100, [4], [40, 60], names,
+                                         81, backend='serial', journal=journal)
+            calls.clear()
+            resumed = support.Logger('unused.csv')
+            with support.Journal(filename, experiments.Point._fields) as journal:
+                experiments.run_campaign(resumed, 'linear', 100, [4],
+                                         [40, 60, 80], names, 81,
+                                         backend='serial', journal=journal)
+                self.assertEqual(len(journal), 6)
+        del benchmark.SCHEDULERS['Counting-MarCo']
+        # only the missing point was run again
+        self.assertEqual(calls, [80])
+        self.assertEqual(resumed.log_buffer.getvalue(),
+                         fresh.log_buffer.getvalue())
+
 
 class TestSupport(unittest.TestCase):
     def setUp(self):
@@ -243,6 +961,106 @@ class TestSupport(unittest.TestCase):
         self.assertFalse(check)
 
 
+class TestResults(unittest.TestCase):
+    def test_convert_results(self):
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'results.csv')
+            with support.Logger(filename, columnar='npz') as logger:
+                logger.header('# Test\n#\n')
+                logger.store('Scheduler,Tasks,Resources,Total Cost')
+                logger.store('(MC)2MKP,10,2,1.5')
+                logger.store('MarIn,10,2,0.1')
+            self.assertTrue(os.path.exists(os.path.join(folder, 'results.npz')))
+            results = support.read_results(filename)
+            self.assertEqual(results.attrs['description'], '# Test\n#\n')
+            self.assertEqual(list(results['Scheduler']), ['(MC)2MKP', 'MarIn'])
+            self.assertEqual(results['Tasks'].dtype, np.int64)
+            self.assertEqual(list(results['Total Cost']), [1.5, 0.1])
+            with self.assertRaises(ValueError):
+                support.convert_results(filename, 'xlsx')
+
+
+class TestAnalysis(unittest.TestCase):
+    def test_tables(self):
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'results.csv')
+            with support.Logger(filename) as logger:
+                logger.store('Scheduler,Tasks,Resources,Total Cost')
+                logger.store('(MC)2MKP,10,2,1.0')
+                logger.store('MarIn,10,2,2.0')
+                logger.store('(MC)2MKP,20,2,3.0')
+                logger.store('MarIn,20,2,3.0')
+            tables = analysis.cost_tables(filename)
+            self.assertEqual(list(tables.normalized['MarIn']), [2.0, 1.0])
+            self.assertEqual(list(tables.counts.loc['MarIn']), [1, 1, 0])
+            # schedulers keep their order in the results
+            self.assertEqual(list(tables.costs.columns), ['(MC)2MKP', 'MarIn'])
+            self.assertIs(tables, analysis.cost_tables(filename))
+
+            summary = analysis.summarize(tables.results, 'Total Cost',
+                                         by=['Scheduler'])
+            marin = summary[summary['Scheduler'] == 'MarIn'].iloc[0]
+            self.assertEqual(marin['count'], 2)
+            self.assertEqual(marin['mean'], 2.5)
+            self.assertLess(marin['ci_low'], 2.5)
+            self.assertGreater(marin['ci_high'], 2.5)
+
+    def test_old_seaborn(self):
+        old = unittest.mock.Mock(__version__='0.11.2')
+        self.assertEqual(analysis._no_error_bars(old), {'ci': None})
+        new = unittest.mock.Mock(__version__='0.13.2')
+        self.assertEqual(analysis._no_error_bars(new), {'errorbar': None})
+
+    def test_figure_queue(self):
+        import pandas as pd
+        data = pd.DataFrame({'Scheduler': ['A', 'A', 'B', 'B'],
+                             'Tasks': [1, 2, 1, 2],
+                             'Value': [1.0, 2.0, 2.0, 3.0]})
+        with tempfile.TemporaryDirectory() as folder:
+            manifest = os.path.join(folder, 'figures.json')
+            names = [os.path.join(folder, f'fig-{i}.pdf') for i in range(2)]
+
+            def queue(values):
+                drawings = analysis.FigureQueue(manifest, workers=2)
+                for name, value in zip(names, values):
+                    drawings.add(analysis.plot_lines,
+                                 data.assign(Value=data['Value'] * value),
+                                 'Tasks', 'Value', name, 'x', 'y')
+                return drawings
+
+            self.assertEqual(queue([1, 2]).render(), names)
+            self.assertTrue(all(os.path.exists(name) for name in names))
+            # Only the figure whose data changed is rendered again
+            self.assertEqual(queue([1, 2]).render(), [])
+            self.assertEqual(queue([1, 3]).render(), names[1:])
+            # Changing the style renders all figures again
+            import matplotlib
+            with matplotlib.rc_context({'font.size': 7}):
+                self.assertEqual(queue([1, 3]).render(), names)
+
+
+class TestJournal(unittest.TestCase):
+    def test_journal(self):
+        campaign = {'cost_family': 'linear'}
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'test.journal')
+            with support.Journal(filename, ['name', 'tasks'], campaign) as journal:
+                journal.append({'name': 'a', 'tasks': 1, 'cost': 2.5})
+                journal.append({'name': 'b', 'tasks': 1, 'cost': 3.5})
+            # simulates a crash in the middle of a write
+            with open(filename, 'a') as journal_file:
+                journal_file.write('{"name": "c", "ta')
+            with support.Journal(filename, ['name', 'tasks'], campaign) as journal:
+                self.assertEqual(len(journal), 2)
+                self.assertIn(('b', 1), journal)
+                self.assertEqual(journal.records['a', 1]['cost'], 2.5)
+                journal.append({'name': 'c', 'tasks': 2, 'cost': 0.5})
+            with open(filename) as journal_file:
+                self.assertEqual(len(journal_file.readlines()), 4)
+            with self.assertRaises(ValueError):
+                support.Journal(filename, ['name', 'tasks'], {'cost_family': 'logn'})
+
+
 class TestLogger(unittest.TestCase):
     def setUp(self):
         self.filename = 'dummy_file.txt'
@@ -267,6 +1085,38 @@ class TestLogger(unittest.TestCase):
             self.assertEqual(expected_log, written_log)
         os.remove(self.filename)
 
+    def test_streaming_logger(self):
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'stream.csv')
+            with support.Logger(filename, streaming=True,
+                                flush_records=2) as logger:
+                self.assertIsNone(logger.log_buffer)
+                self.assertFalse(os.path.exists(filename))
+                logger.header('c')
+                logger.store('a')
+                logger.store('b')
+                # flushed after two records
+                with open(filename) as logfile:
+                    self.assertEqual(logfile.read(), 'ca\nb\n')
+                logger.store('d')
+            with open(filename) as logfile:
+                self.assertEqual(logfile.read(), 'ca\nb\nd\n')
+
+    def test_background_logger(self):
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'background.csv')
+            logger = support.Logger(filename, background=True,
+                                    flush_seconds=0.01)
+            logger.header('c')
+            for i in range(1000):
+                logger.store(str(i))
+            logger.finish()
+            with open(filename) as logfile:
+                lines = logfile.read().splitlines()
+        self.assertEqual(lines[0], 'c0')
+        self.assertEqual(lines[-1], '999')
+        self.assertEqual(len(lines), 1000)
+
 
 if __name__ == '__main__':
     unittest.main()